@@ -150,7 +150,10 @@ class World1Renderer:
                 elif not all(fellowship):
                     self.gameobjects[1].insert_log('>HEROES missing on map.')
                 else:
-                    missions = heroes.assign_missions(fellowship, goals)
+                    # Terrain may be edited between assignments, so the
+                    # incremental planners of the heroes repair their paths
+                    missions = heroes.assign_missions(
+                        fellowship, goals, const.Algorithm.LPASTAR)
                     self.gameobjects[0].moveHuman = missions[0]
                     self.gameobjects[0].moveOctapus = missions[1]
                     self.gameobjects[0].moveMonkey = missions[2]
@@ -2,6 +2,7 @@
 Genetic algorithm module for artificial intelligence.
 """
 
+import math
 import random
 from constants import Heroes, Missions
 
@@ -54,8 +55,9 @@ class PathGenerator:
 
     @classmethod
     def get_cost(cls, hero_id, start, goal):
-
-        return cls.costs[Heroes(hero_id).name][start][goal].acc_cost
+        # Missing nodes are goals that can't be reached by the hero
+        node = cls.costs[Heroes(hero_id).name][start][goal]
+        return node.acc_cost if node else math.inf
 
     @staticmethod
     def make_path_dict(ind):
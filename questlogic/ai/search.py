@@ -17,7 +17,11 @@ Each search algorithm returns a Solution object that can represent a FAILURE or
 a SUCCESS.
 """
 import math
+import sys
+import time
 
+from array import array
+from collections import OrderedDict, deque
 from enum import Enum
 from heapq import heapify, heappush, heappop
 import constants
@@ -30,67 +34,580 @@ Terrain = constants.Terrain
 #####################################
 
 
-class HeapNode:
+class PriorityQueue:
     """
-    Wrapper class for state Nodes that are used in the StateHeap.
-
-    The '<', '>' and '==' operators are overloaded so that states may be
-    compared with each other in the heap or priority queue.
+    Priority queue of states, kept as a heap of (priority, tiebreak, counter,
+    state) tuples so that the heap compares plain numbers instead of calling
+    the comparison methods of the states.
+
+    States with the same priority are ordered by their TIEBREAK, the value of
+    a function of the state (e.g. lambda n: -n.acc_cost prefers the deepest
+    A* nodes), and then in the order in which they were pushed. Without a
+    tiebreak function, states with the same priority are popped first in,
+    first out, so pushing every state with the default priority makes a FIFO
+    queue.
+
+    The amount of pushes and pops and the peak size of the queue are counted,
+    so searches can be compared by the work done in their frontier.
     """
 
-    def __init__(self, state):
-        self.state = state
+    def __init__(self, startlist=None, tiebreak=None, priority=None):
+        self.heap = []
+        self.tiebreak = tiebreak
+        self.counter = 0
 
-    def __eq__(self, other):
-        return self.state == other.state
+        # Stats
+        self.pushes = 0
+        self.pops = 0
+        self.peak = 0
 
-    def __gt__(self, other):
-        return self.state > other.state
+        if startlist:
+            for state in startlist:
+                self.push(state, priority(state) if priority else 0)
 
-    def __lt__(self, other):
-        return self.state < other.state
+    def get_min(self):
+        """ Get the state with the smallest priority (top of the heap). """
+        return self.heap[0][3]
 
+    def min_priority(self):
+        """ Get the smallest priority in the queue. """
+        return self.heap[0][0]
 
-class StateHeap:
-    """
-    Implementation of a heap for prioritizing states with minimal costs. The
-    operations are those of a usual heap:
+    def push(self, state, priority=0):
+        """ Insert a state into the queue with a PRIORITY. """
+        tiebreak = self.tiebreak(state) if self.tiebreak else 0
+        heappush(self.heap, (priority, tiebreak, self.counter, state))
+
+        self.counter += 1
+        self.pushes += 1
+        if len(self.heap) > self.peak:
+            self.peak = len(self.heap)
+
+    def pop(self):
+        """ Remove and return the state with the smallest priority. """
+        self.pops += 1
+        return heappop(self.heap)[3]
 
-    - Push a node in the heap.
-    - Pop a node out of the heap.
-    - Peek at the smallest cost node in the heap.
+    def empty(self):
+        return len(self.heap) == 0
+
+    def stats(self):
+        """ Returns a dictionary with the pushes, pops and peak size. """
+        return {'pushes': self.pushes, 'pops': self.pops, 'peak': self.peak}
+
+    def __len__(self):
+        return len(self.heap)
+
+
+class BucketQueue:
+    """
+    Priority queue for integer priorities (Dial's algorithm), with the same
+    interface as PriorityQueue. States are kept in a bucket for every
+    priority, so pushing is O(1), and popping only has to move past the empty
+    buckets, which is amortized O(1) when priorities don't decrease much
+    below the ones popped (as in A* with integer costs, where the priorities
+    of the successors are close to those of their parents).
+
+    States with the same priority are popped last in, first out, which
+    prefers the most recently generated (usually the deepest) nodes.
     """
 
-    def __init__(self, startlist=None):
-        self.heap = []
+    def __init__(self, startlist=None, priority=None):
+        self.buckets = {}
+        self.cursor = 0
+        self.size = 0
+
+        # Stats
+        self.pushes = 0
+        self.pops = 0
+        self.peak = 0
 
         if startlist:
-            for sn in startlist:
-                heappush(self.heap, HeapNode(sn))
+            for state in startlist:
+                self.push(state, priority(state) if priority else 0)
+
+    def __next_bucket(self):
+        """
+        Moves the cursor to the first bucket that is not empty. Raises
+        IndexError if the queue is empty, like the heap of PriorityQueue.
+        """
+        if not self.size:
+            raise IndexError('empty bucket queue')
+
+        while not self.buckets.get(self.cursor):
+            self.buckets.pop(self.cursor, None)
+            self.cursor += 1
+
+        return self.buckets[self.cursor]
 
     def get_min(self):
-        """ Get the smallest cost node (the node on top of the heap). """
-        return self.heap[0]
+        """ Get the state with the smallest priority. """
+        return self.__next_bucket()[-1]
+
+    def min_priority(self):
+        """ Get the smallest priority in the queue. """
+        self.__next_bucket()
+        return self.cursor
+
+    def push(self, state, priority=0):
+        """ Insert a state into the queue with an integer PRIORITY. """
+        priority = int(priority)
+
+        if not self.size or priority < self.cursor:
+            self.cursor = priority
+
+        bucket = self.buckets.get(priority)
+        if bucket is None:
+            self.buckets[priority] = [state]
+        else:
+            bucket.append(state)
+
+        self.size += 1
+        self.pushes += 1
+        if self.size > self.peak:
+            self.peak = self.size
+
+    def pop(self):
+        """ Remove and return a state with the smallest priority. """
+        state = self.__next_bucket().pop()
+        self.size -= 1
+        self.pops += 1
+        return state
+
+    def empty(self):
+        return self.size == 0
+
+    def stats(self):
+        """ Returns a dictionary with the pushes, pops and peak size. """
+        return {'pushes': self.pushes, 'pops': self.pops, 'peak': self.peak}
+
+    def __len__(self):
+        return self.size
+
+
+def cost_queue(integral, tiebreak=None):
+    """
+    Returns the priority queue for a search by costs: a BucketQueue if all of
+    the costs (and therefore priorities) are INTEGRAL, otherwise a
+    PriorityQueue with a TIEBREAK function.
+    """
+    if integral:
+        return BucketQueue()
+
+    return PriorityQueue(tiebreak=tiebreak)
 
-    def push(self, state):
+
+class SparseArray(dict):
+    """
+    Dictionary that stands in for a flat array of a SearchBuffers, returning
+    DEFAULT for the cells that were never set, so only the cells that a search
+    reaches take memory.
+    """
+
+    def __init__(self, default):
+        super(SparseArray, self).__init__()
+        self.default = default
+
+    def __missing__(self, cell):
+        return self.default
+
+
+class SearchBuffers:
+    """
+    Scratch buffers of the searches that work on cell ids (y * width + x)
+    instead of Node objects. Every cell of the map has a slot in flat arrays:
+
+    - g      : Accumulated cost (or depth) of the best path found to the cell.
+    - parent : Cell from which the cell was reached (-1 for the start).
+    - step   : First cell of the move from the parent, which is the cell itself
+               unless a corridor was skipped to reach it.
+    - seen   : Generation of the last search that reached the cell.
+    - closed : Generation of the last search that expanded the cell.
+
+    Instead of clearing the arrays, every search starts a new generation, so a
+    slot only holds a value of the current search if its seen (or closed) stamp
+    is the current generation. Starting a search is then O(1).
+
+    The buffers of the last size that was requested are shared, so repeated
+    searches on a map don't allocate them again. Searches that need more than
+    one set (e.g. bidirectional searches) request them by INDEX.
+
+    Maps whose tiles are not held in memory (e.g. chunked maps) get SPARSE
+    buffers instead, made of SparseArrays, which are not shared.
+    """
+
+    shared = {}
+
+    def __init__(self, size, sparse=False):
+        self.size = size
+        self.generation = 0
+
+        if sparse:
+            self.g = SparseArray(0)
+            self.parent = SparseArray(-1)
+            self.step = SparseArray(-1)
+            self.seen = SparseArray(0)
+            self.closed = SparseArray(0)
+        else:
+            self.g = array('d', [0]) * size
+            self.parent = array('l', [-1]) * size
+            self.step = array('l', [-1]) * size
+            self.seen = array('l', [0]) * size
+            self.closed = array('l', [0]) * size
+
+    @classmethod
+    def get(cls, size, index=0):
+        """ Returns the shared buffers, allocating them for SIZE cells. """
+        buffers = cls.shared.get(index)
+        if buffers is None or buffers.size != size:
+            buffers = cls.shared[index] = cls(size)
+
+        return buffers
+
+    @classmethod
+    def of(cls, gmap, index=0):
         """
-        Insert a node into the heap. The heap's state is automatically updated
-        in such a way that the structure is not lost.
+        Returns the buffers for a search on GMAP: the shared ones if its tiles
+        are held in memory, otherwise new sparse ones.
         """
-        heappush(self.heap, HeapNode(state))
+        if isinstance(gmap.tiles, (bytes, bytearray, memoryview)):
+            return cls.get(len(gmap.tiles), index)
 
-    def pop(self):
+        return cls(len(gmap.tiles), sparse=True)
+
+    def start(self):
+        """ Starts a new search and returns its generation. """
+        self.generation += 1
+        return self.generation
+
+    def cells(self, cell):
+        """ Returns the cells of the path to CELL, from the start. """
+        path = []
+        while cell >= 0:
+            path.append(cell)
+            cell = self.parent[cell]
+
+        path.reverse()
+        return path
+
+
+class DistanceField:
+    """
+    Cost of the cheapest path from every cell of a map to a GOAL cell, found
+    with Dijkstra's algorithm from the goal backwards (a cell is entered when
+    the search leaves it). Cells that can't reach the goal are infinitely far.
+
+    DistanceField(gmap, raster, goal)
+    gmap   : The map of the field.
+    raster : CostRaster with the costs of entering the tiles of the map.
+    goal   : Cell id of the goal.
+
+    Since every cell knows its distance, the path from any cell to the goal is
+    found by walking down the field (see path), without searching.
+
+    Like SearchBuffers, maps whose tiles are not held in memory (e.g. chunked
+    maps) get SparseArrays instead of flat arrays, so only the cells of the
+    region of the goal take memory.
+    """
+
+    def __init__(self, gmap, raster, goal):
+        self.gmap = gmap
+        self.version = gmap.version
+        self.goal = goal
+        self.costs = raster.costs
+
+        if isinstance(gmap.tiles, (bytes, bytearray, memoryview)):
+            self.distances = array('d', [math.inf]) * len(gmap.tiles)
+            done = bytearray(len(gmap.tiles))
+        else:
+            self.distances = SparseArray(math.inf)
+            done = SparseArray(0)
+
+        neighbors = gmap.adjacency().neighbors
+        costs, distances = self.costs, self.distances
+        distances[goal] = 0
+
+        heap = cost_queue(raster.integral)
+        heap.push(goal, 0)
+
+        while not heap.empty():
+            cell = heap.pop()
+            cost = costs[cell]
+
+            # Cells that can't be entered are only the start of paths
+            if done[cell] or cost < 0:
+                continue
+            done[cell] = 1
+
+            d = distances[cell] + cost
+            for n in neighbors(cell):
+                if d < distances[n]:
+                    distances[n] = d
+                    heap.push(n, d)
+
+        if isinstance(distances, SparseArray):
+            # The table of the dictionary and a key and a float per cell
+            self.nbytes = sys.getsizeof(distances) + \
+                len(distances) * (sys.getsizeof(goal) + sys.getsizeof(0.0))
+        else:
+            self.nbytes = distances.itemsize * len(distances)
+
+    def path(self, start):
         """
-        Insert a node into the heap. The heap's state is automatically updated
-        in such a way that the structure is not lost.
+        Returns the cells of the cheapest path from START to the goal, or None
+        if the goal can't be reached from START.
         """
-        return heappop(self.heap).state
+        if self.distances[start] == math.inf:
+            return None
 
-    def empty(self):
-        return len(self.heap) == 0
+        neighbors = self.gmap.adjacency().neighbors
+        costs, distances = self.costs, self.distances
+        path = [start]
+        cell = start
 
-    def __len__(self):
-        return len(self.heap)
+        while cell != self.goal:
+            best = math.inf
+            for n in neighbors(cell):
+                cost = costs[n]
+                if cost >= 0 and distances[n] + cost < best:
+                    best = distances[n] + cost
+                    cell = n
+
+            path.append(cell)
+
+        return path
+
+
+class DistanceCache:
+    """
+    Least recently used cache of DistanceFields, one for every map version,
+    table of costs and goal, that holds up to BUDGET bytes of distances.
+    Fields of older versions of a map are never used again, so they are left
+    to be evicted.
+
+    The hits, misses and evictions counters tell how many fields were found in
+    the cache, how many had to be built and how many were dropped to keep the
+    cache under its budget.
+    """
+
+    def __init__(self, budget=64 * 1024 * 1024):
+        self.budget = budget
+        self.fields = OrderedDict()
+        self.nbytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def field(self, gmap, raster, goal):
+        """
+        Returns the DistanceField of a GOAL cell with the costs of a RASTER,
+        building it if it's not in the cache. Fields larger than the budget
+        are built but not kept.
+        """
+        key = (id(gmap), gmap.version, raster.table, goal)
+        field = self.fields.get(key)
+
+        # The field keeps its map alive, so the id of the map can't be reused
+        if field is not None and field.gmap is gmap:
+            self.hits += 1
+            self.fields.move_to_end(key)
+            return field
+
+        self.misses += 1
+        field = DistanceField(gmap, raster, goal)
+        if field.nbytes > self.budget:
+            return field
+
+        while self.fields and self.nbytes + field.nbytes > self.budget:
+            self.nbytes -= self.fields.popitem(last=False)[1].nbytes
+            self.evictions += 1
+
+        self.fields[key] = field
+        self.nbytes += field.nbytes
+        return field
+
+    def clear(self):
+        """ Drops every field of the cache. """
+        self.fields.clear()
+        self.nbytes = 0
+
+    def stats(self):
+        """
+        Returns a dictionary with the counters of the cache: hits, misses,
+        evictions, and the amount of fields and bytes that are kept.
+        """
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'fields': len(self.fields),
+            'bytes': self.nbytes,
+        }
+
+
+# Distance fields shared by the searches of field_search
+distance_cache = DistanceCache()
+
+
+class IncrementalPlanner:
+    """
+    Search state of Lifelong Planning A* (LPA*) between a start and a goal
+    cell, kept between queries so that the cheapest path can be found again
+    after the terrain changes by only repairing the part of the search that
+    the changes affect.
+
+    IncrementalPlanner(gmap, start, goal, costs)
+    gmap  : The map to plan on.
+    start : Coordinate of the start.
+    goal  : Coordinate of the goal.
+    costs : Table of terrain costs (as the costs of a MapProblem).
+
+    Every cell has g, the cost of the path to it found by the last expansion,
+    and rhs, the cost through its best neighbor. Cells where they differ are
+    inconsistent and wait in the queue; a change of terrain makes its cell
+    inconsistent, and only the cells whose costs depend on it are expanded
+    again. The heuristic is the manhattan distance times the lowest cost of
+    the table, so it never overestimates.
+
+    The planner follows the changes of its map (see Map.changes_since), and
+    starts over if they are no longer known. The cells expanded by the last
+    query are kept in expanded.
+    """
+
+    def __init__(self, gmap, start, goal, costs):
+        self.gmap = gmap
+        self.start = start
+        self.goal = goal
+        self.costs = costs
+        self.table = cost_table(costs)
+        self.lowest = min((c for c in self.table if c is not None), default=0)
+        self.expanded = []
+        self.reset()
+
+    def reset(self):
+        """ Drops the search state and starts planning from scratch. """
+        width = self.gmap.width
+        self.version = self.gmap.version
+        self.start_cell = self.start[1] * width + self.start[0]
+        self.goal_cell = self.goal[1] * width + self.goal[0]
+
+        self.g = {}
+        self.rhs = {self.start_cell: 0}
+        self.keys = {}
+        self.queue = PriorityQueue()
+        self.__enqueue(self.start_cell)
+
+    def update(self, cells):
+        """
+        Makes the planner take into account that the terrain of CELLS
+        changed. Since costs are paid when a cell is entered, only the cost of
+        reaching those cells changes.
+        """
+        self.__load()
+
+        for cell in cells:
+            self.__update_cell(cell)
+
+    def path(self):
+        """
+        Returns the cells of the cheapest path from the start to the goal with
+        the current terrain of the map, or None if there is none.
+        """
+        gmap = self.gmap
+        if gmap.version != self.version:
+            changes = gmap.changes_since(self.version)
+
+            if changes is None:
+                self.reset()
+            else:
+                self.update(c for rect in changes
+                            for c in rect.cells(gmap.width))
+                self.version = gmap.version
+
+        self.__load()
+        self.expanded = []
+        self.__compute()
+
+        goal = self.goal_cell
+        if self.g.get(goal, math.inf) == math.inf:
+            return None
+
+        # Walks back from the goal through the neighbors that give its cost
+        g, costs, neighbors = self.g, self.cell_costs, self.neighbors
+        path = [goal]
+        cell = goal
+
+        while cell != self.start_cell:
+            cost = costs[cell]
+            cell = min(neighbors(cell),
+                       key=lambda n: g.get(n, math.inf) + cost)
+            path.append(cell)
+
+        path.reverse()
+        return path
+
+    def __load(self):
+        """ Looks up the costs and neighbors of the current map version. """
+        self.cell_costs = self.gmap.cost_raster(self.table).costs
+        self.neighbors = self.gmap.adjacency().neighbors
+
+    def __key(self, cell):
+        best = min(self.g.get(cell, math.inf), self.rhs.get(cell, math.inf))
+        width = self.gmap.width
+        h = self.lowest * (abs(cell % width - self.goal[0]) +
+                           abs(cell // width - self.goal[1]))
+        return (best + h, best)
+
+    def __enqueue(self, cell):
+        key = self.__key(cell)
+        self.keys[cell] = key
+        self.queue.push(cell, key)
+
+    def __update_cell(self, cell):
+        """ Recomputes the rhs of a cell and puts it in the queue if needed. """
+        if cell != self.start_cell:
+            cost = self.cell_costs[cell]
+            if cost < 0:
+                self.rhs[cell] = math.inf
+            else:
+                g = self.g
+                self.rhs[cell] = min(
+                    (g.get(n, math.inf) for n in self.neighbors(cell)),
+                    default=math.inf) + cost
+
+        # Old entries of the cell in the queue are skipped when popped
+        self.keys.pop(cell, None)
+        if self.g.get(cell, math.inf) != self.rhs.get(cell, math.inf):
+            self.__enqueue(cell)
+
+    def __compute(self):
+        g, rhs, keys, queue = self.g, self.rhs, self.keys, self.queue
+        goal = self.goal_cell
+
+        while not queue.empty():
+            cell = queue.get_min()
+            key = queue.min_priority()
+
+            if keys.get(cell) != key:
+                queue.pop()
+                continue
+
+            if key >= self.__key(goal) and \
+                    rhs.get(goal, math.inf) == g.get(goal, math.inf):
+                break
+
+            queue.pop()
+            del keys[cell]
+            self.expanded.append(cell)
+
+            if g.get(cell, math.inf) > rhs[cell]:
+                g[cell] = rhs[cell]
+            else:
+                g[cell] = math.inf
+                self.__update_cell(cell)
+
+            for n in self.neighbors(cell):
+                self.__update_cell(n)
 
 
 ##############################################
@@ -109,9 +626,10 @@ class Node:
 
         aux = self.parent
         while aux:
-            path.insert(0, aux.coord)
+            path.append(aux.coord)
             aux = aux.parent
-        
+
+        path.reverse()
         return path
 
     def __init__(self, coord, cost, parent=None, action=None):
@@ -191,6 +709,14 @@ class ANode:
         return self.f < other.f
 
 
+def path_cost(node):
+    """
+    Returns the accumulated cost of the path to an HNode, or infinity if there
+    is no node (the search didn't find a path).
+    """
+    return node.acc_cost if node else math.inf
+
+
 class SolStat(Enum):
     """
     Symbolic constants that represent the status of the solution.
@@ -209,12 +735,16 @@ class Solution:
 
     - Status: A symbolic constant representing the result of the search.
     - Node:   This field will be set with a node only if the status is SUCCESS.
+
+    Searches that may return paths that are not the cheapest can also set the
+    bound: the path costs at most BOUND times the cheapest one.
     """
 
-    def __init__(self, status, node=None, arg=None):
+    def __init__(self, status, node=None, arg=None, bound=None):
         self.status = status
         self.node = node
         self.arg = arg
+        self.bound = bound
 
     def __str__(self):
         return 'Solution<%s - %s>' % (self.status, self.node)
@@ -223,6 +753,32 @@ class Solution:
         return self.status == other
 
 
+def passable_terrains(costs):
+    """
+    Returns the set of terrain values that can be entered with a table of
+    costs. Terrains that are missing from the table, or whose cost is None or
+    infinite, can't be entered.
+    """
+    return frozenset(t.value for t, c in costs.items()
+                     if c is not None and c != math.inf)
+
+
+def cost_table(costs):
+    """
+    Returns a list with the cost of entering every terrain value (256 of them)
+    with a table of costs, None for the terrains that can't be entered (see
+    passable_terrains).
+    """
+    passable = passable_terrains(costs)
+    table = [None] * 256
+
+    for t, c in costs.items():
+        if t.value in passable:
+            table[t.value] = c
+
+    return table
+
+
 DIR_DIFF = {
     (-1, 0): MoveDir.RIGHT,
     (1, 0): MoveDir.LEFT,
@@ -250,7 +806,7 @@ class MapProblem:
     state, and a goal state.
     """
 
-    def __init__(self, gmap, initial, goal, costs=None):
+    def __init__(self, gmap, initial, goal, costs=None, landmarks=False):
         self.gmap = gmap
         self.initial = Node(initial, 0)
         self.goal = goal
@@ -258,10 +814,58 @@ class MapProblem:
         self.decisions = set([])
         self.costs = costs
 
+        # Priority queue of the last search done on the problem, kept so the
+        # stats of its frontier can be inspected.
+        self.frontier = None
+
+        # Decision graph of the map, looked up the first time that an enhanced
+        # search needs it.
+        self.graph = None
+
+        # Cost of entering every tile of the map, shared by every problem with
+        # the same costs on the same version of the map.
+        if costs is not None:
+            self.passable = passable_terrains(costs)
+            self.raster = gmap.cost_raster(cost_table(costs))
+            self.lowest = min((c for c in self.raster.table if c >= 0),
+                              default=0)
+        else:
+            self.passable = None
+            self.raster = None
+            self.lowest = 1
+
+        # Heuristic of the searches, set by heuristic_init. If LANDMARKS is
+        # true, it also uses the landmarks of the map (see Map.landmarks).
+        self.landmarks = landmarks
+        self.estimate = None
+
     def is_goal(self, node):
         """ Validates if node is the goal """
         return node.coord == self.goal
 
+    def is_reachable(self):
+        """
+        Returns False if the goal can't be reached from the initial state
+        because they are in different regions of the map, which is known
+        without searching. If the problem has costs, regions are made only of
+        the terrains that can be entered with them. If the map doesn't keep its
+        regions, True is returned.
+        """
+        components = self.gmap.components(self.passable)
+        if components is None:
+            return True
+
+        width = self.gmap.width
+        start, goal = self.initial.coord, self.goal
+
+        if self.gmap.get_terrain(goal) is None:
+            return False
+        if self.gmap.get_terrain(start) is None:
+            return True
+
+        return components.reachable(start[1] * width + start[0],
+                                    goal[1] * width + goal[0])
+
     def get_children(self, node, enhance=False):
         """
         Returns a list containing immediate children nodes.
@@ -280,29 +884,35 @@ class MapProblem:
         walkable = [Node(w, 0, node, self.__get_direction(node.coord, w))
                     for w in self.gmap.get_walkable(node.coord)]
 
-        walked = set([node.coord])
-
-        def exp(n): return n not in walked
+        width = self.gmap.width
+        cell = node.coord[1] * width + node.coord[0]
+        walked = [node.coord]
 
+        # Every child jumps to the end of the corridor it leads to
         for w in walkable:
-            aux = w.coord
-            while True:
-                others = self.gmap.get_walkable(aux)
-                if len(others) != 2 or aux == self.goal:
-                    w.coord = aux
-                    break
-                # "Walking" to next node. Others is supposed to be empty if then
-                # amount of neighbor nodes is equal to 2 (one of them is the
-                # node from which it came from).
-                walked.add(aux)
-                aux, *others \
-                    = [c for c in
-                        filter(exp, self.gmap.get_walkable(aux))]
+            first = w.coord[1] * width + w.coord[0]
+            end, interior = self.corridor(cell, first)
+            w.coord = (end % width, end // width)
+            walked.extend((c % width, c // width) for c in interior)
 
         self.explored.update(walked)
 
         return walkable
 
+    def corridor(self, cell, first):
+        """
+        Returns the end and the cells of the corridor that leaves CELL through
+        FIRST, stopping at the goal (see DecisionGraph.corridor).
+        """
+        width = self.gmap.width
+        goal = self.goal[1] * width + self.goal[0] \
+            if self.gmap.get_terrain(self.goal) is not None else None
+
+        if self.graph is None:
+            self.graph = self.gmap.decision_graph()
+
+        return self.graph.corridor(cell, first, goal)
+
     def get_child(self, node, action, enhance=False):
         d = DIRECTIONS[action.value]
         child = (node.coord[0] + d[0], node.coord[1] + d[1])
@@ -319,46 +929,114 @@ class MapProblem:
 
     def __enh_get_child(self, child, cost, parent, action):
         """
-        Enhanced version of get_child.
+        Enhanced version of get_child. The walk goes on while the cell reached
+        has a single walkable neighbor that isn't explored, and stops at the
+        goal. Corridors (cells with two walkable neighbors) are jumped through
+        the decision graph, up to the cell before the first explored one.
         """
         if not self.gmap.is_walkable(child) or child in self.explored:
             return None
 
-        # Iterate through generated nodes until none of them are redundant (if
-        # it generates more than one node) or until a terminal node is found.
-        aux = child
-        while True:
-            # Generate child nodes that aren't explored
-            neighbors = [f for f in
-                         filter(self.__already_explored, self.gmap.get_walkable(aux))]
+        width = self.gmap.width
+        adjacency = self.gmap.adjacency()
+        explored = self.explored
+        goal = self.goal[1] * width + self.goal[0] \
+            if self.gmap.get_terrain(self.goal) is not None else -1
+        previous = parent.coord[1] * width + parent.coord[0]
+        cell = child[1] * width + child[0]
+
+        while cell != goal:
+            walkable = adjacency.walkable(cell)
+
+            if len(walkable) == 2 and previous in walkable:
+                end, interior = self.corridor(previous, cell)
+                walk = list(interior) + [end]
+
+                for i in range(1, len(walk)):
+                    if walk[i] == cell or \
+                            (walk[i] % width, walk[i] // width) in explored:
+                        walk = walk[:i]
+                        break
+
+                explored.update((c % width, c // width) for c in walk[:-1])
+                if walk[-1] != end:
+                    cell = walk[-1]
+                    break
+                previous, cell = walk[-2], end
+                continue
 
-            if len(neighbors) != 1 or self.goal == aux:
-                return Node(aux, cost, parent, action)
+            around = [n for n in walkable
+                      if (n % width, n // width) not in explored]
+            if len(around) != 1:
+                break
 
-            # Node is redundant. Keep expanding.
-            self.explored.add(aux)
-            aux = neighbors[0]
+            explored.add((cell % width, cell // width))
+            previous, cell = cell, around[0]
+
+        return Node((cell % width, cell // width), cost, parent, action)
 
     def get_succesors(self, node):
-        return [
-            HNode(
-                s[0], self.costs[s[1]], node,
-                self.__get_direction(node.coord, s[0]),
-                node.acc_cost + self.costs[s[1]],
-                self.__manhattan(s[0])
-            ) for s in self.gmap.get_terrains(node.coord)
-        ]
+        width = self.gmap.width
+        x, y = node.coord[0], node.coord[1]
+        cells = self.gmap.adjacency().neighbors(y * width + x)
+        raster = self.raster.costs
+
+        succesors = []
+        for cell in cells:
+            cost = raster[cell]
+
+            # Tiles that can't be entered are never generated
+            if cost < 0:
+                continue
+
+            coord = (cell % width, cell // width)
+            succesors.append(HNode(
+                coord, cost, node,
+                self.__get_direction(node.coord, coord),
+                node.acc_cost + cost,
+                self.estimate(cell)
+            ))
+
+        return succesors
 
     def heuristic_init(self):
         """
-        Initiates the initial state for a heuristic search, which only consists
-        of establishing the manhattan distance form the start to the goal.
+        Initiates the initial state for a heuristic search, which consists of
+        choosing the heuristic (see estimator) and establishing it from the
+        start to the goal.
         """
+        self.estimate = self.estimator()
 
-        self.initial = HNode(
-            self.initial.coord, 0,
-            dist=self.__manhattan(self.initial.coord)
-        )
+        x, y = self.initial.coord
+        dist = self.estimate(y * self.gmap.width + x) \
+            if self.gmap.get_terrain(self.initial.coord) is not None \
+            else self.__manhattan(self.initial.coord)
+
+        self.initial = HNode(self.initial.coord, 0, dist=dist)
+
+    def estimator(self):
+        """
+        Returns a function that estimates the cost from a cell to the goal
+        without overestimating it: the manhattan distance times the lowest
+        cost of the terrains or, if the problem uses landmarks and the map
+        keeps them, the best of that and the landmark bounds.
+        """
+        width = self.gmap.width
+        gx, gy = self.goal
+        lowest = self.lowest
+
+        def manhattan(cell):
+            return lowest * (abs(cell % width - gx) + abs(cell // width - gy))
+
+        if not self.landmarks or self.raster is None or \
+                self.gmap.get_terrain(self.goal) is None:
+            return manhattan
+
+        landmarks = self.gmap.landmarks(self.raster.table)
+        if landmarks is None:
+            return manhattan
+
+        return landmarks.heuristic(gy * width + gx, manhattan)
 
     def reset_explored(self):
         self.explored = set([self.initial.coord])
@@ -367,11 +1045,8 @@ class MapProblem:
         return DIR_DIFF[(u[0] - v[0], u[1] - v[1])]
 
     def __manhattan(self, coord):
-        return math.fabs(coord[0] - self.goal[0]) +\
-            math.fabs(coord[1] - self.goal[1])
-
-    def __already_explored(self, coord):
-        return not coord in self.explored
+        return self.lowest * (math.fabs(coord[0] - self.goal[0]) +
+                              math.fabs(coord[1] - self.goal[1]))
 
 
 class ScheduleProblem:
@@ -406,9 +1081,10 @@ class ScheduleProblem:
 
         aux = end_node
         while aux:
-            order.insert(0, aux.mission)
+            order.append(aux.mission)
             aux = aux.parent
 
+        order.reverse()
         return order
 
 #####################
@@ -421,34 +1097,194 @@ class ScheduleProblem:
 # Breadth first search
 
 
-def bf_search(problem, enhanced=False):
+def bf_search(problem, enhanced=False, early_goal=True, jump=False):
     """
     Implementation of the breadth first search algorithm.
 
-    bf_search(problem) -> solution
+    bf_search(problem, enhanced, early_goal, jump) -> solution
 
     solution can have a status of:
     - SUCCESS: A goal node has been reached.
     - FAILURE: A goal cannot be reached from the initial state.
+
+    The frontier is a deque of cell ids (y * width + x), and the parent of
+    every reached cell is kept in the shared SearchBuffers, so Nodes are only
+    built for the path of the solution. If ENHANCED, corridors are skipped
+    through the decision graph of the map. With EARLY_GOAL, the goal is tested
+    when it's generated instead of when it's taken out of the frontier.
+
+    If JUMP (and not ENHANCED), maps held in memory are searched with
+    jump_point_search instead, which returns paths of the same length
+    expanding far fewer cells, but only explores the jump points.
     """
     node = problem.initial
 
     if problem.is_goal(node):
         return Solution(SolStat.SUCCESS, node)
 
-    frontier = [node]
+    gmap = problem.gmap
+    if not problem.is_reachable() or gmap.get_terrain(node.coord) is None:
+        return Solution(SolStat.FAILURE)
 
-    while frontier:
-        node = frontier.pop(0)
-        problem.explored.add(node.coord)
+    # Without corridor skipping, every move costs the same, so only jump
+    # points need to be expanded (if the tiles can be read all at once).
+    if jump and not enhanced and \
+            isinstance(gmap.tiles, (bytearray, memoryview)):
+        return jump_point_search(problem)
 
-        for child in problem.get_children(node, enhanced):
-            if child.coord not in problem.explored:
-                if problem.is_goal(child):
-                    return Solution(SolStat.SUCCESS, child)
+    width = gmap.width
+    start = node.coord[1] * width + node.coord[0]
+    goal = problem.goal[1] * width + problem.goal[0] \
+        if gmap.get_terrain(problem.goal) is not None else -1
+
+    walkable = gmap.adjacency().walkable
+    buffers = SearchBuffers.of(gmap)
+    parent, step, seen = buffers.parent, buffers.step, buffers.seen
+    generation = buffers.start()
+
+    parent[start] = -1
+    seen[start] = generation
+    frontier = deque([start])
+    problem.frontier = None
+
+    # Expanded cells and skipped corridor cells, which become explored
+    expanded = []
+    found = -1
+
+    while frontier and found < 0:
+        cell = frontier.popleft()
+
+        if cell == goal:
+            found = cell
+            break
+
+        expanded.append(cell)
+
+        for first in walkable(cell):
+            if enhanced:
+                child, interior = problem.corridor(cell, first)
+                expanded.extend(interior)
+            else:
+                child = first
+
+            if seen[child] == generation:
+                continue
+
+            seen[child] = generation
+            parent[child] = cell
+            step[child] = first
+
+            if early_goal and child == goal:
+                found = child
+                break
+
+            frontier.append(child)
+
+    problem.explored.update((c % width, c // width) for c in expanded)
+
+    if found < 0:
+        return Solution(SolStat.FAILURE)
+
+    # Nodes of the path, linked as a tree with a single branch
+    for c in buffers.cells(found)[1:]:
+        coord = (c % width, c // width)
+        first = step[c]
+        child = Node(coord, 0 if enhanced else node.cost + 1, node,
+                     DIR_DIFF[(node.coord[0] - first % width,
+                               node.coord[1] - first // width)])
+        node.children.append(child)
+        node = child
+
+    return Solution(SolStat.SUCCESS, node)
+
+
+def bidirectional_bf_search(problem):
+    """
+    bidirectional_bf_search(problem) -> solution
+
+    Breadth first search that grows one frontier from the initial state and
+    another from the goal, expanding a whole level of the smallest one at a
+    time. When a level reaches cells of the other search, the path through the
+    best of those cells is the shortest one. Only cell ids and flat arrays are
+    used (see SearchBuffers), and Nodes are built for the path of the solution,
+    like in bf_search (without its enhanced mode).
+    """
+    node = problem.initial
+
+    if problem.is_goal(node):
+        return Solution(SolStat.SUCCESS, node)
+
+    gmap = problem.gmap
+    if not problem.is_reachable() or \
+            gmap.get_terrain(node.coord) is None or \
+            not gmap.is_walkable(problem.goal):
+        return Solution(SolStat.FAILURE)
+
+    width = gmap.width
+    start = node.coord[1] * width + node.coord[0]
+    goal = problem.goal[1] * width + problem.goal[0]
+    walkable = gmap.adjacency().walkable
+
+    # Index 0 of each pair is the search from the start, 1 from the goal
+    buffers = (SearchBuffers.of(gmap, 0),
+               SearchBuffers.of(gmap, 1))
+    generations = (buffers[0].start(), buffers[1].start())
+    frontiers = (deque([start]), deque([goal]))
+
+    for side, cell in ((0, start), (1, goal)):
+        buffers[side].g[cell] = 0
+        buffers[side].parent[cell] = -1
+        buffers[side].seen[cell] = generations[side]
+
+    expanded = []
+    best, meet = math.inf, -1
+
+    while meet < 0 and frontiers[0] and frontiers[1]:
+        side = 0 if len(frontiers[0]) <= len(frontiers[1]) else 1
+        frontier = frontiers[side]
+        depth, parent, seen = \
+            buffers[side].g, buffers[side].parent, buffers[side].seen
+        generation = generations[side]
+        other = buffers[1 - side]
+
+        for i in range(len(frontier)):
+            cell = frontier.popleft()
+            expanded.append(cell)
+
+            for child in walkable(cell):
+                if seen[child] == generation:
+                    continue
+
+                seen[child] = generation
+                depth[child] = depth[cell] + 1
+                parent[child] = cell
                 frontier.append(child)
 
-    return Solution(SolStat.FAILURE)
+                if other.seen[child] == generations[1 - side] and \
+                        depth[child] + other.g[child] < best:
+                    best, meet = depth[child] + other.g[child], child
+
+    problem.explored.update((c % width, c // width) for c in expanded)
+
+    if meet < 0:
+        return Solution(SolStat.FAILURE)
+
+    # Cells from the start to the meeting cell, and then to the goal
+    cells = buffers[0].cells(meet)
+    cell = buffers[1].parent[meet]
+    while cell >= 0:
+        cells.append(cell)
+        cell = buffers[1].parent[cell]
+
+    for c in cells[1:]:
+        coord = (c % width, c // width)
+        child = Node(coord, node.cost + 1, node,
+                     DIR_DIFF[(node.coord[0] - coord[0],
+                               node.coord[1] - coord[1])])
+        node.children.append(child)
+        node = child
+
+    return Solution(SolStat.SUCCESS, node)
 
 
 def __not_in_front(n, exp): return not any([f.coord == n for f in exp])
@@ -477,30 +1313,46 @@ def df_search(problem, actions, enhance=False):
     """
 
     problem.explored.add(problem.initial.coord)
-    return __dfs_recursive(problem, actions, problem.initial, enhance)
 
+    if not problem.is_goal(problem.initial) and not problem.is_reachable():
+        return Solution(SolStat.FAILURE)
+
+    return __dfs_stack(problem, actions, problem.initial, enhance)
 
-def __dfs_recursive(problem, actions, node, enhance):
+
+def __dfs_stack(problem, actions, node, enhance):
     """
-    Recursive auxiliary function for the df_search.
+    Auxiliary function for the df_search. The path being explored is kept in
+    an explicit stack instead of recursive calls, so paths of any length can
+    be followed. Every entry of the stack has a node and an iterator over the
+    actions that are left to try from it.
     """
     if problem.is_goal(node):
         return Solution(SolStat.SUCCESS, node)
 
-    # The generation of states should be according to the order of the actions.
-    for action in actions:
-        child = problem.get_child(node, action, enhance)
+    stack = [(node, iter(actions))]
+
+    while stack:
+        node, pending = stack[-1]
+
+        # The generation of states should be according to the order of the
+        # actions, continuing from the last action tried on the node.
+        for action in pending:
+            child = problem.get_child(node, action, enhance)
 
-        # Not all states generate another state with all actions.
-        if child and child.coord not in problem.explored:
-            problem.explored.add(child.coord)
-            result = __dfs_recursive(problem, actions, child, enhance)
+            # Not all states generate another state with all actions.
+            if child and child.coord not in problem.explored:
+                problem.explored.add(child.coord)
 
-            # If the the goal was found on a child, return that child
-            if result == SolStat.SUCCESS:
-                return result
+                if problem.is_goal(child):
+                    return Solution(SolStat.SUCCESS, child)
+
+                stack.append((child, iter(actions)))
+                break
+        else:
+            # Dead end
+            stack.pop()
 
-    # Dead end
     return Solution(SolStat.FAILURE)
 
 # Depth limited search
@@ -521,42 +1373,62 @@ def dl_search(problem, actions, limit, enhance=False):
     is not found within that limit then a CUTOFF solution is returned.
 
     ACTIONS are also considered in order in which they are declared.
+
+    If the goal is in a region of the map that can't be reached from the
+    initial state, FAILURE is returned without searching.
     """
-    return dls_recursive(problem, actions, problem.initial, limit, enhance)
+    if not problem.is_goal(problem.initial) and not problem.is_reachable():
+        return Solution(SolStat.FAILURE)
 
+    return dls_stack(problem, actions, problem.initial, limit, enhance)
 
-def dls_recursive(problem, actions, node, limit, enhance):
+
+def dls_stack(problem, actions, node, limit, enhance):
     """
-    Recursive auxiliary function for the dl_search.
+    Auxiliary function for the dl_search. Like the df_search, the path being
+    explored is kept in an explicit stack. Every entry of the stack has a node,
+    an iterator over the actions that are left to try from it, the depth limit
+    left below it, and whether a cutoff ocurred below it.
     """
     if problem.is_goal(node):
         return Solution(SolStat.SUCCESS, node)
     elif limit == 0:
         return Solution(SolStat.CUTOFF)
 
-    cutoff_ocurred = False
-    for action in actions:
-        child = problem.get_child(node, action, enhance)
+    stack = [[node, iter(actions), limit, False]]
 
-        if child and child.coord not in problem.explored:
-            problem.explored.add(child.coord)
-            result = \
-                dls_recursive(problem, actions, child, limit - 1, enhance)
-            if result == SolStat.CUTOFF:
-                cutoff_ocurred = True
+    while stack:
+        frame = stack[-1]
+        node, pending, limit = frame[0], frame[1], frame[2]
 
-            elif result == SolStat.SUCCESS:
-                return result
+        for action in pending:
+            child = problem.get_child(node, action, enhance)
 
-    if cutoff_ocurred:
-        return Solution(SolStat.CUTOFF)
+            if child and child.coord not in problem.explored:
+                problem.explored.add(child.coord)
+
+                if problem.is_goal(child):
+                    return Solution(SolStat.SUCCESS, child)
+                elif limit == 1:
+                    frame[3] = True
+                else:
+                    stack.append([child, iter(actions), limit - 1, False])
+                    break
+        else:
+            # Every action was tried, so the cutoff goes up to the parent
+            stack.pop()
+            if stack:
+                stack[-1][3] = stack[-1][3] or frame[3]
+            elif frame[3]:
+                return Solution(SolStat.CUTOFF)
 
     return Solution(SolStat.FAILURE)
 
 # Iterative deepening search
 
 
-def id_search(problem, actions, depth=1, increment=1, enhance=False):
+def id_search(problem, actions, depth=1, increment=1, enhance=False,
+              incremental=False):
     """
     id_search(problem, actions, depth, increment) -> solution
 
@@ -568,21 +1440,160 @@ def id_search(problem, actions, depth=1, increment=1, enhance=False):
     considering a DEPTH limit in which a solution must be found. If a CUTOFF
     solution, then the depth limit is INCREMENTED and the search algorithm
     is invoked with the new depth limit, either a SUCCESS or FAILURE is returned.
+
+    INCREMENT may also be a function that receives a depth limit and returns
+    the next one, e.g. lambda d: d * 2 doubles the limit every time.
+
+    If INCREMENTAL, the shallowest depth at which every cell was reached is
+    remembered between depth limits (see incremental_id_search). Paths may
+    differ: every depth limited search here marks the cells it reaches as
+    explored, so a cell first reached through a long path isn't entered again
+    through a shorter one, and the path found may be longer than needed.
     """
+    if not problem.is_goal(problem.initial) and not problem.is_reachable():
+        return Solution(SolStat.FAILURE)
+
+    if incremental:
+        return incremental_id_search(problem, actions, depth, increment,
+                                     enhance)
+
     while True:
         result = dl_search(problem, actions, depth, enhance)
         if result != SolStat.CUTOFF:
             return result
 
         problem.initial.children.clear()
-        depth += increment
+        depth = increment(depth) if callable(increment) else depth + increment
         problem.reset_explored()
 
 
+def incremental_id_search(problem, actions, depth=1, increment=1,
+                          enhance=False):
+    """
+    incremental_id_search(problem, actions, depth, increment) -> solution
+
+    Iterative deepening search that remembers, for every cell, the shallowest
+    depth at which it has been reached (in the shared SearchBuffers). Every
+    depth limit is searched depth first on cell ids, in the order of the
+    ACTIONS, but a cell is only entered if it wasn't reached before at a
+    shallower depth, or at the same depth during the same limit, so the work
+    of every limit is about one visit per cell instead of one per path.
+
+    DEPTH and INCREMENT are those of id_search; growing schedules (like
+    doubling) make the total work close to that of the last limit. If ENHANCE,
+    corridors are skipped through the decision graph of the map. Nodes are
+    only built for the path of the solution.
+
+    Since cells are entered again when they are reached through a shallower
+    path, the status is the same of id_search but the path may not be: with an
+    INCREMENT of 1, it's the first of the shortest paths in the order of the
+    ACTIONS (the one that always takes the first action that gets closer to
+    the goal), while id_search returns the first path its depth limited
+    searches find, which may be longer.
+    """
+    start_node = problem.initial
+
+    if problem.is_goal(start_node):
+        return Solution(SolStat.SUCCESS, start_node)
+
+    gmap = problem.gmap
+    if gmap.get_terrain(start_node.coord) is None:
+        return Solution(SolStat.FAILURE)
+
+    width, height = gmap.width, gmap.height
+    tiles = gmap.tiles
+    wall = Terrain.WALL.value
+    start = start_node.coord[1] * width + start_node.coord[0]
+    goal = problem.goal[1] * width + problem.goal[0] \
+        if gmap.get_terrain(problem.goal) is not None else -1
+    moves = [(action, DIRECTIONS[action.value]) for action in actions]
+
+    buffers = SearchBuffers.of(gmap)
+    best, reached, visited = buffers.g, buffers.seen, buffers.closed
+    base = buffers.start()
+
+    best[start] = 0
+    reached[start] = base
+
+    while True:
+        generation = buffers.start()
+        visited[start] = generation
+        walked = [start]
+        cutoff = False
+
+        # Entries of the stack: cell, action that reached it, depth and the
+        # iterator over the moves left to try from it.
+        stack = [(start, None, 0, iter(moves))]
+
+        while stack:
+            cell, _, d, pending = stack[-1]
+            x, y = cell % width, cell // width
+
+            for action, (dx, dy) in pending:
+                nx, ny = x + dx, y + dy
+                if not (0 <= nx < width and 0 <= ny < height):
+                    continue
+
+                child = ny * width + nx
+                if tiles[child] == wall:
+                    continue
+
+                if enhance:
+                    child, interior = problem.corridor(cell, child)
+                    walked.extend(interior)
+
+                # Already reached through a shallower (or as deep) path
+                if reached[child] >= base and (best[child] < d + 1 or (
+                        best[child] == d + 1 and visited[child] == generation)):
+                    continue
+
+                best[child] = d + 1
+                reached[child] = base
+                visited[child] = generation
+                walked.append(child)
+
+                if child == goal:
+                    problem.explored.update(
+                        (c % width, c // width) for c in walked)
+                    return Solution(SolStat.SUCCESS, __stack_nodes(
+                        problem, stack, child, action))
+
+                if d + 1 == depth:
+                    cutoff = True
+                    continue
+
+                stack.append((child, action, d + 1, iter(moves)))
+                break
+            else:
+                stack.pop()
+
+        if not cutoff:
+            problem.explored.update((c % width, c // width) for c in walked)
+            return Solution(SolStat.FAILURE)
+
+        depth = increment(depth) if callable(increment) else depth + increment
+
+
+def __stack_nodes(problem, stack, cell, action):
+    """
+    Builds the chain of Nodes of the path in the STACK of a search on cell
+    ids, followed by CELL (reached with ACTION), and returns the last one.
+    """
+    width = problem.gmap.width
+    node = problem.initial
+
+    for c, a in [(c, a) for c, a, _, _ in stack[1:]] + [(cell, action)]:
+        child = Node((c % width, c // width), node.cost + 1, node, a)
+        node.children.append(child)
+        node = child
+
+    return node
+
+
 def schedule(matrix):
     sp = ScheduleProblem(matrix)
 
-    frontier = StateHeap(sp.start)
+    frontier = PriorityQueue(sp.start, priority=lambda n: n.f)
 
     while frontier:
         node = frontier.pop()
@@ -592,7 +1603,7 @@ def schedule(matrix):
             print('Cost of best possible solution:', node.f)
             return ScheduleProblem.order_missions(node)
         for c in children:
-            frontier.push(c)
+            frontier.push(c, c.f)
 
 
 #
@@ -602,32 +1613,905 @@ def schedule(matrix):
 
 def astar_search(problem):
     """
-    Implementation of the recursive best first search, a heuristic algorithm
+    Implementation of the A* search, a heuristic algorithm that expands nodes
+    in order of their accumulated cost plus their manhattan distance to the
+    goal.
+
+    The cheapest known cost of every tile is kept, so a successor is only
+    pushed when it reaches its tile cheaper than before, and queued nodes that
+    were beaten by a cheaper path are skipped when they are popped. The goal is
+    tested when it's popped, so the solution has the least accumulated cost.
+
+    Tiles that the costs of the problem don't allow to enter are never
+    generated, and if the goal is in a region that can't be reached with those
+    costs, FAILURE is returned without searching.
     """
     problem.heuristic_init()
 
     if problem.is_goal(problem.initial):
         return Solution(SolStat.SUCCESS, problem.initial)
 
-    heap = StateHeap()
-    heap.push(problem.initial)
+    if not problem.is_reachable():
+        return Solution(SolStat.FAILURE)
+
+    # Cheapest accumulated cost found for every tile
+    best = {problem.initial.coord: problem.initial.acc_cost}
+
+    # Among nodes with the same f, the deepest ones (highest accumulated cost)
+    # are expanded first, since they are closer to the goal. With integer costs
+    # a bucket queue is used instead of a heap.
+    heap = cost_queue(problem.raster.integral, lambda n: -n.acc_cost)
+    heap.push(problem.initial, problem.initial.f)
+    problem.frontier = heap
 
     while True:
         if heap.empty():
             return Solution(SolStat.FAILURE)
 
         node = heap.pop()
+
+        # A cheaper path to this tile was queued after this one
+        if node.acc_cost > best[node.coord]:
+            continue
+
+        if problem.is_goal(node):
+            return Solution(SolStat.SUCCESS, node)
+
         problem.explored.add(node.coord)
 
-        succesors = problem.get_succesors(node)
+        for suc in problem.get_succesors(node):
+            if suc.acc_cost < best.get(suc.coord, math.inf):
+                best[suc.coord] = suc.acc_cost
+                heap.push(suc, suc.f)
+
+
+def cell_astar_search(problem, jump=True):
+    """
+    Implementation of the A* search that works on cell ids and flat arrays
+    (see SearchBuffers) instead of nodes. The costs, parents and expanded
+    cells are kept in the shared buffers, and HNode objects are only built for
+    the path of the solution, which has the same shape as the one returned by
+    astar_search.
+
+    The heuristic is the estimate of the problem (see
+    MapProblem.estimator). If a better path to a cell that was already
+    expanded is found anyway, the cell is opened again.
+
+    When every tile costs the same, maps held in memory are searched with
+    jump_point_search instead, which finds paths of the same cost expanding
+    far fewer cells. Unlike a breadth first search, A* has no early goal test
+    nor order of expansion that callers rely on, so this is only skipped if
+    JUMP is false (or the problem uses landmarks, which were asked for).
+    """
+    problem.heuristic_init()
+
+    if problem.is_goal(problem.initial):
+        return Solution(SolStat.SUCCESS, problem.initial)
+
+    if not problem.is_reachable():
+        return Solution(SolStat.FAILURE)
+
+    # Every tile costs the same, so only jump points need to be expanded
+    if jump and not problem.landmarks and \
+            isinstance(problem.gmap.tiles, (bytes, bytearray, memoryview)) \
+            and problem.raster.uniform() is not None:
+        return jump_point_search(problem)
+
+    gmap = problem.gmap
+    width = gmap.width
+    gx, gy = problem.goal
+    start = problem.initial.coord[1] * width + problem.initial.coord[0]
+    goal = gy * width + gx
+
+    neighbors = gmap.adjacency().neighbors
+    costs = problem.raster.costs
+    estimate = problem.estimate
+    buffers = SearchBuffers.of(gmap)
+    g, parent, seen, closed = \
+        buffers.g, buffers.parent, buffers.seen, buffers.closed
+    generation = buffers.start()
+
+    g[start] = 0
+    parent[start] = -1
+    seen[start] = generation
+
+    heap = cost_queue(problem.raster.integral, lambda c: -g[c])
+    heap.push(start, problem.initial.f)
+    problem.frontier = heap
+    expanded = []
+
+    while not heap.empty():
+        cell = heap.pop()
+
+        if closed[cell] == generation:
+            continue
+
+        if cell == goal:
+            problem.explored.update((c % width, c // width) for c in expanded)
+            return Solution(SolStat.SUCCESS, __cell_nodes(problem, buffers,
+                                                          cell))
+
+        closed[cell] = generation
+        expanded.append(cell)
+        acc = g[cell]
+
+        for n in neighbors(cell):
+            cost = costs[n]
+
+            # Tiles that can't be entered are never generated
+            if cost < 0:
+                continue
+
+            ng = acc + cost
+            if seen[n] != generation or ng < g[n]:
+                seen[n] = generation
+                closed[n] = 0
+                g[n] = ng
+                parent[n] = cell
+                heap.push(n, ng + estimate(n))
+
+    problem.explored.update((c % width, c // width) for c in expanded)
+    return Solution(SolStat.FAILURE)
+
+
+# Directions of the moves of jump_point_search, as bits
+JUMP_RIGHT, JUMP_LEFT, JUMP_DOWN, JUMP_UP = 1, 2, 4, 8
+
+
+def jump_point_search(problem):
+    """
+    Jump Point Search for maps where every tile that can be entered has the
+    same cost (tiles that are not walls, for problems without costs).
+
+    Among the shortest paths, only those that move vertically as soon as they
+    can are followed, so a horizontal move only turns vertical on a tile where
+    the previous one couldn't. Horizontal jumps go straight until they find
+    such a tile (or the goal), and vertical jumps until a horizontal jump from
+    one of their tiles finds something. Only the tiles where jumps stop (jump
+    points) are queued, in an A* with the manhattan distance, so open rooms are
+    crossed without expanding their tiles.
+
+    The path of the solution is filled in between jump points. It has Nodes
+    (like bf_search) for problems without costs and HNodes (like
+    cell_astar_search) for problems with costs.
+    """
+    gmap = problem.gmap
+    width = gmap.width
+    size = width * gmap.height
+    last_row = size - width
+
+    if problem.raster is None:
+        table = bytes(int(v != Terrain.WALL.value) for v in range(256))
+        cost = 1
+    else:
+        table = bytes(int(c >= 0) for c in problem.raster.table)
+        cost = problem.raster.uniform()
+
+    free = bytes(gmap.tiles).translate(table)
+
+    start = problem.initial.coord[1] * width + problem.initial.coord[0]
+    gx, gy = problem.goal
+    goal = gy * width + gx if gmap.get_terrain(problem.goal) is not None \
+        else -1
+
+    def jump_horizontal(cell, dx):
+        x = cell % width
+        while True:
+            x += dx
+            cell += dx
+            if not 0 <= x < width or not free[cell]:
+                return -1
+
+            if cell == goal:
+                return cell
+
+            # A vertical move that the previous tile couldn't do
+            if cell >= width and free[cell - width] and \
+                    not free[cell - width - dx]:
+                return cell
+            if cell < last_row and free[cell + width] and \
+                    not free[cell + width - dx]:
+                return cell
+
+    def jump_vertical(cell, dy):
+        while True:
+            cell += dy
+            if not 0 <= cell < size or not free[cell]:
+                return -1
+
+            if cell == goal or jump_horizontal(cell, 1) >= 0 or \
+                    jump_horizontal(cell, -1) >= 0:
+                return cell
+
+    buffers = SearchBuffers.get(size)
+    # The step buffer keeps the directions in which jump points were reached
+    g, parent, reached, seen, closed = buffers.g, buffers.parent, \
+        buffers.step, buffers.seen, buffers.closed
+    generation = buffers.start()
+
+    g[start] = 0
+    parent[start] = -1
+    reached[start] = 0
+    seen[start] = generation
+
+    heap = BucketQueue()
+    heap.push(start, 0)
+    problem.frontier = heap
+    expanded = []
+    found = False
+
+    while not heap.empty():
+        cell = heap.pop()
+
+        if closed[cell] == generation:
+            continue
+
+        if cell == goal:
+            found = True
+            break
+
+        closed[cell] = generation
+        expanded.append(cell)
+
+        # Directions to jump to, according to how the cell was reached
+        mask = reached[cell]
+        moves = 0 if mask else JUMP_RIGHT | JUMP_LEFT | JUMP_DOWN | JUMP_UP
+
+        for dx, bit in ((1, JUMP_RIGHT), (-1, JUMP_LEFT)):
+            if mask & bit:
+                moves |= bit
+                if cell >= width and free[cell - width] and \
+                        not free[cell - width - dx]:
+                    moves |= JUMP_UP
+                if cell < last_row and free[cell + width] and \
+                        not free[cell + width - dx]:
+                    moves |= JUMP_DOWN
+        for bit in (JUMP_DOWN, JUMP_UP):
+            if mask & bit:
+                moves |= bit | JUMP_RIGHT | JUMP_LEFT
+
+        for bit, jump, delta in ((JUMP_UP, jump_vertical, -width),
+                                 (JUMP_DOWN, jump_vertical, width),
+                                 (JUMP_LEFT, jump_horizontal, -1),
+                                 (JUMP_RIGHT, jump_horizontal, 1)):
+            if not moves & bit:
+                continue
+
+            point = jump(cell, delta)
+            if point < 0:
+                continue
+
+            ng = g[cell] + abs(point - cell) // abs(delta)
+
+            if seen[point] != generation or ng < g[point]:
+                seen[point] = generation
+                g[point] = ng
+                parent[point] = cell
+                reached[point] = bit
+            elif ng == g[point] and not reached[point] & bit:
+                # Reached as cheaply in another direction, which may allow
+                # other jumps
+                reached[point] |= bit
+            else:
+                continue
+
+            closed[point] = 0
+            x, y = point % width, point // width
+            heap.push(point, ng + abs(x - gx) + abs(y - gy))
+
+    problem.explored.update((c % width, c // width) for c in expanded)
+
+    if not found:
+        return Solution(SolStat.FAILURE)
+
+    # Fill in the tiles between jump points, from the start
+    points = buffers.cells(goal)
+    path = [start]
+    for point in points[1:]:
+        delta = width if abs(point - path[-1]) >= width else 1
+        if point < path[-1]:
+            delta = -delta
+        path.extend(range(path[-1] + delta, point + delta, delta))
+
+    for i in range(1, len(path)):
+        parent[path[i]] = path[i - 1]
+        g[path[i]] = i * cost
+
+    if problem.raster is not None:
+        return Solution(SolStat.SUCCESS, __cell_nodes(problem, buffers, goal))
+
+    node = problem.initial
+    for c in path[1:]:
+        coord = (c % width, c // width)
+        child = Node(coord, node.cost + 1, node,
+                     DIR_DIFF[(node.coord[0] - coord[0],
+                               node.coord[1] - coord[1])])
+        node.children.append(child)
+        node = child
+
+    return Solution(SolStat.SUCCESS, node)
+
+
+def bidirectional_astar_search(problem):
+    """
+    Bidirectional version of cell_astar_search. A forward A* grows from the
+    initial state towards the goal, and a backward one from the goal towards
+    the initial state (with the manhattan distance to it), expanding the
+    smallest frontier at a time. The cost of a path through a cell reached by
+    both searches is the sum of their accumulated costs, since the backward
+    search pays the cost of a tile when it leaves it (which is when the path
+    enters it).
+
+    Both searches use the average of the two manhattan distances as their
+    heuristic: the priority of a cell in the forward search is twice its cost
+    plus its distance to the goal minus its distance to the start, and the
+    opposite for the backward search (priorities are doubled so they stay
+    integers). With these priorities, a path cheaper than the best one found
+    can't exist once the smallest priorities of both frontiers add up to twice
+    its cost, which is when the search stops.
+    """
+    problem.heuristic_init()
+
+    if problem.is_goal(problem.initial):
+        return Solution(SolStat.SUCCESS, problem.initial)
 
-        for suc in succesors:
-            # print(node.coord, node.cost,suc.coord, suc.cost)
-            if suc.coord not in problem.explored:
-                if problem.is_goal(suc):
-                    return Solution(SolStat.SUCCESS, suc)
+    if not problem.is_reachable():
+        return Solution(SolStat.FAILURE)
+
+    gmap = problem.gmap
+    if gmap.get_terrain(problem.initial.coord) is None or \
+            gmap.get_terrain(problem.goal) is None:
+        return Solution(SolStat.FAILURE)
+
+    width = gmap.width
+    start = problem.initial.coord[1] * width + problem.initial.coord[0]
+    goal = problem.goal[1] * width + problem.goal[0]
+    sx, sy = problem.initial.coord
+    gx, gy = problem.goal
+
+    neighbors = gmap.adjacency().neighbors
+    costs = problem.raster.costs
+
+    # Index 0 of each tuple is the forward search, 1 the backward one
+    buffers = (SearchBuffers.of(gmap, 0),
+               SearchBuffers.of(gmap, 1))
+    generations = (buffers[0].start(), buffers[1].start())
+    heaps = (cost_queue(problem.raster.integral, lambda c: -buffers[0].g[c]),
+             cost_queue(problem.raster.integral, lambda c: -buffers[1].g[c]))
+
+    for side, cell in ((0, start), (1, goal)):
+        buffers[side].g[cell] = 0
+        buffers[side].parent[cell] = -1
+        buffers[side].seen[cell] = generations[side]
+        heaps[side].push(cell, 0)
+
+    problem.frontier = heaps[0]
+    expanded = []
+    best, meet = math.inf, -1
+
+    while not heaps[0].empty() and not heaps[1].empty():
+        if heaps[0].min_priority() + heaps[1].min_priority() >= 2 * best:
+            break
+
+        side = 0 if len(heaps[0]) <= len(heaps[1]) else 1
+        heap = heaps[side]
+        g, parent, seen, closed = buffers[side].g, buffers[side].parent, \
+            buffers[side].seen, buffers[side].closed
+        generation = generations[side]
+        other = buffers[1 - side]
+        sign = -1 if side else 1
+
+        cell = heap.pop()
+        if closed[cell] == generation:
+            continue
+
+        closed[cell] = generation
+        expanded.append(cell)
+        acc = g[cell]
+
+        # Going backwards, a cell is entered on the path when it's left
+        if side:
+            if costs[cell] < 0:
+                continue
+            acc += costs[cell]
+
+        for n in neighbors(cell):
+            if side:
+                # The start is never entered, so any cost is fine for it
+                if costs[n] < 0 and n != start:
+                    continue
+                ng = acc
+            else:
+                if costs[n] < 0:
+                    continue
+                ng = acc + costs[n]
+
+            if seen[n] != generation or ng < g[n]:
+                seen[n] = generation
+                closed[n] = 0
+                g[n] = ng
+                parent[n] = cell
+                x, y = n % width, n // width
+                heap.push(n, 2 * ng + sign * (abs(x - gx) + abs(y - gy) -
+                                              abs(x - sx) - abs(y - sy)))
+
+                if other.seen[n] == generations[1 - side] and \
+                        ng + other.g[n] < best:
+                    best, meet = ng + other.g[n], n
+
+    problem.explored.update((c % width, c // width) for c in expanded)
+
+    if meet < 0:
+        return Solution(SolStat.FAILURE)
+
+    # Join both halves in the forward buffers, so the path can be rebuilt
+    cell, g = meet, buffers[0].g
+    following = buffers[1].parent[cell]
+    while following >= 0:
+        buffers[0].parent[following] = cell
+        g[following] = g[cell] + costs[following]
+        cell, following = following, buffers[1].parent[following]
+
+    return Solution(SolStat.SUCCESS, __cell_nodes(problem, buffers[0], goal))
+
+
+def anytime_search(problem, weight=2.5, step=0.5, budget=None,
+                   expansions=None):
+    """
+    Anytime Repairing A* (ARA*) on cell ids and the shared buffers. A first
+    path is found quickly with weighted A* (the heuristic is multiplied by
+    WEIGHT), and it's improved by searching again with lower weights (STEP
+    less every time) while the budget lasts. Every new search reuses the
+    costs found by the previous ones, and only expands again the cells whose
+    costs improved.
+
+    budget     : Seconds of wall-clock time that the search may take.
+    expansions : Amount of cells that the search may expand.
+
+    The budgets only stop the improvements, so the first path is always
+    found. The bound of the solution tells how far from the cheapest path the
+    returned one may be (1 means that it's the cheapest). The heuristic is the
+    estimate of the problem (see MapProblem.estimator), which never
+    overestimates, so the bound holds for any costs.
+    """
+    problem.heuristic_init()
+
+    if problem.is_goal(problem.initial):
+        return Solution(SolStat.SUCCESS, problem.initial, bound=1)
+
+    if problem.gmap.get_terrain(problem.goal) is None or \
+            not problem.is_reachable():
+        return Solution(SolStat.FAILURE)
+
+    gmap = problem.gmap
+    width = gmap.width
+    gx, gy = problem.goal
+    start = problem.initial.coord[1] * width + problem.initial.coord[0]
+    goal = gy * width + gx
+    deadline = time.perf_counter() + budget if budget is not None else None
+
+    neighbors = gmap.adjacency().neighbors
+    costs = problem.raster.costs
+    h = problem.estimate
+    buffers = SearchBuffers.of(gmap)
+    g, parent, seen, closed = \
+        buffers.g, buffers.parent, buffers.seen, buffers.closed
+    generation = buffers.start()
+
+    g[start] = 0
+    parent[start] = -1
+    seen[start] = generation
+
+    opened = set([start])
+    incons = set()
+    expanded = []
+    path, bound = None, math.inf
+
+    heap = PriorityQueue(tiebreak=lambda c: -g[c])
+    heap.push(start, weight * h(start))
+
+    while True:
+        # Cells expanded by this round of the search
+        stamp = buffers.start()
+        exhausted = False
+
+        while not heap.empty():
+            cell = heap.get_min()
+            if cell not in opened:
+                heap.pop()
+                continue
+            if seen[goal] == generation and g[goal] <= heap.min_priority():
+                break
+
+            if path is not None and (
+                    (expansions is not None and len(expanded) >= expansions)
+                    or (deadline is not None
+                        and time.perf_counter() >= deadline)):
+                exhausted = True
+                break
+
+            heap.pop()
+            opened.discard(cell)
+            closed[cell] = stamp
+            expanded.append(cell)
+            acc = g[cell]
+
+            for n in neighbors(cell):
+                cost = costs[n]
+                if cost < 0:
+                    continue
+
+                ng = acc + cost
+                if seen[n] != generation or ng < g[n]:
+                    seen[n] = generation
+                    g[n] = ng
+                    parent[n] = cell
+
+                    # Cells expanded in this round wait for the next one
+                    if closed[n] == stamp:
+                        incons.add(n)
+                    else:
+                        opened.add(n)
+                        heap.push(n, ng + weight * h(n))
+
+        # Out of budget, the path of the last round is returned
+        if seen[goal] != generation or exhausted:
+            break
+
+        # The cells that are left bound the cost of the cheapest path
+        left = opened | incons
+        lower = min((g[c] + h(c) for c in left), default=g[goal])
+        path = buffers.cells(goal)
+        bound = max(1, min(weight, g[goal] / lower)) if lower else weight
+
+        if bound <= 1:
+            break
+
+        weight = max(1, weight - step)
+        heap = PriorityQueue(tiebreak=lambda c: -g[c])
+        for c in left:
+            heap.push(c, g[c] + weight * h(c))
+        opened = left
+        incons = set()
+
+    problem.frontier = heap
+    problem.explored.update((c % width, c // width) for c in expanded)
+
+    if path is None:
+        return Solution(SolStat.FAILURE)
+
+    buffers.parent[start] = -1
+    buffers.g[start] = 0
+    for prev, cell in zip(path, path[1:]):
+        buffers.parent[cell] = prev
+        buffers.g[cell] = buffers.g[prev] + costs[cell]
+
+    return Solution(SolStat.SUCCESS, __cell_nodes(problem, buffers, goal),
+                    bound=bound)
+
+
+def hierarchical_search(problem):
+    """
+    Hierarchical A* (HPA*) on the hierarchy of clusters of the map for the
+    costs of the problem (see maps.Hierarchy), which is built once for every
+    version of the map and species of hero.
+
+    The initial state (and its first steps, which may enter other clusters)
+    and the goal are connected to the nodes of their clusters, the path is
+    searched with A* on the abstract graph, and then refined into tiles inside
+    of the clusters it goes through. The paths found
+    are close to the cheapest ones, but may cost a little more, since they
+    have to cross between clusters through their transitions.
+    """
+    problem.heuristic_init()
+
+    if problem.is_goal(problem.initial):
+        return Solution(SolStat.SUCCESS, problem.initial)
+
+    if not problem.is_reachable():
+        return Solution(SolStat.FAILURE)
+
+    gmap = problem.gmap
+    if gmap.get_terrain(problem.initial.coord) is None or \
+            gmap.get_terrain(problem.goal) is None:
+        return Solution(SolStat.FAILURE)
+
+    width = gmap.width
+    start = problem.initial.coord[1] * width + problem.initial.coord[0]
+    gx, gy = problem.goal
+    goal = gy * width + gx
+
+    hierarchy = gmap.hierarchy(cost_table(problem.costs))
+    costs = problem.raster.costs
+
+    def local_edges(cell):
+        # Edges from a cell to the nodes of its cluster, and to the goal if
+        # it's in the same cluster
+        cluster = hierarchy.cluster(cell)
+        targets = hierarchy.nodes[cluster] + (
+            [goal] if cluster == hierarchy.cluster(goal) else [])
+        distances = hierarchy.distances(cell, targets)[0]
+        return [(n, distances[n]) for n in targets
+                if n in distances and n != cell] + \
+            list(hierarchy.edges.get(cell, ()))
+
+    # The start may not be enterable, so its first steps (which may lead into
+    # other clusters) are also edges, and they are connected to their clusters
+    extra = {start: local_edges(start)}
+    for n in gmap.adjacency().neighbors(start):
+        if costs[n] >= 0 and hierarchy.cluster(n) != hierarchy.cluster(start):
+            extra[start].append((n, costs[n]))
+            extra[n] = local_edges(n)
+
+    distances = hierarchy.distances(
+        goal, hierarchy.nodes[hierarchy.cluster(goal)], reverse=True)[0]
+    goal_edges = dict((n, d) for n, d in distances.items()
+                      if n in hierarchy.edges)
+
+    # The manhattan distance times the cheapest cost never overestimates
+    cheapest = min((c for c in problem.raster.table if c >= 0), default=1)
+
+    best = {start: 0}
+    parents = {start: -1}
+    heap = PriorityQueue(tiebreak=lambda n: -best[n])
+    heap.push(start, 0)
+    problem.frontier = heap
+    expanded = set()
+    found = False
+
+    while not heap.empty():
+        node = heap.pop()
+
+        if node in expanded:
+            continue
+        if node == goal:
+            found = True
+            break
+
+        expanded.add(node)
+        edges = extra[node] if node in extra else \
+            hierarchy.edges.get(node, ())
+        if node in goal_edges:
+            edges = list(edges) + [(goal, goal_edges[node])]
+
+        for n, cost in edges:
+            ng = best[node] + cost
+            if ng < best.get(n, math.inf):
+                best[n] = ng
+                parents[n] = node
+                heap.push(n, ng + cheapest * (abs(n % width - gx) +
+                                              abs(n // width - gy)))
+
+    problem.explored.update((c % width, c // width) for c in expanded)
+
+    if not found:
+        return Solution(SolStat.FAILURE)
+
+    # Abstract path, from the start to the goal
+    points = []
+    node = goal
+    while node >= 0:
+        points.append(node)
+        node = parents[node]
+    points.reverse()
+
+    # Refine every edge of the abstract path into tiles
+    tiles = [start]
+    for a, b in zip(points, points[1:]):
+        if abs(a - b) == width or (abs(a - b) == 1 and a // width == b // width):
+            tiles.append(b)
+            continue
+
+        local = hierarchy.local_path(a, b)
+        if local is None:
+            # Edges always have a path inside of their cluster, but if one is
+            # missing, the path is found without the hierarchy
+            return cell_astar_search(problem)
+        tiles.extend(local[1:])
+
+    # Paths refined in the same cluster may cross each other, so the loops
+    # between two visits of a tile are cut (which never makes it costlier).
+    path = []
+    index = {}
+    for cell in tiles:
+        if cell in index:
+            for c in path[index[cell] + 1:]:
+                del index[c]
+            del path[index[cell] + 1:]
+        else:
+            index[cell] = len(path)
+            path.append(cell)
+
+    buffers = SearchBuffers.of(gmap)
+    buffers.parent[start] = -1
+    buffers.g[start] = 0
+    for prev, cell in zip(path, path[1:]):
+        buffers.parent[cell] = prev
+        buffers.g[cell] = buffers.g[prev] + costs[cell]
+
+    return Solution(SolStat.SUCCESS, __cell_nodes(problem, buffers, goal))
+
+
+def dijkstra_search(problem, goals):
+    """
+    One to many search: Dijkstra's algorithm from the initial state of the
+    problem, on cell ids and the shared buffers like cell_astar_search, that
+    stops once the cheapest paths to all of the GOALS (coordinates) are known.
+    The goal of the problem is only used if it's one of the GOALS.
+
+    Returns a dictionary with the last HNode of the path to every goal (the
+    same chain that cell_astar_search returns for that goal), or None for the
+    goals that can't be reached.
+    """
+    problem.heuristic_init()
+
+    gmap = problem.gmap
+    width = gmap.width
+    start = problem.initial.coord[1] * width + problem.initial.coord[0]
+    components = gmap.components(problem.passable)
+
+    found = dict((goal, None) for goal in goals)
+    pending = {}
+    for goal in found:
+        if gmap.get_terrain(goal) is None:
+            continue
+
+        cell = goal[1] * width + goal[0]
+        if components is None or gmap.get_terrain(problem.initial.coord) \
+                is None or components.reachable(start, cell):
+            pending[cell] = goal
+
+    neighbors = gmap.adjacency().neighbors
+    costs = problem.raster.costs
+    buffers = SearchBuffers.of(gmap)
+    g, parent, seen, closed = \
+        buffers.g, buffers.parent, buffers.seen, buffers.closed
+    generation = buffers.start()
+
+    g[start] = 0
+    parent[start] = -1
+    seen[start] = generation
+
+    heap = cost_queue(problem.raster.integral)
+    heap.push(start, 0)
+    problem.frontier = heap
+    expanded = []
+
+    while pending and not heap.empty():
+        cell = heap.pop()
+
+        if closed[cell] == generation:
+            continue
+
+        closed[cell] = generation
+        expanded.append(cell)
+
+        goal = pending.pop(cell, None)
+        if goal is not None:
+            found[goal] = __cell_nodes(problem, buffers, cell, goal)
+
+        acc = g[cell]
+        for n in neighbors(cell):
+            cost = costs[n]
+            if cost < 0:
+                continue
+
+            ng = acc + cost
+            if seen[n] != generation or ng < g[n]:
+                seen[n] = generation
+                g[n] = ng
+                parent[n] = cell
+                heap.push(n, ng)
+
+    problem.explored.update((c % width, c // width) for c in expanded)
+    return found
+
+
+def field_search(problem, cache=None):
+    """
+    Finds the cheapest path to the goal by walking down its DistanceField,
+    taken from a DistanceCache (the shared distance_cache by default). Building
+    the field costs a search of the whole region of the goal, but once it's in
+    the cache, paths to the goal from anywhere only cost their length.
+
+    The path is returned in the same chain of HNodes as cell_astar_search.
+    """
+    problem.heuristic_init()
+
+    if problem.is_goal(problem.initial):
+        return Solution(SolStat.SUCCESS, problem.initial)
+
+    if problem.gmap.get_terrain(problem.goal) is None or \
+            not problem.is_reachable():
+        return Solution(SolStat.FAILURE)
+
+    gmap = problem.gmap
+    width = gmap.width
+    start = problem.initial.coord[1] * width + problem.initial.coord[0]
+    goal = problem.goal[1] * width + problem.goal[0]
+
+    cache = cache if cache is not None else distance_cache
+    path = cache.field(gmap, problem.raster, goal).path(start)
+    if path is None:
+        return Solution(SolStat.FAILURE)
+
+    problem.explored.update((c % width, c // width) for c in path)
+
+    costs = problem.raster.costs
+    buffers = SearchBuffers.of(gmap)
+    buffers.parent[start] = -1
+    buffers.g[start] = 0
+    for prev, cell in zip(path, path[1:]):
+        buffers.parent[cell] = prev
+        buffers.g[cell] = buffers.g[prev] + costs[cell]
+
+    return Solution(SolStat.SUCCESS, __cell_nodes(problem, buffers, goal))
+
+
+def incremental_search(planner):
+    """
+    Finds the cheapest path between the start and the goal of an
+    IncrementalPlanner, which only repairs its last search if the map changed
+    since then. The path is returned in the same chain of HNodes as
+    cell_astar_search.
+    """
+    problem = MapProblem(planner.gmap, planner.start, planner.goal,
+                         planner.costs)
+    problem.heuristic_init()
+
+    if problem.is_goal(problem.initial):
+        return Solution(SolStat.SUCCESS, problem.initial)
+
+    if problem.gmap.get_terrain(problem.goal) is None or \
+            not problem.is_reachable():
+        return Solution(SolStat.FAILURE)
+
+    path = planner.path()
+    width = problem.gmap.width
+    problem.frontier = planner.queue
+    problem.explored.update((c % width, c // width) for c in planner.expanded)
+
+    if path is None:
+        return Solution(SolStat.FAILURE)
+
+    costs = problem.raster.costs
+    buffers = SearchBuffers.of(problem.gmap)
+    buffers.parent[path[0]] = -1
+    buffers.g[path[0]] = 0
+    for prev, cell in zip(path, path[1:]):
+        buffers.parent[cell] = prev
+        buffers.g[cell] = buffers.g[prev] + costs[cell]
+
+    return Solution(SolStat.SUCCESS, __cell_nodes(problem, buffers, path[-1]))
+
+
+def __cell_nodes(problem, buffers, cell, goal=None):
+    """
+    Builds the chain of HNodes of the path to CELL found by a search on cell
+    ids, and returns the last one. The distances of the nodes are measured to
+    GOAL, the goal of the problem by default.
+    """
+    width = problem.gmap.width
+    costs = problem.raster.costs
+    integral = problem.raster.integral
+    goal = goal or problem.goal
+    node = None
+
+    for c in buffers.cells(cell):
+        coord = (c % width, c // width)
+        acc = int(buffers.g[c]) if integral else buffers.g[c]
+        dist = problem.lowest * (math.fabs(coord[0] - goal[0]) +
+                                 math.fabs(coord[1] - goal[1]))
+
+        if node is None:
+            node = HNode(coord, 0, dist=dist)
+        else:
+            node = HNode(coord, costs[c], node,
+                         DIR_DIFF[(node.coord[0] - coord[0],
+                                   node.coord[1] - coord[1])],
+                         acc, dist)
 
-                heap.push(suc)
+    return node
 
 
 if __name__ == '__main__':
@@ -726,9 +2610,10 @@ if __name__ == '__main__':
         dad = node.parent
 
         while dad:
-            path.insert(0, dad)
+            path.append(dad)
             dad = dad.parent
 
+        path.reverse()
         for p in path:
             print(p)
 
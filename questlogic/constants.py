@@ -44,6 +44,14 @@ class Algorithm(Enum):
     BFS = 1
     DFS = 2
     IDS = 3
+    BIBFS = 4
+    ASTAR = 5
+    BIASTAR = 6
+    HPASTAR = 7
+    LPASTAR = 8
+    ARASTAR = 9
+    JPS = 10
+    ALT = 11
 
 
 class Heroes(Enum):
@@ -0,0 +1,254 @@
+"""
+Procedural generation of maps.
+
+Maps are generated row by row from a seeded random generator, so the same seed
+and parameters always produce the same map. Terrains are chosen by translating
+random bytes through tables built from terrain weights, which keeps the work
+per tile inside of bytes.translate instead of Python loops.
+
+When biomes are used, the map is divided in square blocks and every block gets
+a biome from two value noise fields (elevation and moisture). Each biome has its
+own terrain weights.
+
+This module can also be executed to write generated maps into files:
+
+    python questlogic/generator.py 1000 1000 -s 42 --biomes -o world.aqm
+"""
+import argparse
+import random
+import sys
+import os
+
+sys.path.append(os.path.join(os.path.dirname(__file__)))
+
+import constants
+
+Terrain = constants.Terrain
+
+# Weights used when none are given: walls and roads in equal parts.
+DEFAULT_WEIGHTS = {
+    Terrain.WALL: 1,
+    Terrain.ROAD: 1,
+}
+
+# Terrain weights of every biome. Biomes are chosen with the elevation (rows,
+# from low to high) and the moisture (columns, from dry to wet) of a block.
+BIOMES = (
+    # Low lands
+    (
+        {Terrain.SAND: 6, Terrain.LAND: 2, Terrain.ROAD: 1},
+        {Terrain.WATER: 5, Terrain.SAND: 2, Terrain.SWAMP: 1},
+        {Terrain.WATER: 8, Terrain.SWAMP: 1},
+    ),
+    # Plains
+    (
+        {Terrain.SAND: 4, Terrain.LAND: 3, Terrain.ROAD: 1},
+        {Terrain.LAND: 6, Terrain.ROAD: 1, Terrain.FOREST: 2},
+        {Terrain.SWAMP: 5, Terrain.WATER: 2, Terrain.FOREST: 2},
+    ),
+    # Hills
+    (
+        {Terrain.LAND: 3, Terrain.MOUNTAIN: 2, Terrain.WALL: 1},
+        {Terrain.FOREST: 6, Terrain.LAND: 2, Terrain.ROAD: 1},
+        {Terrain.FOREST: 5, Terrain.SWAMP: 2, Terrain.WATER: 1},
+    ),
+    # Mountains
+    (
+        {Terrain.MOUNTAIN: 5, Terrain.WALL: 2, Terrain.ROAD: 1},
+        {Terrain.MOUNTAIN: 4, Terrain.SNOW: 2, Terrain.WALL: 1},
+        {Terrain.SNOW: 6, Terrain.MOUNTAIN: 2, Terrain.WALL: 1},
+    ),
+)
+
+
+def random_bytes(rng, n):
+    """
+    Returns N random bytes from the generator RNG. It's the same as
+    rng.randbytes(n), which is not available before Python 3.9.
+    """
+    if not n:
+        return b''
+    return rng.getrandbits(n * 8).to_bytes(n, 'little')
+
+
+def terrain_table(weights):
+    """
+    Builds a translation table for bytes.translate that turns a random byte
+    into a terrain value. Each terrain gets a share of the 256 bytes that is
+    proportional to its weight (terrains may be given as Terrain members or
+    their values).
+
+    Raises ValueError if no terrain has a positive weight.
+    """
+    weights = dict((Terrain(t).value, w) for t, w in weights.items() if w > 0)
+    total = sum(weights.values())
+
+    if not total:
+        raise ValueError('terrain weights must have a positive value')
+
+    # Largest remainder distribution of the 256 bytes
+    shares = dict((t, 256 * w / total) for t, w in weights.items())
+    counts = dict((t, int(s)) for t, s in shares.items())
+    left = 256 - sum(counts.values())
+    for t in sorted(shares, key=lambda t: counts[t] - shares[t])[:left]:
+        counts[t] += 1
+
+    table = bytearray()
+    for t in sorted(counts):
+        table.extend(bytes([t]) * counts[t])
+
+    return bytes(table)
+
+
+def value_noise(rng, columns, rows, scale, octaves=3):
+    """
+    Returns a list of ROWS lists of COLUMNS values between 0 and 1, made of
+    OCTAVES layers of value noise. The first layer has a random value every
+    SCALE points, and every next layer halves the scale and the amplitude.
+    """
+    field = [[0.0] * columns for r in range(rows)]
+    amplitude = 1.0
+    total = 0.0
+
+    for o in range(octaves):
+        step = max(1.0, scale / 2 ** o)
+        lw = int(columns / step) + 2
+        lh = int(rows / step) + 2
+        lattice = [[rng.random() for i in range(lw)] for j in range(lh)]
+
+        for r in range(rows):
+            fy = r / step
+            y0 = int(fy)
+            ty = fy - y0
+            ty = ty * ty * (3 - 2 * ty)
+            top, bottom = lattice[y0], lattice[y0 + 1]
+            line = field[r]
+
+            for c in range(columns):
+                fx = c / step
+                x0 = int(fx)
+                tx = fx - x0
+                tx = tx * tx * (3 - 2 * tx)
+
+                upper = top[x0] + (top[x0 + 1] - top[x0]) * tx
+                lower = bottom[x0] + (bottom[x0 + 1] - bottom[x0]) * tx
+                line[c] += (upper + (lower - upper) * ty) * amplitude
+
+        total += amplitude
+        amplitude /= 2
+
+    return [[v / total for v in line] for line in field]
+
+
+def generate_rows(width, height, seed=None, weights=None, biomes=False,
+                  block=32, scale=8):
+    """
+    Generates the rows of a map, one bytes object of WIDTH terrain values at a
+    time, so maps of any size can be streamed into a file.
+
+    seed    : Seed of the random generator. The same seed (and parameters)
+              always generates the same map.
+    weights : Dictionary of terrain weights. Without biomes, terrains are
+              chosen with these weights; with biomes, the weights of every biome
+              are multiplied by them (e.g. a weight of 0 removes a terrain).
+    biomes  : If true, terrains are chosen according to biomes defined by
+              value noise.
+    block   : Width and height of the blocks of tiles that share a biome.
+    scale   : Size (in blocks) of the features of the biome noise.
+    """
+    rng = random.Random(seed)
+
+    if not biomes:
+        table = terrain_table(weights or DEFAULT_WEIGHTS)
+        for y in range(height):
+            yield random_bytes(rng, width).translate(table)
+        return
+
+    factors = dict((Terrain(t), w) for t, w in (weights or {}).items())
+    tables = [[terrain_table(dict(
+        (t, w * factors.get(t, 1)) for t, w in biome.items()))
+        for biome in level] for level in BIOMES]
+
+    columns = -(-width // block)
+    rows = -(-height // block)
+    elevation = value_noise(rng, columns, rows, scale)
+    moisture = value_noise(rng, columns, rows, scale)
+
+    for by in range(rows):
+        # Slices of the row that share the same biome
+        segments = []
+        for bx in range(columns):
+            level = min(int(elevation[by][bx] * len(tables)), len(tables) - 1)
+            wet = min(int(moisture[by][bx] * 3), 2)
+            table = tables[level][wet]
+
+            start = bx * block
+            if segments and segments[-1][2] is table:
+                segments[-1][1] = min(start + block, width)
+            else:
+                segments.append([start, min(start + block, width), table])
+
+        for y in range(min(block, height - by * block)):
+            rnd = random_bytes(rng, width)
+            yield b''.join(rnd[a:b].translate(t) for a, b, t in segments)
+
+
+def generate(width, height, seed=None, weights=None, biomes=False,
+             block=32, scale=8):
+    """
+    Generates a map and returns its tiles in a bytearray, row after row. The
+    parameters are the same of generate_rows.
+    """
+    return bytearray().join(
+        generate_rows(width, height, seed, weights, biomes, block, scale))
+
+
+if __name__ == '__main__':
+    import maps
+
+    parser = argparse.ArgumentParser(description='Generates random maps.')
+    parser.add_argument('width', type=int)
+    parser.add_argument('height', type=int)
+    parser.add_argument('-o', '--output', required=True,
+                        help='map file to write; the extension chooses the '
+                        'format: .aqm (binary), .aqc (chunked) or text')
+    parser.add_argument('-s', '--seed', type=int)
+    parser.add_argument('-w', '--weight', action='append', default=[],
+                        metavar='TERRAIN=WEIGHT',
+                        help='weight of a terrain (e.g. WALL=1), may be '
+                        'repeated')
+    parser.add_argument('--biomes', action='store_true',
+                        help='choose terrains according to noise biomes')
+    parser.add_argument('--connected', action='store_true',
+                        help='wall off tiles outside of the largest region')
+    parser.add_argument('--block', type=int, default=32,
+                        help='size of the blocks that share a biome')
+    parser.add_argument('--chunk', type=int, default=256,
+                        help='chunk size of chunked maps')
+
+    args = parser.parse_args()
+
+    weights = {}
+    for w in args.weight:
+        name, value = w.split('=')
+        weights[Terrain[name.upper()]] = float(value)
+
+    if args.output.endswith(maps.CHUNKED_EXTENSION) and not args.connected:
+        # Chunked maps are streamed, so the map is never held in memory
+        maps.ChunkedMap.create(
+            args.output, args.width, args.height,
+            generate_rows(args.width, args.height, args.seed, weights,
+                          args.biomes, args.block),
+            args.chunk
+        )
+    else:
+        gmap = maps.Map()
+        gmap.randomize(args.height, args.width, args.seed, weights,
+                       args.biomes, args.connected, args.block)
+
+        if args.output.endswith(maps.CHUNKED_EXTENSION):
+            maps.ChunkedMap.from_map(gmap, args.output, args.chunk)
+        elif args.output.endswith(maps.BINARY_EXTENSION):
+            gmap.save_binary(args.output)
+        else:
+            gmap.save(args.output)
@@ -1,8 +1,14 @@
 import math
 
+from collections import OrderedDict
+
 from ai import genetics, search
 from constants import Algorithm, MoveDir, Terrain, Heroes
 
+# Amount of incremental planners kept by a hero, one for every leg of a set of
+# missions (see assign_missions).
+HERO_PLANNERS = 6
+
 
 class Hero:
     """
@@ -26,6 +32,9 @@ class Hero:
         self.decisions = set([])
         self.explored = set([])
 
+        # Incremental planners of the last searched (start, goal) pairs
+        self.planners = OrderedDict()
+
         # The indexes are the values returned by key pressing events from pygame
         self.movements = {
             273: self.__moveup,
@@ -77,12 +86,14 @@ class Hero:
     def start_search(self, algorithm, enhance=False):
         """
         Starts a search algorithm from a start state to a goal state using
-        breadth first, depth first or iterative deepening search. The Initial
-        and goal states are defined previously with set_goal and set_start.
+        breadth first, bidirectional breadth first, jump point, depth first or
+        iterative deepening search. The Initial and goal states are defined previously
+        with set_goal and set_start.
 
         algorithm : Symbolic constant in Constants representing the type of
                     algorithm.
-        enhance   : If true, redundant nodes will not be generated.
+        enhance   : If true, redundant nodes will not be generated (not
+                    supported by the bidirectional search).
 
         Raises ValueError if:
         - The initial and/or goal coordinate were not defined
@@ -99,6 +110,12 @@ class Hero:
         if algorithm.value == Algorithm.BFS.value:
             solution = search.bf_search(problem, enhance)
 
+        elif algorithm.value == Algorithm.JPS.value:
+            solution = search.bf_search(problem, jump=True)
+
+        elif algorithm.value == Algorithm.BIBFS.value:
+            solution = search.bidirectional_bf_search(problem)
+
         # At this point, ony depth searches remain.
         # The hero must define the order of its actions, so if they are not
         # defined an exception will ocurr
@@ -135,13 +152,89 @@ class Hero:
         else:
             return False
 
-    def start_heuristic_search(self):
+    def start_heuristic_search(self, algorithm=Algorithm.ASTAR, budget=None,
+                               expansions=None):
+        """
+        Starts an A* search from the start state to the goal state with the
+        terrain costs of the hero, and returns its solution.
+
+        algorithm  : Algorithm.ASTAR (jump point search when every tile
+                     costs the same), Algorithm.BIASTAR (bidirectional A*),
+                     Algorithm.HPASTAR (hierarchical A*, faster on large maps
+                     but the paths are not always the cheapest),
+                     Algorithm.LPASTAR (lifelong planning A*, which keeps the
+                     search to repair it when the same path is searched again
+                     after the terrain changed), Algorithm.ARASTAR (anytime
+                     A*, which improves a first quick path while the budget
+                     lasts; the bound of the solution tells how good it is) or
+                     Algorithm.ALT (A* with the landmarks of the map, which
+                     are built the first time they are needed and pay off
+                     over many searches).
+        budget     : Seconds that an anytime search may take.
+        expansions : Amount of cells that an anytime search may expand.
+        """
+        if not self.__start or not self.__goal:
+            raise ValueError(' start/goal')
+
+        problem = search.MapProblem(
+            self.gmap, self.__start, self.__goal, self.cost,
+            algorithm.value == Algorithm.ALT.value)
+
+        if algorithm.value == Algorithm.BIASTAR.value:
+            return search.bidirectional_astar_search(problem)
+        if algorithm.value == Algorithm.HPASTAR.value:
+            return search.hierarchical_search(problem)
+        if algorithm.value == Algorithm.LPASTAR.value:
+            return search.incremental_search(self.__planner())
+        if algorithm.value == Algorithm.ARASTAR.value:
+            return search.anytime_search(problem, budget=budget,
+                                         expansions=expansions)
+        return search.cell_astar_search(problem)
+
+    def start_field_search(self):
+        """
+        Searches the cheapest path from the start state to the goal state with
+        the terrain costs of the hero by walking down the distance field of the
+        goal (see search.field_search), which is kept for later searches to
+        the same goal with the same costs.
+        """
         if not self.__start or not self.__goal:
             raise ValueError(' start/goal')
 
         problem = search.MapProblem(self.gmap, self.__start,
                                     self.__goal, self.cost)
-        return search.astar_search(problem)
+        return search.field_search(problem)
+
+    def start_dijkstra_search(self, goals):
+        """
+        Searches the cheapest paths from the start state to all of the GOALS at
+        once with the terrain costs of the hero, and returns a dictionary with
+        the last HNode of the path to every goal (None if it can't be reached).
+        """
+        if not self.__start:
+            raise ValueError(' start')
+
+        problem = search.MapProblem(self.gmap, self.__start, goals[0],
+                                    self.cost)
+        return search.dijkstra_search(problem, goals)
+
+    def __planner(self):
+        """
+        Returns the incremental planner from the start state to the goal
+        state, making a new one if the pair was not searched recently.
+        """
+        key = (self.__start, self.__goal)
+        planner = self.planners.get(key)
+
+        if planner is None or planner.gmap is not self.gmap:
+            planner = search.IncrementalPlanner(self.gmap, self.__start,
+                                                self.__goal, self.cost)
+            self.planners[key] = planner
+            if len(self.planners) > HERO_PLANNERS:
+                self.planners.popitem(last=False)
+
+        self.planners.move_to_end(key)
+        return planner
 
     def set_start(self, start):
         self.__start = (start[0], start[1])
@@ -159,17 +252,23 @@ class Hero:
         dad = node.parent
 
         while dad:
-            path.insert(0, dad)
+            path.append(dad)
             dad = dad.parent
 
+        path.reverse()
         return path
 
     @staticmethod
-    def __print_tree(node, level=0):
-        print('    ' * level, sep='', end='')
-        print('|---', node.coord, sep='')
-        for child in node.children:
-            Hero.__print_tree(child, level + 1)
+    def __print_tree(node):
+        # Explicit stack, so deep trees don't hit the recursion limit
+        stack = [(node, 0)]
+
+        while stack:
+            node, level = stack.pop()
+            print('    ' * level, sep='', end='')
+            print('|---', node.coord, sep='')
+            stack.extend((child, level + 1)
+                         for child in reversed(node.children))
 
     def __moveup(self):
         try:
@@ -339,7 +438,7 @@ class Werewolf(Hero):
         }
 
 
-def assign_missions(chrs, gls):
+def assign_missions(chrs, gls, algorithm=Algorithm.ASTAR):
     """
     Given a list of Heroes and a list of tuples that represent a goal, this
     method will return a list of for each Hero in the order that they were
@@ -349,6 +448,8 @@ def assign_missions(chrs, gls):
     their path to a mission. The assignment calcualtes the best possible outcome
     for the whole team of heroes (the total cost of the missions is the lowest
     possible).
+
+    The paths are searched with ALGORITHM (see Hero.start_heuristic_search).
     """
 
     print('\nCalculating costs of each mission...\n')
@@ -357,6 +458,13 @@ def assign_missions(chrs, gls):
     print('The stones are at', gls['stones'])
     print('The key is at' + str(gls['key']) + '\n')
 
+    def portal_search(hero):
+        # Every mission ends at the portal, so the optimal paths to it walk
+        # down its distance field, which is shared by the heroes of a species.
+        if algorithm.value == Algorithm.ASTAR.value:
+            return hero.start_field_search()
+        return hero.start_heuristic_search(algorithm)
+
     results = []
     for hero in chrs:
         hero.set_start(hero.pos)
@@ -364,42 +472,42 @@ def assign_missions(chrs, gls):
 
         # Calculate Start - Temple
         hero.set_goal(gls['temple'])
-        solution = hero.start_heuristic_search()
+        solution = hero.start_heuristic_search(algorithm)
         node = solution.node
         c_results.append(node)
 
         # Start - Temple - portal
         hero.set_start(gls['temple'])
         hero.set_goal(gls['portal'])
-        solution = hero.start_heuristic_search()
+        solution = portal_search(hero)
         node = solution.node
         c_results.append(node)
 
         # Start - Magic Stones
         hero.set_start(hero.pos)
         hero.set_goal(gls['stones'])
-        solution = hero.start_heuristic_search()
+        solution = hero.start_heuristic_search(algorithm)
         node = solution.node
         c_results.append(node)
 
         # Start - Magic Stones - Portal
         hero.set_start(gls['stones'])
         hero.set_goal(gls['portal'])
-        solution = hero.start_heuristic_search()
+        solution = portal_search(hero)
         node = solution.node
         c_results.append(node)
 
         # Start - Key
         hero.set_start(hero.pos)
         hero.set_goal(gls['key'])
-        solution = hero.start_heuristic_search()
+        solution = hero.start_heuristic_search(algorithm)
         node = solution.node
         c_results.append(node)
 
         # Start - Key - Portal
         hero.set_start(gls['key'])
         hero.set_goal(gls['portal'])
-        solution = hero.start_heuristic_search()
+        solution = portal_search(hero)
         node = solution.node
         c_results.append(node)
 
@@ -413,16 +521,17 @@ def assign_missions(chrs, gls):
 
     costs = []
     for i, tr in enumerate(results):
+        tr = [search.path_cost(n) for n in tr]
         print('%-10s|  %-5s|  %-5s|  %-5s|  %-5s|  %-5s|  %-5s' %
               (chrs[i].species,
-               tr[0].acc_cost, tr[1].acc_cost + tr[0].acc_cost,
-               tr[2].acc_cost, tr[3].acc_cost + tr[2].acc_cost,
-               tr[4].acc_cost, tr[5].acc_cost + tr[4].acc_cost)
+               tr[0], tr[1] + tr[0],
+               tr[2], tr[3] + tr[2],
+               tr[4], tr[5] + tr[4])
               )
         costs.append([
-            (0, tr[1].acc_cost + tr[0].acc_cost),
-            (1, tr[3].acc_cost + tr[2].acc_cost),
-            (2, tr[5].acc_cost + tr[4].acc_cost)
+            (0, tr[1] + tr[0]),
+            (1, tr[3] + tr[2]),
+            (2, tr[5] + tr[4])
         ])
     print()
 
@@ -469,33 +578,26 @@ def use_genetic_search(heroes, starts, goals):
     # s| | | | | |X| |
     # p| | | | | | |X|
 
+    # Every row is found with a single search from its start to all of the
+    # goals of the row.
     print('Calculating costs (this may take a while)...')
     for h in heroes:
         hero_costs = {}
 
         # Iterate through all starting points:
         for index, st in enumerate(starts):
+            h.set_start(st)
+            nodes = h.start_dijkstra_search(list(goals.values()))
+            hero_costs[index] = dict(
+                (k, nodes[v]) for k, v in goals.items())
 
-            start_dict = {}
-
-            # Iterate through all goals
-            for k, v in goals.items():
-                h.set_start(st)
-                h.set_goal(v)
-                solution = h.start_heuristic_search()
-                start_dict[k] = solution.node
-
-            hero_costs[index] = start_dict
         # Also calculate paths between objectives, except to itself
         for k, v in goals.items():
-            goal_dict = {}
-            for j, w in goals.items():
-                if k != j:
-                    h.set_start(v)
-                    h.set_goal(w)
-                    solution = h.start_heuristic_search()
-                    goal_dict[j] = solution.node
-            hero_costs[k] = goal_dict
+            h.set_start(v)
+            nodes = h.start_dijkstra_search(
+                [w for j, w in goals.items() if j != k])
+            hero_costs[k] = dict(
+                (j, nodes[w]) for j, w in goals.items() if j != k)
 
         print_gen_costs(hero_costs, h.species.name)
 
@@ -532,24 +634,30 @@ def __build_paths(*missions):
 
 def __path_for_hero(hero, missions, costs):
     """
-    Returns a list of tuples which are the coordinates of the path to take.
+    Returns a list of tuples which are the coordinates of the path to take, or
+    None if the hero can't reach one of its missions.
     """
 
     # Since search algorihtm returns a leaf node, iteration will made from the portal
     # to last objective, to second last, etc...
+    # The path is built backwards and reversed at the end
     node = costs[hero][missions[-1]]["PORTAL"]
-    total = [p for p in node.get_path()]
+    if node is None:
+        return None
+    total = node.get_path()
+    total.reverse()
 
     # Add path from last objective to portal
     node = costs[hero]
 
     for i in range(len(missions) - 1, 0, -1):
         node = costs[hero][missions[i - 1]][missions[i]]
+        if node is None:
+            return None
         path = node.get_path()
+        total.extend(reversed(path))
 
-        for a in path[::-1]:
-            total.insert(0, a)
-
+    total.reverse()
     return total
 
 
@@ -561,15 +669,17 @@ def __build_path(s_i_p):
     # From portal to item
     aux = s_i_p[1]
     while aux:
-        path.insert(0, aux.coord)
+        path.append(aux.coord)
         aux = aux.parent
 
     # From item to start point
     aux = s_i_p[0]
     while aux:
-        path.insert(0, aux.coord)
+        path.append(aux.coord)
         aux = aux.parent
 
+    path.reverse()
+
     # print('Path made:', path)
 
     return path
@@ -592,7 +702,7 @@ def print_gen_costs(costs, name):
         print("%6s" % str(i), end='')
         for j in g[3:]:
             if not isinstance(j, int) and i != j:
-                print("|%6s" % str(costs[i][j].acc_cost), end='')
+                print("|%6s" % str(search.path_cost(costs[i][j])), end='')
             else:
                 print("|------", end='')
         print()
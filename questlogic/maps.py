@@ -1,10 +1,1429 @@
-import random
+import argparse
+import math
+import mmap
+import re
+import struct
 import sys
 import os
+import zlib
+
+from array import array
+from collections import OrderedDict, deque
+from itertools import chain, compress
+from heapq import heappush, heappop
 
 sys.path.append(os.path.join(os.path.dirname(__file__)))
 
-import constants
+import constants
+import generator
+
+WALL = constants.Terrain.WALL.value
+
+# Terrain members indexed by their value, so tile codes can be turned into
+# enums without going through the Enum constructor.
+TERRAINS = tuple(constants.Terrain(v) for v in sorted(constants.valid_terrains))
+
+# Binary map files start with a header (magic, format version, width and
+# height) followed by the tiles, one byte each, row after row.
+BINARY_MAGIC = b'AQMP'
+BINARY_VERSION = 1
+BINARY_HEADER = struct.Struct('<4sHxxII')
+BINARY_EXTENSION = '.aqm'
+
+# Chunked map files start with a header (magic, format version, chunk size,
+# width and height) followed by square chunks of tiles. Chunks are stored row
+# after row, and the tiles inside of a chunk too. Chunks on the right and bottom
+# borders are padded with walls.
+CHUNKED_MAGIC = b'AQMC'
+CHUNKED_VERSION = 1
+CHUNKED_HEADER = struct.Struct('<4sHHII')
+CHUNKED_EXTENSION = '.aqc'
+
+# Landmark files (see Landmarks) start with a header (magic, format version,
+# amount of landmarks, width and height of the map, and checksums of the tiles
+# and of the table of costs) followed by the cells of the landmarks and the
+# costs from and to every one of them. They are only kept if maps are given a
+# directory for them (see Map.landmark_dir), one for every table of costs.
+LANDMARK_MAGIC = b'AQML'
+LANDMARK_VERSION = 1
+LANDMARK_HEADER = struct.Struct('<4sHHIIII')
+LANDMARK_EXTENSION = '.alt'
+
+# Amount of landmarks picked for ALT heuristics
+LANDMARKS = 8
+
+# Amount of changes of a map that are logged. Structures derived from a map
+# that are older than the log are built again instead of being refreshed.
+DIRTY_LOG_SIZE = 1024
+
+# Bits of the directions in the masks of the neighbor index (up, down, left and
+# right), the direction opposite to each of them, and the amount of neighbors
+# of every mask.
+DIRECTIONS = (1, 2, 4, 8)
+OPPOSITE = {1: 2, 2: 1, 4: 8, 8: 4}
+DEGREES = bytes(bin(mask).count('1') for mask in range(16))
+
+# Translation table from the value of a tile to 1 if it's walkable or 0 if it's
+# a wall.
+WALKABLE = bytes(int(v != WALL) for v in range(256))
+
+# Slots for the edges that leave every cell in the decision graph, one for each
+# of its walkable neighbors, so they can be patched in place when walls change.
+ADJACENCY_SLOTS = 4
+
+# Runs of walkable tiles in a row of the tile buffer
+WALKABLE_RUN = re.compile(rb'[^\x00]+')
+
+# Width and height of the clusters of hierarchies (see Hierarchy), and length
+# of the entrances between clusters that get a transition at each end instead
+# of one in their middle.
+HIERARCHY_CLUSTER = 16
+HIERARCHY_SPLIT = 6
+
+
+def __digit_table():
+    # Translation table from the ASCII digit of a terrain to its value. Every
+    # other byte (including digits of invalid terrains) is translated to 0.
+    table = bytearray(256)
+    for value in constants.valid_terrains:
+        if value < 10:
+            table[ord('0') + value] = value
+    return bytes(table)
+
+
+DIGITS = __digit_table()
+
+
+def parse_row(line):
+    '''
+    Parses a line of a text map into a bytes object with the terrain values.
+    Values that aren't a valid terrain are replaced with 0 (a wall).
+    '''
+    tokens = line.split()
+
+    # Rows made of single digits are translated all at once
+    if isinstance(line, bytes):
+        digits = b''.join(tokens)
+        if len(digits) == len(tokens) and digits.isdigit():
+            return digits.translate(DIGITS)
+
+    return bytes(v if v in constants.valid_terrains else 0
+                 for v in map(int, tokens))
+
+
+def walkable_runs(tiles, width, height):
+    '''
+    Returns an iterator over the runs of walkable tiles of a tile buffer, row
+    after row. Runs are matches of WALKABLE_RUN, so m.span() is their slice of
+    the buffer.
+    '''
+    return chain.from_iterable(
+        WALKABLE_RUN.finditer(tiles, start, start + width)
+        for start in range(0, width * height, width))
+
+
+def find_regions(tiles, width, height):
+    '''
+    find_regions(tiles, width, height) -> (regions, sizes)
+
+    Finds the connected regions of walkable tiles of a tile buffer. Instead of
+    visiting tile by tile, the runs of walkable tiles of every row are joined
+    with the runs of the previous row that they touch, using a union-find.
+    Only the runs of two rows are kept at a time: the rest are found again with
+    walkable_runs.
+
+    regions : Array with the region of every run (in the order of
+              walkable_runs), which is the index of one of its runs.
+    sizes   : Dictionary with the amount of tiles of every region.
+    '''
+    parent = []
+    size = []
+
+    def find(r):
+        while parent[r] != r:
+            parent[r] = parent[parent[r]]
+            r = parent[r]
+        return r
+
+    previous, previous_base = [], 0
+    for y in range(height):
+        start = y * width
+        base = len(parent)
+        current = list(map(re.Match.span,
+                           WALKABLE_RUN.finditer(tiles, start, start + width)))
+        size.extend([b - a for a, b in current])
+        parent.extend(range(base, len(size)))
+
+        # Join runs that overlap with a run of the previous row
+        i = j = 0
+        while i < len(previous) and j < len(current):
+            a, b = previous[i]
+            c, d = current[j]
+
+            if a + width < d and c < b + width:
+                ra, rb = find(previous_base + i), find(base + j)
+                if ra != rb:
+                    if size[ra] < size[rb]:
+                        ra, rb = rb, ra
+                    parent[rb] = ra
+                    size[ra] += size[rb]
+
+            if b + width < d:
+                i += 1
+            else:
+                j += 1
+
+        previous, previous_base = current, base
+
+    regions = array('i', map(find, range(len(parent))))
+    sizes = dict((r, size[r]) for r in set(regions))
+
+    return regions, sizes
+
+
+class DirtyRect:
+    """
+    Rectangle of tiles of a map that changed in a version of the map.
+
+    DirtyRect(version, x, y, width, height)
+    """
+
+    __slots__ = ('version', 'x', 'y', 'width', 'height')
+
+    def __init__(self, version, x, y, width=1, height=1):
+        self.version = version
+        self.x = x
+        self.y = y
+        self.width = width
+        self.height = height
+
+    def cells(self, stride):
+        """ Yields the cells of the rectangle in a map of width STRIDE. """
+        for y in range(self.y, self.y + self.height):
+            start = y * stride + self.x
+            yield from range(start, start + self.width)
+
+    def __repr__(self):
+        return 'DirtyRect<V:%d, (%d, %d) %dx%d>' % (
+            self.version, self.x, self.y, self.width, self.height)
+
+
+class MatrixRow:
+    """
+    A single row of a MatrixView. Reading and writing items works just like
+    with a list of ints, but every value lives in the tile buffer of the map.
+    """
+
+    __slots__ = ('gmap', 'y')
+
+    def __init__(self, gmap, y):
+        self.gmap = gmap
+        self.y = y
+
+    def __len__(self):
+        return self.gmap.width
+
+    def __iter__(self):
+        start = self.y * self.gmap.width
+        return iter(self.gmap.tiles[start:start + self.gmap.width])
+
+    def __getitem__(self, x):
+        width = self.gmap.width
+
+        if isinstance(x, slice):
+            return list(self)[x]
+        if x < 0:
+            x += width
+        if not 0 <= x < width:
+            raise IndexError('map column out of range')
+
+        return self.gmap.tiles[self.y * width + x]
+
+    def __setitem__(self, x, value):
+        if x < 0:
+            x += self.gmap.width
+        if not 0 <= x < self.gmap.width:
+            raise IndexError('map column out of range')
+
+        self.gmap.set_terrain((x, self.y), value)
+
+    def __eq__(self, other):
+        return list(self) == list(other)
+
+    def __repr__(self):
+        return repr(list(self))
+
+
+class MatrixView:
+    """
+    Compatibility view of the tiles of a Map as a list of rows, so that code
+    written against the old list of lists (e.g. gmap.matrix[y][x]) keeps
+    working for both reads and writes.
+    """
+
+    __slots__ = ('gmap',)
+
+    def __init__(self, gmap):
+        self.gmap = gmap
+
+    def __len__(self):
+        return self.gmap.height
+
+    def __iter__(self):
+        return (MatrixRow(self.gmap, y) for y in range(self.gmap.height))
+
+    def __getitem__(self, y):
+        height = self.gmap.height
+
+        if isinstance(y, slice):
+            return [MatrixRow(self.gmap, r) for r in range(height)[y]]
+        if y < 0:
+            y += height
+        if not 0 <= y < height:
+            raise IndexError('map row out of range')
+
+        return MatrixRow(self.gmap, y)
+
+    def __eq__(self, other):
+        return [list(r) for r in self] == [list(r) for r in other]
+
+    def __repr__(self):
+        return repr([list(r) for r in self])
+
+
+def add_offsets(*offsets):
+    '''
+    Returns a function that adds each one of OFFSETS (up to four of them) to a
+    cell and returns the tuple of the results. Functions that add a fixed
+    amount of offsets are much faster than a loop over them.
+    '''
+    if not offsets:
+        return lambda cell: ()
+    if len(offsets) == 1:
+        a, = offsets
+        return lambda cell: (cell + a,)
+    if len(offsets) == 2:
+        a, b = offsets
+        return lambda cell: (cell + a, cell + b)
+    if len(offsets) == 3:
+        a, b, c = offsets
+        return lambda cell: (cell + a, cell + b, cell + c)
+
+    a, b, c, d = offsets
+    return lambda cell: (cell + a, cell + b, cell + c, cell + d)
+
+
+class Adjacency:
+    """
+    Neighbor index of a Map. Cells are identified by their index in the tile
+    buffer (y * width + x).
+
+    Every cell has a byte in inside and another in walk with a bit for each
+    direction (see DIRECTIONS): the neighbors inside of the map, and those of
+    them that are walkable (not a wall). There is a function for every mask in
+    steps that adds the offsets of its neighbors to a cell, so they are always
+    listed in the order up, down, left, right.
+
+    Both masks are built at once from the tiles (two bytes for every cell), and
+    the changes of terrain are patched in place when the index is requested
+    again: adding or removing a wall only changes the walkable bits of the cells
+    around it. WALLS counts the refreshes that did so, for the structures that
+    depend on the walkable neighbors.
+    """
+
+    def __init__(self, gmap):
+        width, height = gmap.width, gmap.height
+        tiles = bytes(gmap.tiles)
+
+        self.version = gmap.version
+        self.walls = 0
+        self.offsets = (-width, width, -1, 1)
+        self.steps = tuple(
+            add_offsets(*(d for bit, d in zip(DIRECTIONS, self.offsets)
+                          if mask & bit))
+            for mask in range(len(DEGREES)))
+        self.inside = self.masks(b'\x01' * len(tiles), width, height)
+        self.walk = self.masks(tiles.translate(WALKABLE), width, height)
+
+    @staticmethod
+    def masks(flags, width, height):
+        """
+        Returns the masks of the directions in which the neighbor of every cell
+        has its byte set in FLAGS (a bytes object of 0 and 1, one for every
+        cell). The flags are shifted as a whole instead of walking the cells:
+        flags of a byte are its lowest bit, so shifting all of them by fewer
+        than 8 bits moves each one to another bit of the same byte.
+        """
+        size = width * height
+        if not size:
+            return bytearray()
+
+        def number(data):
+            return int.from_bytes(data, 'big')
+
+        # Cells at the first and the last column of the rows
+        first = number((b'\x00' + b'\x01' * (width - 1)) * height)
+        last = number((b'\x01' * (width - 1) + b'\x00') * height)
+
+        up = number(bytes(width) + flags[:size - width])
+        down = number(flags[width:] + bytes(width))
+        left = number(b'\x00' + flags[:-1]) & first
+        right = number(flags[1:] + b'\x00') & last
+
+        mask = up | down << 1 | left << 2 | right << 3
+        return bytearray(mask.to_bytes(size, 'big'))
+
+    def neighbors(self, cell):
+        """ Returns the neighbors of a cell that are inside of the map. """
+        return self.steps[self.inside[cell]](cell)
+
+    def walkable(self, cell):
+        """ Returns the neighbors of a cell that are not walls. """
+        return self.steps[self.walk[cell]](cell)
+
+    def degree(self, cell):
+        """ Amount of walkable neighbors of a cell. """
+        return DEGREES[self.walk[cell]]
+
+    def refresh(self, gmap, changes):
+        """
+        Updates the index with the tiles changed in CHANGES (a list of
+        DirtyRect). When a wall is added or removed, the walkable bits of the
+        cells around it are set again.
+        """
+        inside, walk = self.inside, self.walk
+        walls = False
+
+        for rect in changes:
+            for cell in rect.cells(gmap.width):
+                wall = gmap.tiles[cell] == WALL
+
+                # Neighborhood is symmetric, so the neighbor of the cell in a
+                # direction sees it in the opposite one.
+                for bit, d in zip(DIRECTIONS, self.offsets):
+                    if not inside[cell] & bit:
+                        continue
+
+                    n, back = cell + d, OPPOSITE[bit]
+                    if bool(walk[n] & back) == wall:
+                        walk[n] ^= back
+                        walls = True
+
+        if walls:
+            self.walls += 1
+
+        return True
+
+
+class OnDemandAdjacency:
+    """
+    Neighbor index with the same interface as Adjacency, except that neighbors
+    are computed from the tiles every time they are requested. It's used by maps
+    that are too large to keep an index of the whole map in memory.
+    """
+
+    def __init__(self, gmap):
+        self.gmap = gmap
+        self.version = gmap.version
+
+    def neighbors(self, cell):
+        """ Returns the neighbors of a cell that are inside of the map. """
+        gmap = self.gmap
+        width = gmap.width
+        y, x = divmod(cell, width)
+        cells = []
+
+        # Up
+        if y > 0:
+            cells.append(cell - width)
+        # Down
+        if y < gmap.height - 1:
+            cells.append(cell + width)
+        # Left
+        if x > 0:
+            cells.append(cell - 1)
+        # Right
+        if x < width - 1:
+            cells.append(cell + 1)
+
+        return cells
+
+    def walkable(self, cell):
+        """ Returns the neighbors of a cell that are not walls. """
+        tiles = self.gmap.tiles
+        return [c for c in self.neighbors(cell) if tiles[c] != WALL]
+
+    def degree(self, cell):
+        """ Amount of walkable neighbors of a cell. """
+        return len(self.walkable(cell))
+
+
+class Components:
+    """
+    Labeling of the connected regions of passable tiles of a Map. Two passable
+    cells have the same label if a hero can walk from one to the other, while
+    the rest of the cells are labeled -1.
+
+    Components(gmap, passable)
+    gmap     : The labeled map.
+    passable : Set of terrain values that can be walked through. By default,
+               every terrain but walls.
+
+    Labels of every cell are kept in an array and go through a union-find, so
+    regions are joined in O(1) when a tile becomes passable. When a tile stops
+    being passable, only the region that contained it is searched to find out
+    if it was split. Changes of the map are applied when the labeling is
+    requested again.
+    """
+
+    def __init__(self, gmap, passable=None):
+        if passable is None:
+            passable = set(range(256)) - set([WALL])
+
+        self.gmap = gmap
+        self.passable = frozenset(passable)
+        self.version = gmap.version
+        self.parent = {}
+
+        table = bytes(1 if v in self.passable else 0 for v in range(256))
+        tiles = bytes(gmap.tiles).translate(table)
+        regions, self.sizes = find_regions(tiles, gmap.width, gmap.height)
+
+        labels = array('i', [-1]) * (gmap.width * gmap.height)
+        for m, r in zip(walkable_runs(tiles, gmap.width, gmap.height),
+                        regions):
+            a, b = m.span()
+            labels[a:b] = array('i', [r]) * (b - a)
+
+        self.labels = labels
+        self.next_label = len(regions)
+
+    def label(self, cell):
+        """ Returns the label of the region of a cell, or -1 for walls. """
+        label = self.labels[cell]
+        parent = self.parent
+
+        if label in parent:
+            root = label
+            while root in parent:
+                root = parent[root]
+            # Compress the path that was followed
+            while label in parent:
+                parent[label], label = root, parent[label]
+            self.labels[cell] = root
+            label = root
+
+        return label
+
+    def reachable(self, start, goal):
+        """
+        Returns True if a hero can walk from cell START to cell GOAL. Heroes may
+        start on a tile that is not passable (they can leave it through any
+        passable neighbor), but they can't walk into one.
+        """
+        if start == goal:
+            return True
+
+        target = self.label(goal)
+        if target < 0:
+            return False
+        if self.labels[start] >= 0:
+            return self.label(start) == target
+
+        return any(self.label(n) == target for n in self.neighbors(start))
+
+    def neighbors(self, cell):
+        """ Returns the neighbors of a cell that are labeled as passable. """
+        return [c for c in OnDemandAdjacency(self.gmap).neighbors(cell)
+                if self.labels[c] >= 0]
+
+    def refresh(self, gmap, changes):
+        """
+        Updates the labels with the tiles changed in CHANGES (a list of
+        DirtyRect).
+        """
+        for rect in changes:
+            for cell in rect.cells(gmap.width):
+                passable = gmap.tiles[cell] in self.passable
+                if passable != (self.labels[cell] >= 0):
+                    self.__toggle(cell, passable)
+
+        return True
+
+    def __toggle(self, cell, passable):
+        neighbors = self.neighbors(cell)
+
+        if passable:
+            # The cell joins the regions around it into the largest of them
+            roots = set(self.label(n) for n in neighbors)
+            if not roots:
+                root = self.__new_label()
+            else:
+                root = max(roots, key=self.sizes.get)
+                for r in roots - set([root]):
+                    self.parent[r] = root
+                    self.sizes[root] += self.sizes.pop(r)
+
+            self.labels[cell] = root
+            self.sizes[root] += 1
+            return
+
+        root = self.label(cell)
+        self.labels[cell] = -1
+        self.sizes[root] -= 1
+        if not self.sizes[root]:
+            del self.sizes[root]
+        elif len(neighbors) > 1:
+            self.__split(root, neighbors)
+
+    def __new_label(self):
+        label = self.next_label
+        self.next_label += 1
+        self.sizes[label] = 0
+        return label
+
+    def __split(self, root, starts):
+        """
+        Finds out if the walkable cells STARTS (which were in the region ROOT)
+        are still connected. A search is started from every one of them and the
+        searches take turns to visit a cell; searches that meet are joined, and
+        a search that runs out of cells found a region that was cut off, which
+        gets a new label.
+        """
+        owner = {}
+        alias = {}
+        searches = {}
+
+        for i, s in enumerate(starts):
+            owner[s] = i
+            searches[i] = (set([s]), deque([s]))
+
+        def resolve(i):
+            while i in alias:
+                i = alias[i]
+            return i
+
+        while len(searches) > 1:
+            for i in list(searches):
+                if i not in searches or len(searches) == 1:
+                    continue
+
+                seen, queue = searches[i]
+                if not queue:
+                    # Region cut off from the rest
+                    label = self.__new_label()
+                    for c in seen:
+                        self.labels[c] = label
+                    self.sizes[label] = len(seen)
+                    self.sizes[root] -= len(seen)
+                    del searches[i]
+                    continue
+
+                for n in self.neighbors(queue.popleft()):
+                    j = resolve(owner[n]) if n in owner else None
+
+                    if j is None:
+                        owner[n] = i
+                        seen.add(n)
+                        queue.append(n)
+                    elif j != i:
+                        # Both searches are in the same region
+                        other_seen, other_queue = searches.pop(j)
+                        seen.update(other_seen)
+                        queue.extend(other_queue)
+                        alias[j] = i
+
+                        if len(searches) == 1:
+                            break
+
+
+def walk_corridor(adjacency, cell, first, stop=None):
+    '''
+    walk_corridor(adjacency, cell, first, stop) -> (end, interior)
+
+    Follows the corridor that leaves CELL through its walkable neighbor FIRST.
+    Cells of a corridor have exactly two walkable neighbors, so the walk goes on
+    until it reaches a cell that doesn't (a decision point), the cell STOP, or
+    CELL again. Returns the cell where the walk ended and the list of corridor
+    cells walked through before it.
+    '''
+    interior = []
+    previous, current = cell, first
+
+    while current != stop and current != cell and \
+            adjacency.degree(current) == 2 and \
+            not (current == first and interior):
+        interior.append(current)
+        a, b = adjacency.walkable(current)
+        previous, current = current, (b if a == previous else a)
+
+    return current, interior
+
+
+class DecisionGraph:
+    """
+    Graph of the decision points of a Map: walkable cells that don't have
+    exactly two walkable neighbors (crossings and dead ends). The corridors
+    between them, made of cells with two walkable neighbors, are compressed
+    into edges whose weight is their length.
+
+    Every cell has ADJACENCY_SLOTS slots for its edges, one for each of its
+    walkable neighbors in the order of the Adjacency index: the edge that leaves
+    decision point i through its k-th walkable neighbor is in slot
+    e = i * ADJACENCY_SLOTS + k, and ends at ends[e] after walking through the
+    corridor cells
+    corridors[corridor_offsets[e]:corridor_offsets[e + 1]]. Every corridor cell
+    also knows the (up to two) edges that go through it, so a goal in the
+    middle of a corridor can be found without walking.
+
+    The graph is built once for a version of the map. When walls are added or
+    removed, only the edges of the decision points near the changes (and of
+    those whose corridors go through them) are walked again, and their
+    corridors are kept in PATCHED until there are enough of them to pack all
+    the corridors again.
+    """
+
+    def __init__(self, gmap):
+        adjacency = gmap.adjacency()
+        tiles = gmap.tiles
+        slots = len(tiles) * ADJACENCY_SLOTS
+
+        ends = array('l', [-1]) * slots
+        corridor_offsets = array('l', [0]) * (slots + 1)
+        corridors = array('l')
+        owners = (array('l', [-1]) * len(tiles), array('l', [-1]) * len(tiles))
+
+        for cell in range(len(tiles)):
+            first = cell * ADJACENCY_SLOTS
+            edges = ()
+            if tiles[cell] != WALL and adjacency.degree(cell) != 2:
+                edges = adjacency.walkable(cell)
+
+            for e in range(first, first + ADJACENCY_SLOTS):
+                if e - first < len(edges):
+                    ends[e], interior = \
+                        walk_corridor(adjacency, cell, edges[e - first])
+
+                    for c in interior:
+                        owners[owners[0][c] >= 0][c] = e
+                    corridors.extend(interior)
+
+                corridor_offsets[e + 1] = len(corridors)
+
+        self.version = gmap.version
+        self.adjacency = adjacency
+        self.walls = adjacency.walls
+        self.ends = ends
+        self.corridor_offsets = corridor_offsets
+        self.corridors = corridors
+        self.owners = owners
+        self.patched = {}
+
+    def is_decision(self, cell):
+        """ Returns True if a cell is a decision point of the graph. """
+        degree = self.adjacency.degree(cell)
+        return degree != 2 and \
+            (not degree or self.ends[cell * ADJACENCY_SLOTS] >= 0)
+
+    def corridor(self, cell, first, stop=None):
+        """
+        corridor(cell, first, stop) -> (end, interior)
+
+        Returns the same as walk_corridor. Corridors that leave a decision point
+        are taken from the edges of the graph; any other (e.g. those of a start
+        in the middle of a corridor) is walked.
+        """
+        if not self.is_decision(cell):
+            return walk_corridor(self.adjacency, cell, first, stop)
+
+        e = cell * ADJACENCY_SLOTS + \
+            self.adjacency.walkable(cell).index(first)
+
+        interior = self.interior(e)
+
+        if stop is not None and e in (self.owners[0][stop],
+                                      self.owners[1][stop]):
+            return stop, interior[:interior.index(stop)]
+
+        return self.ends[e], interior
+
+    def interior(self, e):
+        """ Returns the corridor cells of the edge in slot E. """
+        if e in self.patched:
+            return self.patched[e]
+
+        return self.corridors[self.corridor_offsets[e]:
+                              self.corridor_offsets[e + 1]]
+
+    def refresh(self, gmap, changes):
+        """
+        Walks again the edges that may have changed with CHANGES (a list of
+        DirtyRect). Nothing changes unless the neighbor index counted that a
+        wall was added or removed.
+        """
+        adjacency = gmap.adjacency()
+        if adjacency is not self.adjacency:
+            return False
+        if adjacency.walls == self.walls:
+            return True
+
+        width, height = gmap.width, gmap.height
+        ends, owners, patched = self.ends, self.owners, self.patched
+        empty = array('l')
+
+        # Changed cells change the degree of the cells around them, and edges
+        # that end at those are found through the cells next to them, so edges
+        # are looked for two cells around the changes.
+        points = set()
+        for rect in changes:
+            left, top = max(rect.x - 2, 0), max(rect.y - 2, 0)
+            right = min(rect.x + rect.width + 2, width)
+            bottom = min(rect.y + rect.height + 2, height)
+
+            for y in range(top, bottom):
+                for cell in range(y * width + left, y * width + right):
+                    points.add(cell)
+                    for e in (owners[0][cell], owners[1][cell]):
+                        if e >= 0:
+                            points.add(e // ADJACENCY_SLOTS)
+
+        # Remove the edges of those points...
+        for cell in points:
+            for e in range(cell * ADJACENCY_SLOTS,
+                           (cell + 1) * ADJACENCY_SLOTS):
+                if ends[e] < 0:
+                    continue
+
+                for c in self.interior(e):
+                    if owners[0][c] == e:
+                        owners[0][c] = owners[1][c]
+                    owners[1][c] = -1
+                ends[e] = -1
+                patched[e] = empty
+
+        # ... and walk the edges of the ones that are still decision points
+        for cell in points:
+            if gmap.tiles[cell] == WALL or adjacency.degree(cell) == 2:
+                continue
+
+            for e, n in enumerate(adjacency.walkable(cell),
+                                  cell * ADJACENCY_SLOTS):
+                ends[e], interior = walk_corridor(adjacency, cell, n)
+
+                for c in interior:
+                    owners[owners[0][c] >= 0][c] = e
+                patched[e] = array('l', interior)
+
+        if len(patched) * 8 > len(ends):
+            self.__pack()
+
+        self.walls = adjacency.walls
+        return True
+
+    def __pack(self):
+        """ Packs the patched corridors with the rest of them again. """
+        corridors = array('l')
+        corridor_offsets = array('l', [0]) * (len(self.ends) + 1)
+
+        for e in range(len(self.ends)):
+            corridors.extend(self.interior(e))
+            corridor_offsets[e + 1] = len(corridors)
+
+        self.corridors = corridors
+        self.corridor_offsets = corridor_offsets
+        self.patched = {}
+
+
+class OnDemandGraph:
+    """
+    Decision graph with the same interface as DecisionGraph, except that every
+    corridor is walked when it's requested. It's used by maps that are too
+    large to keep the corridors of the whole map in memory.
+    """
+
+    def __init__(self, gmap):
+        self.adjacency = gmap.adjacency()
+        self.version = gmap.version
+
+    def is_decision(self, cell):
+        """ Returns True if a cell is a decision point of the graph. """
+        return self.adjacency.degree(cell) != 2
+
+    def corridor(self, cell, first, stop=None):
+        """ Returns the same as walk_corridor. """
+        return walk_corridor(self.adjacency, cell, first, stop)
+
+
+class OnDemandCosts:
+    """
+    Sequence with the cost of entering every tile of a map, looked up from the
+    tile and a table of costs every time it's indexed.
+    """
+
+    def __init__(self, tiles, table):
+        self.tiles = tiles
+        self.table = table
+
+    def __len__(self):
+        return len(self.tiles)
+
+    def __getitem__(self, cell):
+        return self.table[self.tiles[cell]]
+
+
+class CostRaster:
+    """
+    Cost of entering every tile of a Map according to a table of terrain costs,
+    kept in one flat array that is indexed like the tiles (y * width + x).
+
+    CostRaster(gmap, table, on_demand)
+    gmap      : The map of the raster.
+    table     : Sequence with the cost of every terrain value (256 of them).
+                None means that the terrain can't be entered.
+    on_demand : If true, costs are looked up from the tiles when they are
+                requested instead of being kept in an array.
+
+    Tiles that can't be entered cost -1. If every cost is an int the raster is
+    an array of ints (and INTEGRAL is True), otherwise an array of doubles.
+    """
+
+    def __init__(self, gmap, table, on_demand=False):
+        self.version = gmap.version
+        self.table = tuple(-1 if c is None else c for c in table)
+        self.integral = all(isinstance(c, int) for c in self.table)
+
+        if on_demand:
+            self.costs = OnDemandCosts(gmap.tiles, self.table)
+        else:
+            self.costs = array('l' if self.integral else 'd',
+                               map(self.table.__getitem__, gmap.tiles))
+
+        # Cost shared by every tile that can be entered, found on request
+        self.__uniform = None
+        self.__uniform_known = on_demand
+
+    def uniform(self):
+        """
+        Returns the cost of entering the tiles of the map if every tile that
+        can be entered has the same cost, otherwise None. Rasters that look up
+        their costs on demand always return None, since finding it out would
+        read the whole map.
+        """
+        if not self.__uniform_known:
+            costs = set(self.costs)
+            costs.discard(-1)
+            self.__uniform = costs.pop() if len(costs) == 1 else None
+            self.__uniform_known = True
+
+        return self.__uniform
+
+    def refresh(self, gmap, changes):
+        """
+        Updates the raster with the tiles changed in CHANGES (a list of
+        DirtyRect).
+        """
+        if not isinstance(self.costs, OnDemandCosts):
+            for rect in changes:
+                for cell in rect.cells(gmap.width):
+                    cost = self.costs[cell] = self.table[gmap.tiles[cell]]
+
+                    # A different cost may break (or make) a uniform raster
+                    if self.__uniform is None or \
+                            cost != -1 and cost != self.__uniform:
+                        self.__uniform_known = False
+
+        return True
+
+
+class Hierarchy:
+    """
+    Abstract graph of a Map for hierarchical path finding (HPA*), for one table
+    of terrain costs (see CostRaster).
+
+    The map is split in square clusters of SIZE tiles. Where two neighboring
+    clusters share a run of border tiles that can be entered on both sides (an
+    entrance), transitions connect them: one in the middle of the run, or one
+    at each end if the run has HIERARCHY_SPLIT tiles or more. The tiles of the
+    transitions are the nodes of the graph, and edges go from every node to
+    the other tile of its transitions and to the other nodes of its cluster,
+    with the cost of the cheapest path between them inside of the cluster.
+    Since costs are paid when tiles are entered, edges are directed.
+
+    Clusters are identified by their index (row * columns + column), and nodes
+    by their cell:
+
+    - borders : Transitions (pairs of cells) between every pair of neighboring
+                clusters, keyed by the pair of clusters (lowest first).
+    - nodes   : Cells of the nodes of every cluster.
+    - edges   : List of (cell, cost) edges of every node.
+
+    Changes of the map only rebuild the clusters whose tiles changed and the
+    neighbors whose transitions with them changed (the other neighbors only
+    update the costs of their transitions).
+    """
+
+    def __init__(self, gmap, table, size=HIERARCHY_CLUSTER):
+        self.version = gmap.version
+        self.table = tuple(table)
+        self.size = size
+        self.width = gmap.width
+        self.height = gmap.height
+        self.columns = -(-gmap.width // size)
+        self.rows = -(-gmap.height // size)
+        self.costs = gmap.cost_raster(self.table).costs
+
+        self.borders = {}
+        self.nodes = {}
+        self.edges = {}
+
+        for cluster in range(self.columns * self.rows):
+            for neighbor in self.neighbors(cluster):
+                if neighbor > cluster:
+                    self.borders[cluster, neighbor] = \
+                        self.__transitions(cluster, neighbor)
+
+        for cluster in range(self.columns * self.rows):
+            self.__build(cluster)
+
+    def cluster(self, cell):
+        """ Returns the index of the cluster of a cell. """
+        return (cell // self.width // self.size) * self.columns + \
+            (cell % self.width) // self.size
+
+    def bounds(self, cluster):
+        """
+        bounds(cluster) -> (x0, y0, x1, y1)
+
+        Returns the first and last columns and rows of tiles of a cluster.
+        """
+        x0 = cluster % self.columns * self.size
+        y0 = cluster // self.columns * self.size
+        return (x0, y0, min(x0 + self.size, self.width) - 1,
+                min(y0 + self.size, self.height) - 1)
+
+    def neighbors(self, cluster):
+        """ Returns the indexes of the (up to 4) neighbors of a cluster. """
+        column, row = cluster % self.columns, cluster // self.columns
+        around = []
+
+        if row > 0:
+            around.append(cluster - self.columns)
+        if row < self.rows - 1:
+            around.append(cluster + self.columns)
+        if column > 0:
+            around.append(cluster - 1)
+        if column < self.columns - 1:
+            around.append(cluster + 1)
+
+        return around
+
+    def __transitions(self, cluster, neighbor):
+        """
+        Returns the transitions between a cluster and its right or bottom
+        NEIGHBOR, as a list of pairs of cells (the one of CLUSTER first).
+        """
+        costs, width = self.costs, self.width
+        x0, y0, x1, y1 = self.bounds(cluster)
+
+        # With a single column of clusters, the one below is also cluster + 1
+        if neighbor == cluster + 1 and cluster % self.columns != \
+                self.columns - 1:
+            pairs = [(y * width + x1, y * width + x1 + 1)
+                     for y in range(y0, y1 + 1)]
+        else:
+            pairs = [(y1 * width + x, (y1 + 1) * width + x)
+                     for x in range(x0, x1 + 1)]
+
+        transitions = []
+        run = []
+        for a, b in pairs + [(-1, -1)]:
+            if a >= 0 and costs[a] >= 0 and costs[b] >= 0:
+                run.append((a, b))
+                continue
+
+            if len(run) >= HIERARCHY_SPLIT:
+                transitions.extend((run[0], run[-1]))
+            elif run:
+                transitions.append(run[len(run) // 2])
+            run = []
+
+        return transitions
+
+    def __links(self, cluster):
+        """
+        Returns a dictionary with the cells of the nodes of a cluster and the
+        edges of their transitions.
+        """
+        links = {}
+
+        for neighbor in self.neighbors(cluster):
+            key = (min(cluster, neighbor), max(cluster, neighbor))
+            for pair in self.borders[key]:
+                own, other = pair if key[0] == cluster else pair[::-1]
+                links.setdefault(own, []).append((other, self.costs[other]))
+
+        return links
+
+    def __build(self, cluster):
+        """ Builds the nodes and edges of a cluster. """
+        for cell in self.nodes.get(cluster, ()):
+            del self.edges[cell]
+
+        links = self.__links(cluster)
+        nodes = sorted(links)
+        self.nodes[cluster] = nodes
+
+        for cell in nodes:
+            distances = self.distances(cell, nodes)[0]
+            self.edges[cell] = links[cell] + [
+                (n, distances[n]) for n in nodes
+                if n != cell and n in distances
+            ]
+
+    def __relink(self, cluster):
+        """
+        Updates the costs of the transitions of a cluster whose nodes and
+        paths did not change.
+        """
+        links = self.__links(cluster)
+
+        for cell in self.nodes[cluster]:
+            self.edges[cell] = links[cell] + [
+                e for e in self.edges[cell] if self.cluster(e[0]) == cluster
+            ]
+
+    def distances(self, source, targets=None, reverse=False):
+        """
+        distances(source, targets, reverse) -> (distances, parents)
+
+        Dijkstra's algorithm inside of the cluster of the SOURCE cell. Returns
+        dictionaries with the cost of the cheapest path from the source to
+        every cell it reached (or, if REVERSE, from every cell to the source)
+        and the cell that comes before it (after it, if REVERSE) on that path.
+        If TARGETS are given, the search stops once all of them are reached.
+        """
+        costs, width = self.costs, self.width
+        x0, y0, x1, y1 = self.bounds(self.cluster(source))
+        left = set(targets) if targets is not None else None
+
+        distances = {source: 0}
+        parents = {source: -1}
+        done = set()
+        heap = [(0, source)]
+
+        while heap:
+            d, cell = heappop(heap)
+            if cell in done:
+                continue
+            done.add(cell)
+
+            if left is not None:
+                left.discard(cell)
+                if not left:
+                    break
+
+            # Going backwards, a cell is entered when it's left
+            if reverse:
+                if costs[cell] < 0:
+                    continue
+                step = d + costs[cell]
+
+            x, y = cell % width, cell // width
+            for nx, ny in ((x, y - 1), (x, y + 1), (x - 1, y), (x + 1, y)):
+                if not (x0 <= nx <= x1 and y0 <= ny <= y1):
+                    continue
+
+                n = ny * width + nx
+                cost = costs[n]
+                if cost < 0:
+                    continue
+
+                nd = step if reverse else d + cost
+                if nd < distances.get(n, nd + 1):
+                    distances[n] = nd
+                    parents[n] = cell
+                    heappush(heap, (nd, n))
+
+        return distances, parents
+
+    def local_path(self, start, goal):
+        """
+        Returns the cells of the cheapest path from START to GOAL inside of the
+        cluster of START, or None if there is none.
+        """
+        parents = self.distances(start, [goal])[1]
+        if goal not in parents:
+            return None
+
+        path = []
+        while goal >= 0:
+            path.append(goal)
+            goal = parents[goal]
+
+        path.reverse()
+        return path
+
+    def refresh(self, gmap, changes):
+        """
+        Rebuilds the clusters with tiles changed in CHANGES (a list of
+        DirtyRect), and the neighbors whose transitions with them changed.
+        """
+        self.costs = gmap.cost_raster(self.table).costs
+
+        dirty = set()
+        for rect in changes:
+            for cell in rect.cells(gmap.width):
+                dirty.add(self.cluster(cell))
+
+        rebuild = set(dirty)
+        for cluster in dirty:
+            for neighbor in self.neighbors(cluster):
+                key = (min(cluster, neighbor), max(cluster, neighbor))
+                transitions = self.__transitions(*key)
+
+                if transitions != self.borders[key]:
+                    self.borders[key] = transitions
+                    rebuild.add(neighbor)
+
+        for cluster in rebuild:
+            self.__build(cluster)
+
+        # The costs of the transitions into the changed clusters may be stale
+        for cluster in dirty:
+            for neighbor in self.neighbors(cluster):
+                if neighbor not in rebuild:
+                    self.__relink(neighbor)
+
+        return True
+
+
+class Landmarks:
+    """
+    Landmarks of a Map for ALT heuristics (A*, landmarks and the triangle
+    inequality), with the costs of the cheapest paths from and to every
+    landmark for one table of terrain costs (see CostRaster).
+
+    Landmarks(gmap, table, count, cells)
+    gmap  : The map of the landmarks.
+    table : Sequence with the cost of every terrain value (256 of them).
+    count : Amount of landmarks picked, if CELLS are not given (see pick).
+    cells : Cells of the landmarks.
+
+    - forward  : For every landmark, an array with the cost of the cheapest
+                 path from the landmark to every cell.
+    - backward : For every landmark, an array with the cost of the cheapest
+                 path from every cell to the landmark.
+
+    Cells that can't be reached cost infinity. The bounds of the landmarks
+    stay below the costs of the paths as long as no tile gets cheaper to enter
+    than when they were built (the tiles of then are kept in TILES), so they
+    are only built again when one does.
+    """
+
+    def __init__(self, gmap, table, count=LANDMARKS, cells=None):
+        self.version = gmap.version
+        self.table = tuple(table)
+        self.tiles = bytes(gmap.tiles)
+        self.width = gmap.width
+        self.height = gmap.height
+        self.cells = list(cells) if cells is not None else \
+            self.pick(gmap, count)
+
+        costs = gmap.cost_raster(self.table).costs
+        self.forward = [self.__distances(gmap, costs, c, False)
+                        for c in self.cells]
+        self.backward = [self.__distances(gmap, costs, c, True)
+                         for c in self.cells]
+
+    @staticmethod
+    def pick(gmap, count=LANDMARKS):
+        """
+        Returns the cells of COUNT landmarks of a map, spread over its largest
+        region of walkable tiles: every landmark is the cell farthest (in
+        steps) from the landmarks picked before it, and the first one is the
+        farthest from a cell of the region.
+        """
+        tiles = bytes(gmap.tiles)
+        regions, sizes = find_regions(tiles, gmap.width, gmap.height)
+        if not sizes:
+            return []
+
+        largest = max(sizes, key=sizes.get)
+        seed = next(compress(walkable_runs(tiles, gmap.width, gmap.height),
+                             map(largest.__eq__, regions))).start()
+        walkable = gmap.adjacency().walkable
+
+        def steps(source):
+            distances = array('l', [-1]) * len(gmap.tiles)
+            distances[source] = 0
+            queue = deque([source])
+            while queue:
+                cell = queue.popleft()
+                for n in walkable(cell):
+                    if distances[n] < 0:
+                        distances[n] = distances[cell] + 1
+                        queue.append(n)
+            return distances
+
+        nearest = steps(seed)
+        cells = []
+        for i in range(min(count, sizes[largest])):
+            cell = max(range(len(nearest)), key=nearest.__getitem__)
+            cells.append(cell)
+
+            around = steps(cell)
+            for c, d in enumerate(around):
+                if d < nearest[c]:
+                    nearest[c] = d
+
+        return cells
+
+    def __distances(self, gmap, costs, source, reverse):
+        """
+        Dijkstra's algorithm from a SOURCE cell. Returns an array with the cost
+        of the cheapest path from the source to every cell (or, if REVERSE,
+        from every cell to the source).
+        """
+        neighbors = gmap.adjacency().neighbors
+        distances = array('d', [math.inf]) * len(costs)
+        distances[source] = 0
+        done = bytearray(len(costs))
+        heap = [(0, source)]
+
+        while heap:
+            d, cell = heappop(heap)
+            if done[cell]:
+                continue
+            done[cell] = 1
+
+            # Going backwards, a cell is entered when it's left
+            if reverse:
+                if costs[cell] < 0:
+                    continue
+                step = d + costs[cell]
+
+            for n in neighbors(cell):
+                cost = costs[n]
+                if not reverse and cost < 0:
+                    continue
+
+                nd = step if reverse else d + cost
+                if nd < distances[n]:
+                    distances[n] = nd
+                    heappush(heap, (nd, n))
+
+        return distances
+
+    def heuristic(self, goal, fallback):
+        """
+        Returns a function that estimates the cost of the cheapest path from a
+        cell to the GOAL cell without overestimating it, with the best of the
+        bounds of every landmark and the estimate of a FALLBACK function. For a
+        landmark L, the cost from a cell c to the goal is at least
+        cost(L, goal) - cost(L, c) and cost(c, L) - cost(goal, L).
+        """
+        inf = math.inf
+        bounds = [(f, f[goal], b, b[goal])
+                  for f, b in zip(self.forward, self.backward)]
+
+        def estimate(cell):
+            best = fallback(cell)
+
+            for forward, to_goal, backward, from_goal in bounds:
+                from_landmark = forward[cell]
+                if from_landmark != inf and to_goal != inf and \
+                        to_goal - from_landmark > best:
+                    best = to_goal - from_landmark
+
+                to_landmark = backward[cell]
+                if to_landmark != inf and from_goal != inf and \
+                        to_landmark - from_goal > best:
+                    best = to_landmark - from_goal
+
+            return best
+
+        return estimate
+
+    def refresh(self, gmap, changes):
+        """
+        Landmarks are kept unless a tile changed in CHANGES (a list of
+        DirtyRect) is cheaper to enter than when they were built.
+        """
+        table, tiles = self.table, self.tiles
+
+        for rect in changes:
+            for cell in rect.cells(gmap.width):
+                before, after = table[tiles[cell]], table[gmap.tiles[cell]]
+                if after >= 0 and (before < 0 or after < before):
+                    return False
+
+        return True
+
+    def save(self, fname, gmap):
+        """
+        Writes the landmarks of GMAP (the map they were built for) into a
+        landmark file, which can be read with load.
+        """
+        with open(fname, 'wb') as fdata:
+            fdata.write(LANDMARK_HEADER.pack(
+                LANDMARK_MAGIC, LANDMARK_VERSION, len(self.cells), self.width,
+                self.height, zlib.crc32(bytes(gmap.tiles)),
+                zlib.crc32(repr(self.table).encode())))
+            fdata.write(array('q', self.cells).tobytes())
+
+            for forward, backward in zip(self.forward, self.backward):
+                fdata.write(forward.tobytes())
+                fdata.write(backward.tobytes())
+
+    @classmethod
+    def load(cls, fname, gmap, table):
+        """
+        Reads the landmarks of the current version of GMAP for a TABLE of
+        costs from a landmark file. Returns None if the file is not valid or
+        was written for other tiles or costs.
+        """
+        table = tuple(table)
+        area = gmap.width * gmap.height
+
+        with open(fname, 'rb') as fdata:
+            header = fdata.read(LANDMARK_HEADER.size)
+            if len(header) < LANDMARK_HEADER.size:
+                return None
+
+            magic, version, count, width, height, tiles, costs = \
+                LANDMARK_HEADER.unpack(header)
+            if magic != LANDMARK_MAGIC or version != LANDMARK_VERSION or \
+                    (width, height) != (gmap.width, gmap.height) or \
+                    tiles != zlib.crc32(bytes(gmap.tiles)) or \
+                    costs != zlib.crc32(repr(table).encode()):
+                return None
+
+            data = fdata.read()
+
+        cells = array('q')
+        distances = array('d')
+        try:
+            cells.frombytes(data[:count * cells.itemsize])
+            distances.frombytes(data[count * cells.itemsize:])
+        except ValueError:
+            return None
+
+        if len(cells) != count or len(distances) != 2 * count * area:
+            return None
+
+        landmarks = cls.__new__(cls)
+        landmarks.version = gmap.version
+        landmarks.table = table
+        landmarks.tiles = bytes(gmap.tiles)
+        landmarks.width = width
+        landmarks.height = height
+        landmarks.cells = list(cells)
+        landmarks.forward = [distances[2 * i * area:(2 * i + 1) * area]
+                             for i in range(count)]
+        landmarks.backward = [distances[(2 * i + 1) * area:(2 * i + 2) * area]
+                              for i in range(count)]
+
+        return landmarks
 
 
 class Map:
@@ -14,15 +1433,258 @@ class Map:
     The file must contain integers separated by spaces. Each line will consist of a row in the map,
     and the row with most columns will define the width of the map (zeroes will be filled in the
     rows to make the matrix rectangular). Each digit must correspond to a terrain.|
+
+    Tiles are stored in a flat bytearray (one byte per tile, row after row), so
+    the tile at (x, y) is tiles[y * width + x]. The matrix attribute is a view of
+    that buffer that behaves like the old list of rows.
     '''
 
+    # Directory where the landmarks of maps loaded from a file are saved (see
+    # landmarks_file). By default they are only kept in memory.
+    landmark_dir = None
+
     def __init__(self, fname=''):
         self.fname = fname
-        self.matrix = []
+        self.width = 0
+        self.height = 0
+        self.tiles = bytearray()
+
+        # Every change of the tiles increases the version of the map, and the
+        # changed tiles are logged so derived structures can be refreshed.
+        self.version = 0
+        self.dirty = deque(maxlen=DIRTY_LOG_SIZE)
+        self.dirty_base = 0
+        self.listeners = []
+
+        self.__adjacency = None
+        self.__graph = None
+        self.__components = {}
+        self.__rasters = {}
+        self.__hierarchies = {}
+        self.__landmarks = {}
 
         if fname:
             self.load(fname)
 
+    @property
+    def matrix(self):
+        return MatrixView(self)
+
+    @matrix.setter
+    def matrix(self, rows):
+        self.set_matrix(rows)
+
+    def set_matrix(self, rows):
+        '''
+        Replaces the tiles of the map with the ones in a list of rows. Short rows
+        are filled in with zeroes (walls) to make the map rectangular.
+        '''
+        rows = [list(r) for r in rows]
+        width = max((len(r) for r in rows), default=0)
+
+        tiles = bytearray(width * len(rows))
+        for y, row in enumerate(rows):
+            tiles[y * width:y * width + len(row)] = bytes(row)
+
+        self.set_tiles(width, len(rows), tiles)
+
+    def set_tiles(self, width, height, tiles):
+        '''
+        Replaces the tiles of the map with a buffer of WIDTH * HEIGHT terrain
+        values, row after row.
+        '''
+        self.width = width
+        self.height = height
+        self.tiles = tiles
+        self.version += 1
+
+        # Nothing can be refreshed from a map that was replaced
+        self.dirty.clear()
+        self.dirty_base = self.version
+        self.__adjacency = None
+        self.__graph = None
+        self.__components = {}
+        self.__rasters = {}
+        self.__hierarchies = {}
+        self.__landmarks = {}
+
+        self.__notify(DirtyRect(self.version, 0, 0, width, height))
+
+    def mark_dirty(self, x, y, width=1, height=1):
+        '''
+        Records that a rectangle of tiles changed, which creates a new version
+        of the map. It must be called by anything that writes into the tiles
+        directly (set_terrain already does).
+        '''
+        self.version += 1
+        rect = DirtyRect(self.version, x, y, width, height)
+        self.dirty.append(rect)
+        self.__notify(rect)
+
+    def changes_since(self, version):
+        '''
+        Returns the list of DirtyRect of the changes made after VERSION, or None
+        if they are no longer known (the log doesn't go back that far, or the
+        whole map was replaced since then).
+        '''
+        if version < self.dirty_base:
+            return None
+        if version == self.version:
+            return []
+        if not self.dirty or self.dirty[0].version > version + 1:
+            return None
+
+        return [r for r in self.dirty if r.version > version]
+
+    def subscribe(self, listener):
+        '''
+        Registers a function that is called as listener(gmap, rect) every time
+        tiles of the map change, with the DirtyRect of the change. Replacing
+        the whole map is reported as a change of every tile.
+        '''
+        self.listeners.append(listener)
+
+    def unsubscribe(self, listener):
+        ''' Removes a function registered with subscribe. '''
+        self.listeners.remove(listener)
+
+    def __notify(self, rect):
+        for listener in list(self.listeners):
+            listener(self, rect)
+
+    def refreshed(self, derived, build):
+        '''
+        Brings a structure derived from the map up to the current version. If
+        DERIVED is stale, its refresh(gmap, changes) method is called with the
+        changes made since its version; if there is no DERIVED, the changes are
+        unknown or refresh returns False, BUILD is called to make a new one.
+        '''
+        if derived is not None and derived.version != self.version:
+            changes = self.changes_since(derived.version)
+
+            if changes is not None and derived.refresh(self, changes):
+                derived.version = self.version
+            else:
+                derived = None
+
+        if derived is None:
+            derived = build()
+
+        return derived
+
+    def adjacency(self):
+        '''
+        Returns the neighbor index of the current version of the map, building
+        or refreshing it if needed.
+        '''
+        self.__adjacency = self.refreshed(
+            self.__adjacency, lambda: Adjacency(self))
+
+        return self.__adjacency
+
+    def decision_graph(self):
+        '''
+        Returns the graph of decision points and corridors (see DecisionGraph)
+        of the current version of the map, building or refreshing it if needed.
+        '''
+        self.__graph = self.refreshed(
+            self.__graph, lambda: DecisionGraph(self))
+
+        return self.__graph
+
+    def hierarchy(self, table, size=HIERARCHY_CLUSTER):
+        '''
+        Returns the hierarchy of clusters (see Hierarchy) of a table of terrain
+        costs for the current version of the map, building or refreshing it if
+        needed. Hierarchies are kept for every table and cluster size, so
+        heroes of the same species share theirs.
+        '''
+        key = (tuple(table), size)
+        self.__hierarchies[key] = self.refreshed(
+            self.__hierarchies.get(key), lambda: Hierarchy(self, table, size))
+
+        return self.__hierarchies[key]
+
+    def landmarks(self, table, count=LANDMARKS):
+        '''
+        Returns the landmarks (see Landmarks) of a table of terrain costs for
+        the current version of the map, building them if needed. Landmarks are
+        kept for every table (None and -1 both mean that a terrain can't be
+        entered), and every table of the same version of the map uses the same
+        landmark cells.
+
+        If the map was loaded from a file and landmark_dir is set, landmarks
+        are saved there (see landmarks_file) and loaded from there while the
+        tiles don't change.
+        '''
+        table = tuple(-1 if c is None else c for c in table)
+        key = (table, count)
+        self.__landmarks[key] = self.refreshed(
+            self.__landmarks.get(key), lambda: self.__build_landmarks(*key))
+
+        return self.__landmarks[key]
+
+    def landmarks_file(self, table):
+        '''
+        Returns the name of the landmark file of a table of terrain costs in
+        landmark_dir, which is the name of the map file followed by a checksum
+        of the table.
+        '''
+        table = tuple(-1 if c is None else c for c in table)
+        checksum = zlib.crc32(repr(table).encode())
+        return os.path.join(self.landmark_dir, '%s.%08x%s' % (
+            os.path.basename(self.fname), checksum, LANDMARK_EXTENSION))
+
+    def __build_landmarks(self, table, count):
+        fname = self.landmarks_file(table) \
+            if self.fname and self.landmark_dir else None
+
+        if fname and os.path.exists(fname):
+            landmarks = Landmarks.load(fname, self, table)
+            if landmarks is not None and len(landmarks.cells) == count:
+                return landmarks
+
+        # Landmarks of other tables are only reused if they are up to date
+        cells = next((l.cells for l in self.__landmarks.values()
+                      if l.version == self.version and len(l.cells) == count),
+                     None)
+        landmarks = Landmarks(self, table, count, cells)
+
+        if fname:
+            try:
+                landmarks.save(fname, self)
+            except OSError:
+                pass
+
+        return landmarks
+
+    def components(self, passable=None):
+        '''
+        Returns the labeling of connected regions of the current version of the
+        map, building or refreshing it if needed. PASSABLE is the set of terrain
+        values that can be walked through (see Components); labelings for
+        different sets are kept apart, so every species of hero may have its
+        own.
+        '''
+        key = frozenset(passable) if passable is not None else None
+        self.__components[key] = self.refreshed(
+            self.__components.get(key), lambda: Components(self, passable))
+
+        return self.__components[key]
+
+    def cost_raster(self, table):
+        '''
+        Returns the cost raster (see CostRaster) of a table of terrain costs for
+        the current version of the map, building or refreshing it if needed.
+        Rasters are kept for every table, so heroes of the same species share
+        theirs.
+        '''
+        key = tuple(table)
+        self.__rasters[key] = self.refreshed(
+            self.__rasters.get(key), lambda: CostRaster(self, key))
+
+        return self.__rasters[key]
+
     def count_walkable(self, coord):
         walkable = 0
 
@@ -43,59 +1705,158 @@ class Map:
 
     def load(self, fname):
         '''
-        Loads data from a file into the map matrix.
+        Loads data from a file into the map matrix. Binary map files (see
+        save_binary) are detected by their header and opened with load_binary.
         '''
-        with open(fname) as fdata:
-            lines = fdata.readlines()
-
-        self.matrix = []
-        for index, line in enumerate(lines):
-            self.matrix.append([])
+        with open(fname, 'rb') as fdata:
+            if fdata.read(len(BINARY_MAGIC)) == BINARY_MAGIC:
+                return self.load_binary(fname)
 
-            for digit in line.split():
-                value = int(digit)
+            fdata.seek(0)
+            data = fdata.read()
 
-                # Invalid values will be treated as 0 (as a wall)
-                if not value in constants.valid_terrains:
-                    self.matrix[index].append(0)
-                else:
-                    self.matrix[index].append(value)
+        # Files that aren't plain ASCII are parsed as text, token by token
+        lines = data.splitlines() if data.isascii() \
+            else data.decode().splitlines()
+        rows = [parse_row(line) for line in lines]
 
         # If matrix is not rectangular, add the columns to the rows that are short
-        def rowsize(l): return len(l)
+        width = max((len(r) for r in rows), default=0)
+        tiles = bytearray(b''.join(r.ljust(width, b'\0') for r in rows))
+
+        self.set_tiles(width, len(rows), tiles)
+
+    def load_binary(self, fname):
+        '''
+        Opens a binary map file. The tiles are not parsed nor copied: they are
+        mapped in memory straight from the file. Changes of terrain are kept in
+        memory and never written back to the file.
+
+        Raises ValueError if the file is not a valid binary map.
+        '''
+        with open(fname, 'rb') as fdata:
+            header = fdata.read(BINARY_HEADER.size)
+            if len(header) < BINARY_HEADER.size:
+                raise ValueError('not a binary map file', fname)
+
+            magic, version, width, height = BINARY_HEADER.unpack(header)
+            if magic != BINARY_MAGIC or version != BINARY_VERSION:
+                raise ValueError('not a binary map file', fname)
+
+            end = BINARY_HEADER.size + width * height
+            if os.fstat(fdata.fileno()).st_size < end:
+                raise ValueError('truncated binary map file', fname)
+
+            data = mmap.mmap(fdata.fileno(), 0, access=mmap.ACCESS_COPY) \
+                if width * height else bytearray(BINARY_HEADER.size)
+
+        self.set_tiles(width, height, memoryview(data)[BINARY_HEADER.size:end])
+
+    def save_binary(self, fname):
+        '''
+        Writes the map into a binary map file, which can be opened with
+        load_binary.
+        '''
+        with open(fname, 'wb') as fdata:
+            fdata.write(BINARY_HEADER.pack(
+                BINARY_MAGIC, BINARY_VERSION, self.width, self.height))
+            fdata.write(self.tiles)
+
+    def randomize(self, rows=10, columns=10, seed=None, weights=None,
+                  biomes=False, connected=False, block=32):
+        '''
+        Create a matrix with random numbers for the terrain types. By default
+        walls and roads are chosen in equal parts; see generator.generate for
+        the rest of the parameters. If CONNECTED is true, every walkable tile
+        outside of the largest region of walkable tiles is turned into a wall.
+        '''
+        tiles = generator.generate(columns, rows, seed, weights, biomes,
+                                   block=block)
+
+        # Wall off every region but the largest one
+        if connected:
+            regions, sizes = find_regions(tiles, columns, rows)
+            largest = max(sizes, key=sizes.get, default=None)
+            runs = walkable_runs(bytes(tiles), columns, rows)
 
-        longest = max(rowsize(i) for i in self.matrix)
+            # Only the runs of the largest region or of the rest are visited,
+            # whichever has fewer tiles.
+            if sizes.get(largest, 0) * 2 > sum(sizes.values()):
+                for m in compress(runs, map(largest.__ne__, regions)):
+                    a, b = m.span()
+                    tiles[a:b] = bytes(b - a)
+            else:
+                source, tiles = tiles, bytearray(len(tiles))
+                for m in compress(runs, map(largest.__eq__, regions)):
+                    a, b = m.span()
+                    tiles[a:b] = source[a:b]
 
-        for n, r in enumerate(self.matrix):
-            if len(r) < longest:
-                r.extend([0 for i in range(longest - len(r))])
+        self.set_tiles(columns, rows, tiles)
 
-    def randomize(self, rows=10, columns=10):
-        ''' Create a matrix with random numbers for the terrain types. '''
-        self.matrix = [
-            [random.randint(0, 1) for i in range(columns)]
-            for j in range(rows)
-        ]
+    def save(self, fname):
+        '''
+        Writes the map into a text map file.
+        '''
+        width = self.width
+        with open(fname, 'w') as fdata:
+            for y in range(self.height):
+                fdata.write(' '.join(
+                    str(t) for t in self.tiles[y * width:(y + 1) * width]))
+                fdata.write('\n')
+
+    def get_terrain(self, coord):
+        '''
+        Returns the terrain value of a coordinate, or None if it is outside of
+        the map.
+        '''
+        x, y = coord[0], coord[1]
+
+        if 0 <= x < self.width and 0 <= y < self.height:
+            return self.tiles[y * self.width + x]
+        return None
+
+    def set_terrain(self, coord, value):
+        '''
+        Changes the terrain of a coordinate. Raises IndexError if the coordinate
+        is outside of the map.
+        '''
+        x, y = coord[0], coord[1]
+
+        if not (0 <= x < self.width and 0 <= y < self.height):
+            raise IndexError('coordinate out of map', coord)
+
+        self.tiles[y * self.width + x] = value
+        self.mark_dirty(x, y)
 
     def get_walkable(self, coord):
         """
         Returns a list of coordinates where the hero can move from its current
         position (i.e., places where there isn't a wall).
         """
+        x, y = coord[0], coord[1]
+        width = self.width
+        tiles = self.tiles
+
+        # Coordinates outside of the map need bounds checks for every neighbor
+        if not (0 <= x < width and 0 <= y < self.height):
+            return [c for c in ((x, y - 1), (x, y + 1), (x - 1, y), (x + 1, y))
+                    if self.is_walkable(c)]
+
+        index = y * width + x
         walkable = []
 
         # Up
-        if self.is_walkable((coord[0], coord[1] - 1)):
-            walkable.append((coord[0], coord[1] - 1))
+        if y > 0 and tiles[index - width] != WALL:
+            walkable.append((x, y - 1))
         # Down
-        if self.is_walkable((coord[0], coord[1] + 1)):
-            walkable.append((coord[0], coord[1] + 1))
+        if y < self.height - 1 and tiles[index + width] != WALL:
+            walkable.append((x, y + 1))
         # Left
-        if self.is_walkable((coord[0] - 1, coord[1])):
-            walkable.append((coord[0] - 1, coord[1]))
+        if x > 0 and tiles[index - 1] != WALL:
+            walkable.append((x - 1, y))
         # Right
-        if self.is_walkable((coord[0] + 1, coord[1])):
-            walkable.append((coord[0] + 1, coord[1]))
+        if x < width - 1 and tiles[index + 1] != WALL:
+            walkable.append((x + 1, y))
 
         return walkable
 
@@ -110,37 +1871,308 @@ class Map:
         surrounding terrains of a coordinate in the map that contain the
         coordinate and the type of terrain.
         """
+        x, y = coord[0], coord[1]
+        width = self.width
+        tiles = self.tiles
+        index = y * width + x
         succesors = []
 
         # Up
-        if coord[1] > 0:
-            succesors.append(
-                ((coord[0], coord[1] - 1),
-                 constants.Terrain(self.matrix[coord[1] - 1][coord[0]]))
-            )
+        if y > 0:
+            succesors.append(((x, y - 1), TERRAINS[tiles[index - width]]))
         # Down
-        if coord[1] < len(self.matrix) - 1:
-            succesors.append(
-                ((coord[0], coord[1] + 1),
-                 constants.Terrain(self.matrix[coord[1] + 1][coord[0]]))
-            )
+        if y < self.height - 1:
+            succesors.append(((x, y + 1), TERRAINS[tiles[index + width]]))
         # Left
-        if coord[0] > 0:
-            succesors.append(
-                ((coord[0] - 1, coord[1]),
-                 constants.Terrain(self.matrix[coord[1]][coord[0] - 1]))
-            )
+        if x > 0:
+            succesors.append(((x - 1, y), TERRAINS[tiles[index - 1]]))
         # Right
-        if coord[0] < len(self.matrix[0]) - 1:
-            succesors.append(
-                ((coord[0] + 1, coord[1]),
-                 constants.Terrain(self.matrix[coord[1]][coord[0] + 1]))
-            )
+        if x < width - 1:
+            succesors.append(((x + 1, y), TERRAINS[tiles[index + 1]]))
 
         return succesors
 
     def is_walkable(self, xy):
-        try:
-            return self.matrix[xy[1]][xy[0]] != constants.Terrain.WALL.value
-        except IndexError:
-            return False
+        x, y = xy[0], xy[1]
+
+        if 0 <= x < self.width and 0 <= y < self.height:
+            return self.tiles[y * self.width + x] != WALL
+        return False
+
+
+class ChunkedTiles:
+    """
+    Tile buffer of a ChunkedMap. It can be indexed just like the flat tile
+    buffer of a Map (tiles[y * width + x]), but tiles are kept on disk in
+    chunks that are paged in when they are needed.
+
+    Loaded chunks are kept in a least recently used cache that holds up to
+    CACHE_SIZE bytes of tiles. Chunks that were changed are written back to the
+    file when they are evicted from the cache or when flush is called.
+
+    The hits and misses counters tell how many tile accesses found their chunk
+    already loaded and how many had to read it from the file.
+    """
+
+    def __init__(self, fdata, width, height, size, cache_size):
+        self.fdata = fdata
+        self.width = width
+        self.height = height
+        self.size = size
+        self.area = size * size
+        self.columns = -(-width // size)
+        self.capacity = max(1, cache_size // self.area)
+
+        self.chunks = OrderedDict()
+        self.dirty = set()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self):
+        return self.width * self.height
+
+    def __iter__(self):
+        return (self[i] for i in range(len(self)))
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return bytes(self[i] for i in range(*index.indices(len(self))))
+
+        chunk, offset = self.__locate(index)
+        return self.chunk(chunk)[offset]
+
+    def __setitem__(self, index, value):
+        chunk, offset = self.__locate(index)
+        self.chunk(chunk)[offset] = value
+        self.dirty.add(chunk)
+
+    def __locate(self, index):
+        if not 0 <= index < self.width * self.height:
+            raise IndexError('tile index out of range')
+
+        size = self.size
+        y, x = divmod(index, self.width)
+        return (y // size) * self.columns + x // size, \
+            (y % size) * size + x % size
+
+    def chunk(self, index):
+        """ Returns the tiles of a chunk, loading it from disk if needed. """
+        chunk = self.chunks.get(index)
+
+        if chunk is not None:
+            self.hits += 1
+            self.chunks.move_to_end(index)
+            return chunk
+
+        self.misses += 1
+        if len(self.chunks) >= self.capacity:
+            self.__evict()
+
+        self.fdata.seek(CHUNKED_HEADER.size + index * self.area)
+        chunk = bytearray(self.fdata.read(self.area))
+        self.chunks[index] = chunk
+
+        return chunk
+
+    def flush(self):
+        """ Writes every changed chunk back into the file. """
+        for index in self.dirty:
+            self.__write(index, self.chunks[index])
+        self.dirty.clear()
+        self.fdata.flush()
+
+    def __evict(self):
+        index, chunk = self.chunks.popitem(last=False)
+        self.evictions += 1
+
+        if index in self.dirty:
+            self.__write(index, chunk)
+            self.dirty.discard(index)
+
+    def __write(self, index, chunk):
+        self.fdata.seek(CHUNKED_HEADER.size + index * self.area)
+        self.fdata.write(chunk)
+
+
+class ChunkedMap(Map):
+    '''
+    Map whose tiles are stored on disk in fixed-size chunks (see ChunkedTiles),
+    for worlds that don't fit in memory. It has the same interface as Map, so
+    problems and search algorithms can use it as any other map.
+
+    ChunkedMap(fname, cache_size)
+    fname      : A chunked map file (see ChunkedMap.create).
+    cache_size : Maximum amount of bytes of tiles kept in memory.
+
+    Changes of terrain are written back into the file.
+    '''
+
+    def __init__(self, fname, cache_size=64 * 1024 * 1024):
+        self.cache_size = cache_size
+        super(ChunkedMap, self).__init__(fname)
+
+    def load(self, fname):
+        '''
+        Opens a chunked map file. Raises ValueError if the file is not a valid
+        chunked map.
+        '''
+        fdata = open(fname, 'r+b')
+        header = fdata.read(CHUNKED_HEADER.size)
+
+        if len(header) < CHUNKED_HEADER.size:
+            fdata.close()
+            raise ValueError('not a chunked map file', fname)
+
+        magic, version, size, width, height = CHUNKED_HEADER.unpack(header)
+        if magic != CHUNKED_MAGIC or version != CHUNKED_VERSION or not size:
+            fdata.close()
+            raise ValueError('not a chunked map file', fname)
+
+        self.set_tiles(width, height,
+                       ChunkedTiles(fdata, width, height, size, self.cache_size))
+
+    def adjacency(self):
+        '''
+        Returns a neighbor index that computes neighbors on demand, since an
+        index of the whole map would not fit in memory.
+        '''
+        return OnDemandAdjacency(self)
+
+    def decision_graph(self):
+        '''
+        Returns a decision graph that walks corridors on demand, since the
+        corridors of the whole map would not fit in memory.
+        '''
+        return OnDemandGraph(self)
+
+    def components(self, passable=None):
+        '''
+        Connected regions are not kept for chunked maps (their labels would not
+        fit in memory), so None is returned.
+        '''
+        return None
+
+    def landmarks(self, table, count=LANDMARKS):
+        '''
+        Landmarks are not kept for chunked maps (their costs would not fit in
+        memory), so None is returned.
+        '''
+        return None
+
+    def cost_raster(self, table):
+        '''
+        Returns a cost raster that looks up the costs from the tiles, since a
+        raster of the whole map would not fit in memory.
+        '''
+        return CostRaster(self, table, on_demand=True)
+
+    def stats(self):
+        '''
+        Returns a dictionary with the counters of the chunk cache: hits, misses,
+        evictions and the amount of chunks that are loaded.
+        '''
+        return {
+            'hits': self.tiles.hits,
+            'misses': self.tiles.misses,
+            'evictions': self.tiles.evictions,
+            'loaded': len(self.tiles.chunks),
+        }
+
+    def flush(self):
+        ''' Writes the changed chunks back into the file. '''
+        self.tiles.flush()
+
+    def close(self):
+        ''' Writes the changed chunks and closes the file. '''
+        self.tiles.flush()
+        self.tiles.fdata.close()
+
+    @staticmethod
+    def create(fname, width, height, rows, size=256):
+        '''
+        Writes a chunked map file from an iterable of HEIGHT rows, each one a
+        bytes-like object with WIDTH terrain values. Only SIZE rows are kept in
+        memory at a time, so rows may come from a generator of any size.
+        '''
+        columns = -(-width // size)
+        rows = iter(rows)
+
+        with open(fname, 'wb') as fdata:
+            fdata.write(CHUNKED_HEADER.pack(
+                CHUNKED_MAGIC, CHUNKED_VERSION, size, width, height))
+
+            for top in range(0, height, size):
+                band = [bytes(next(rows)).ljust(width, b'\0')
+                        for y in range(min(size, height - top))]
+                band.extend(bytes(width) for y in range(size - len(band)))
+
+                for c in range(columns):
+                    left = c * size
+                    fdata.write(b''.join(
+                        r[left:left + size].ljust(size, b'\0') for r in band))
+
+        return fname
+
+    @staticmethod
+    def from_map(gmap, fname, size=256):
+        ''' Writes the tiles of a map into a chunked map file. '''
+        width = gmap.width
+        return ChunkedMap.create(
+            fname, width, gmap.height,
+            (gmap.tiles[y * width:(y + 1) * width] for y in range(gmap.height)),
+            size
+        )
+
+
+def convert(fname, dest=None):
+    '''
+    Converts a text map file into a binary map file. If DEST is not given, the
+    binary file is written next to the text file with the .aqm extension.
+    Returns the name of the binary file.
+    '''
+    if dest is None:
+        dest = fname + BINARY_EXTENSION
+
+    Map(fname).save_binary(dest)
+    return dest
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Map file utilities.')
+    commands = parser.add_subparsers(dest='command')
+    commands.required = True
+
+    conv = commands.add_parser(
+        'convert', help='convert text maps into binary maps')
+    conv.add_argument('maps', nargs='+', help='text map files')
+    conv.add_argument('-d', '--directory',
+                      help='directory for the binary maps (default: same '
+                      'directory as the text map)')
+
+    chunk = commands.add_parser(
+        'chunk', help='convert maps into chunked maps')
+    chunk.add_argument('maps', nargs='+', help='text or binary map files')
+    chunk.add_argument('-s', '--size', type=int, default=256,
+                       help='width and height of the chunks (default: 256)')
+    chunk.add_argument('-d', '--directory',
+                       help='directory for the chunked maps (default: same '
+                       'directory as the map)')
+
+    args = parser.parse_args()
+
+    if args.command == 'convert':
+        for fname in args.maps:
+            dest = None
+            if args.directory:
+                dest = os.path.join(args.directory,
+                                    os.path.basename(fname) + BINARY_EXTENSION)
+            print(fname, '->', convert(fname, dest))
+
+    elif args.command == 'chunk':
+        for fname in args.maps:
+            dest = fname + CHUNKED_EXTENSION
+            if args.directory:
+                dest = os.path.join(args.directory,
+                                    os.path.basename(fname) + CHUNKED_EXTENSION)
+            print(fname, '->', ChunkedMap.from_map(Map(fname), dest, args.size))
@@ -0,0 +1,6 @@
+import os
+import sys
+
+# The modules of questlogic import each other as top-level modules
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'questlogic'))
+sys.path.insert(0, os.path.dirname(__file__))
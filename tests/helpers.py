@@ -0,0 +1,141 @@
+"""
+Reference implementations used to check the search engines.
+"""
+import heapq
+import math
+import os
+import random
+
+import maps
+import heroes
+from ai import search
+
+MISSION = os.path.join(os.path.dirname(__file__), '..', 'src', 'maps',
+                       'mission1')
+
+SPECIES = (heroes.Human, heroes.Monkey, heroes.Octopus, heroes.Sasquatch,
+           heroes.Werewolf)
+
+# Seeds and shapes (rows, columns) of the random maps the engines are checked
+# on, lines of a single row or column included
+SEEDS = range(3)
+SHAPES = ((20, 30), (33, 17), (1, 40), (40, 1))
+
+
+def random_map(seed, rows, columns, biomes=True, block=4):
+    """ Returns a random map (see Map.randomize). """
+    gmap = maps.Map()
+    gmap.randomize(rows, columns, seed=seed, biomes=biomes, block=block)
+    return gmap
+
+
+def species_costs(cls, gmap):
+    """ Returns the table of terrain costs of a species of hero. """
+    return cls('hero', gmap, [0, 0]).cost
+
+
+def random_coords(rng, gmap, amount):
+    """ Returns AMOUNT random coordinates of a map. """
+    return [(rng.randrange(gmap.width), rng.randrange(gmap.height))
+            for i in range(amount)]
+
+
+def enter_cost(gmap, costs, coord):
+    """ Cost of entering a tile, or None if it can't be entered. """
+    terrain = gmap.get_terrain(coord)
+    if terrain is None:
+        return None
+    if costs is None:
+        return 1 if terrain != maps.WALL else None
+
+    cost = costs.get(maps.TERRAINS[terrain])
+    return None if cost is None or cost == math.inf else cost
+
+
+def dijkstra(gmap, costs, start, goal):
+    """
+    Cost of the cheapest path from START to GOAL, paying the cost of every
+    tile that is entered (every tile but walls costs 1 without COSTS), or
+    None if there is no path.
+    """
+    if start == goal:
+        return 0
+
+    best = {start: 0}
+    heap = [(0, start)]
+
+    while heap:
+        d, coord = heapq.heappop(heap)
+        if d > best[coord]:
+            continue
+        if coord == goal:
+            return d
+
+        x, y = coord
+        for n in ((x, y - 1), (x, y + 1), (x - 1, y), (x + 1, y)):
+            cost = enter_cost(gmap, costs, n)
+            if cost is not None and d + cost < best.get(n, math.inf):
+                best[n] = d + cost
+                heapq.heappush(heap, (d + cost, n))
+
+    return None
+
+
+def path_cost(gmap, costs, start, node):
+    """
+    Checks that the path to NODE starts at START and only makes valid moves
+    into tiles that can be entered, and returns its cost.
+    """
+    path = node.get_path()
+    assert path[0] == start
+
+    total = 0
+    for a, b in zip(path, path[1:]):
+        assert abs(a[0] - b[0]) + abs(a[1] - b[1]) == 1
+        cost = enter_cost(gmap, costs, b)
+        assert cost is not None
+        total += cost
+
+    return total
+
+
+def check_engine(engine, seeds, shapes, queries=4, species=SPECIES,
+                 optimal=True, **problem_args):
+    """
+    Runs ENGINE (a function of a MapProblem) on random maps and queries, and
+    checks its paths against the reference Dijkstra. Paths must be the
+    cheapest ones if OPTIMAL, otherwise they only have to exist when one
+    does. Returns the amount of paths checked.
+    """
+    checked = 0
+
+    for seed in seeds:
+        rng = random.Random(seed)
+        for rows, columns in shapes:
+            gmap = random_map(seed, rows, columns)
+            for cls in species:
+                costs = species_costs(cls, gmap)
+                for i in range(queries):
+                    start, goal = random_coords(rng, gmap, 2)
+                    expected = dijkstra(gmap, costs, start, goal)
+                    problem = search.MapProblem(gmap, start, goal, costs,
+                                                **problem_args)
+                    solution = engine(problem)
+
+                    if expected is None:
+                        assert solution.status == search.SolStat.FAILURE, \
+                            (seed, rows, columns, start, goal)
+                        continue
+
+                    assert solution.status == search.SolStat.SUCCESS, \
+                        (seed, rows, columns, start, goal)
+                    cost = path_cost(gmap, costs, start, solution.node)
+                    assert cost == solution.node.acc_cost or start == goal
+                    if optimal:
+                        assert cost == expected, \
+                            (seed, rows, columns, start, goal)
+                    else:
+                        assert cost >= expected
+                    checked += 1
+
+    return checked
@@ -0,0 +1,25 @@
+from ai import search
+
+import helpers
+
+
+def test_anytime_search():
+    assert helpers.check_engine(search.anytime_search, helpers.SEEDS,
+                                helpers.SHAPES)
+
+
+def test_anytime_search_within_budgets():
+    # With a budget the first paths are kept, within their bound
+    for budget in ({'expansions': 10}, {'budget': 0}):
+        def engine(problem):
+            solution = search.anytime_search(problem, **budget)
+            if solution.node:
+                expected = helpers.dijkstra(problem.gmap, problem.costs,
+                                            problem.initial.coord,
+                                            problem.goal)
+                assert solution.bound >= 1
+                assert solution.node.acc_cost <= solution.bound * expected
+            return solution
+
+        assert helpers.check_engine(engine, helpers.SEEDS, helpers.SHAPES,
+                                    optimal=False)
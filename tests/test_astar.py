@@ -0,0 +1,13 @@
+from ai import search
+
+import helpers
+
+
+def test_astar_search():
+    assert helpers.check_engine(search.astar_search, helpers.SEEDS,
+                                helpers.SHAPES)
+
+
+def test_cell_astar_search():
+    assert helpers.check_engine(search.cell_astar_search, helpers.SEEDS,
+                                helpers.SHAPES)
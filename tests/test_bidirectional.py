@@ -0,0 +1,49 @@
+import random
+
+from ai import search
+
+import helpers
+
+
+def test_bidirectional_bf_search():
+    for seed in helpers.SEEDS:
+        rng = random.Random(seed)
+        for rows, columns in helpers.SHAPES:
+            gmap = helpers.random_map(seed, rows, columns)
+
+            for i in range(10):
+                start, goal = helpers.random_coords(rng, gmap, 2)
+                expected = helpers.dijkstra(gmap, None, start, goal)
+                problem = search.MapProblem(gmap, start, goal)
+                solution = search.bidirectional_bf_search(problem)
+
+                if expected is None:
+                    assert solution.status == search.SolStat.FAILURE
+                else:
+                    assert solution.status == search.SolStat.SUCCESS
+                    assert helpers.path_cost(gmap, None, start,
+                                             solution.node) == expected
+                    assert solution.node.coord == goal
+
+
+def test_bidirectional_bf_search_like_bf_search():
+    # Starts and goals on walls, in separate regions or at the same tile
+    gmap = helpers.maps.Map()
+    gmap.set_matrix([[3, 3, 0, 3], [3, 0, 3, 3]])
+    coords = [(x, y) for y in range(gmap.height) for x in range(gmap.width)]
+
+    for start in coords:
+        for goal in coords:
+            expected = search.bf_search(search.MapProblem(gmap, start, goal))
+            solution = search.bidirectional_bf_search(
+                search.MapProblem(gmap, start, goal))
+
+            assert solution.status == expected.status
+            if expected.status == search.SolStat.SUCCESS:
+                assert len(solution.node.get_path()) == \
+                    len(expected.node.get_path())
+
+
+def test_bidirectional_astar_search():
+    assert helpers.check_engine(search.bidirectional_astar_search,
+                                helpers.SEEDS, helpers.SHAPES)
@@ -0,0 +1,41 @@
+import pytest
+
+import helpers
+
+maps = helpers.maps
+
+
+def test_binary_round_trip(tmp_path):
+    gmap = helpers.random_map(2, 17, 23)
+    fname = str(tmp_path / ('map' + maps.BINARY_EXTENSION))
+    gmap.save_binary(fname)
+
+    # Binary files are detected by their header
+    loaded = maps.Map(fname)
+    assert (loaded.width, loaded.height) == (23, 17)
+    assert bytes(loaded.tiles) == bytes(gmap.tiles)
+
+    # Changes are kept in memory only
+    loaded.set_terrain((0, 0), maps.WALL + 1)
+    loaded.set_terrain((1, 0), maps.WALL)
+    assert bytes(maps.Map(fname).tiles) == bytes(gmap.tiles)
+
+    text = str(tmp_path / 'text')
+    gmap.save(text)
+    assert bytes(maps.Map(maps.convert(text)).tiles) == bytes(gmap.tiles)
+
+
+def test_binary_errors(tmp_path):
+    gmap = helpers.random_map(3, 8, 8)
+    fname = str(tmp_path / ('map' + maps.BINARY_EXTENSION))
+    gmap.save_binary(fname)
+
+    with open(fname, 'rb') as fdata:
+        data = fdata.read()
+    with open(fname, 'wb') as fdata:
+        fdata.write(data[:-1])
+
+    with pytest.raises(ValueError):
+        maps.Map().load_binary(fname)
+    with pytest.raises(ValueError):
+        maps.Map().load_binary(str(helpers.MISSION))
@@ -0,0 +1,113 @@
+import random
+
+from constants import Terrain
+from ai import search
+
+import helpers
+
+maps = helpers.maps
+
+
+def coords(gmap):
+    return [(x, y) for y in range(gmap.height) for x in range(gmap.width)]
+
+
+def test_chunked_round_trip(tmp_path):
+    gmap = helpers.random_map(4, 37, 45)
+    fname = str(tmp_path / ('map' + maps.CHUNKED_EXTENSION))
+
+    for size in (8, 16, 64):
+        chunked = maps.ChunkedMap(maps.ChunkedMap.from_map(gmap, fname, size))
+        assert (chunked.width, chunked.height) == (45, 37)
+        assert [chunked.get_terrain(c) for c in coords(chunked)] == \
+            [gmap.get_terrain(c) for c in coords(gmap)]
+
+        # Changes are written back into the file
+        chunked.set_terrain((44, 36), maps.WALL)
+        chunked.set_terrain((0, 20), maps.WALL + 1)
+        chunked.close()
+
+        chunked = maps.ChunkedMap(fname)
+        assert chunked.get_terrain((44, 36)) == maps.WALL
+        assert chunked.get_terrain((0, 20)) == maps.WALL + 1
+        chunked.close()
+
+
+def test_chunked_create_from_rows(tmp_path):
+    fname = str(tmp_path / ('map' + maps.CHUNKED_EXTENSION))
+    rows = (bytes((x * y) % 7 for x in range(30)) for y in range(20))
+    chunked = maps.ChunkedMap(maps.ChunkedMap.create(fname, 30, 20, rows, 8))
+
+    assert [chunked.get_terrain(c) for c in coords(chunked)] == \
+        [(x * y) % 7 for x, y in coords(chunked)]
+    chunked.close()
+
+
+def test_search_on_chunked_map(tmp_path):
+    for seed in range(4):
+        rng = random.Random(seed)
+        gmap = helpers.random_map(seed, 40, 50)
+        fname = str(tmp_path / ('map%d.aqc' % seed))
+        chunked = helpers.maps.ChunkedMap(
+            helpers.maps.ChunkedMap.from_map(gmap, fname, 16))
+
+        for cls in helpers.SPECIES:
+            costs = helpers.species_costs(cls, gmap)
+            for i in range(4):
+                start, goal = helpers.random_coords(rng, gmap, 2)
+                expected = helpers.dijkstra(gmap, costs, start, goal)
+                problem = search.MapProblem(chunked, start, goal, costs)
+                buffers = search.SearchBuffers.of(chunked)
+                assert isinstance(buffers.g, search.SparseArray)
+
+                solution = search.cell_astar_search(problem)
+                if expected is None:
+                    assert solution.status == search.SolStat.FAILURE
+                else:
+                    assert helpers.path_cost(gmap, costs, start,
+                                             solution.node) == expected
+
+                expected = helpers.dijkstra(gmap, None, start, goal)
+                solution = search.bf_search(problem)
+                if expected is None:
+                    assert solution.status == search.SolStat.FAILURE
+                else:
+                    assert helpers.path_cost(gmap, None, start,
+                                             solution.node) == expected
+
+        chunked.close()
+
+
+def test_field_search_on_chunked_map(tmp_path):
+    for seed in range(3):
+        rng = random.Random(seed)
+        # Plenty of walls, so the goal is in a region smaller than the map
+        gmap = helpers.maps.Map()
+        gmap.randomize(40, 50, seed=seed,
+                       weights={Terrain.WALL: 1, Terrain.LAND: 2,
+                                Terrain.FOREST: 1})
+        fname = str(tmp_path / ('map%d.aqc' % seed))
+        chunked = helpers.maps.ChunkedMap(
+            helpers.maps.ChunkedMap.from_map(gmap, fname, 16))
+
+        costs = helpers.species_costs(helpers.SPECIES[seed], gmap)
+        for i in range(4):
+            start, goal = helpers.random_coords(rng, gmap, 2)
+            expected = helpers.dijkstra(gmap, costs, start, goal)
+            cache = search.DistanceCache()
+
+            problem = search.MapProblem(chunked, start, goal, costs)
+            solution = search.field_search(problem, cache)
+            if expected is None:
+                assert solution.status == search.SolStat.FAILURE
+                continue
+            assert helpers.path_cost(gmap, costs, start,
+                                     solution.node) == expected
+
+            # Only the cells that reach the goal are kept
+            field, = cache.fields.values()
+            assert isinstance(field.distances, search.SparseArray)
+            assert len(field.distances) < len(gmap.tiles)
+            assert 0 < field.nbytes <= cache.budget
+
+        chunked.close()
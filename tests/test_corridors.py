@@ -0,0 +1,80 @@
+import random
+
+from constants import MoveDir, Terrain
+import maps
+from ai import search
+
+import helpers
+
+
+class WalkingProblem(search.MapProblem):
+    """
+    Problem whose enhanced children walk tile by tile while the cell reached
+    has a single walkable neighbor that isn't explored, like the enhanced
+    searches did before the decision graph.
+    """
+
+    def get_child(self, node, action, enhance=False):
+        if not enhance:
+            return super().get_child(node, action)
+
+        dx, dy = search.DIRECTIONS[action.value]
+        cell = (node.coord[0] + dx, node.coord[1] + dy)
+        if not self.gmap.is_walkable(cell) or cell in self.explored:
+            return None
+
+        while cell != self.goal:
+            around = [c for c in self.gmap.get_walkable(cell)
+                      if c not in self.explored]
+            if len(around) != 1:
+                break
+
+            self.explored.add(cell)
+            cell = around[0]
+
+        child = search.Node(cell, node.cost + 1, node, action)
+        node.children.append(child)
+        return child
+
+
+def path(solution):
+    node = solution.node if solution.status == search.SolStat.SUCCESS else None
+    coords = []
+    while node is not None:
+        coords.append(node.coord)
+        node = node.parent
+    return coords
+
+
+def test_enhanced_depth_searches_jump_like_walking():
+    engines = (
+        lambda p, a: search.dl_search(p, a, 4, True),
+        lambda p, a: search.dl_search(p, a, 10, True),
+        lambda p, a: search.df_search(p, a, True),
+        lambda p, a: search.id_search(p, a, 1, 1, True),
+    )
+
+    for seed in range(12):
+        gmap = maps.Map()
+        if seed % 2:
+            gmap = helpers.random_map(seed, 14, 17)
+        else:
+            # Plenty of walls, so most cells are in corridors
+            gmap.randomize(14, 17, seed=seed,
+                           weights={Terrain.WALL: 1, Terrain.LAND: 2})
+
+        rng = random.Random(seed)
+        for start, goal in zip(helpers.random_coords(rng, gmap, 10),
+                               helpers.random_coords(rng, gmap, 10)):
+            actions = list(MoveDir)
+            rng.shuffle(actions)
+
+            for engine in engines:
+                expected = WalkingProblem(gmap, start, goal)
+                problem = search.MapProblem(gmap, start, goal)
+                walked = engine(expected, actions)
+                jumped = engine(problem, actions)
+
+                assert jumped.status == walked.status
+                assert path(jumped) == path(walked)
+                assert problem.explored == expected.explored
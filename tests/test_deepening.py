@@ -0,0 +1,94 @@
+import random
+from collections import deque
+
+from constants import MoveDir
+from ai import search
+
+import helpers
+
+
+def path(solution):
+    node = solution.node if solution.status == search.SolStat.SUCCESS else None
+    coords = []
+    while node is not None:
+        coords.append(node.coord)
+        node = node.parent
+    return coords[::-1]
+
+
+def first_shortest(gmap, start, goal, actions):
+    """
+    Returns the first of the shortest paths from START to GOAL in the order of
+    the ACTIONS: the one that always takes the first action that gets closer
+    to the goal.
+    """
+    steps = {goal: 0}
+    queue = deque([goal])
+    while queue:
+        coord = queue.popleft()
+        for n in gmap.get_walkable(coord):
+            if n not in steps:
+                steps[n] = steps[coord] + 1
+                queue.append(n)
+
+    if start not in steps:
+        return []
+
+    coords = [start]
+    while coords[-1] != goal:
+        x, y = coords[-1]
+        for action in actions:
+            dx, dy = search.DIRECTIONS[action.value]
+            if gmap.is_walkable((x + dx, y + dy)) and \
+                    steps.get((x + dx, y + dy)) == steps[(x, y)] - 1:
+                coords.append((x + dx, y + dy))
+                break
+
+    return coords
+
+
+def test_incremental_id_search_takes_the_first_shortest_path():
+    for seed in range(10):
+        gmap = helpers.random_map(seed, 14, 17)
+        rng = random.Random(seed)
+
+        for start, goal in zip(helpers.random_coords(rng, gmap, 10),
+                               helpers.random_coords(rng, gmap, 10)):
+            if not gmap.is_walkable(start):
+                continue
+
+            actions = list(MoveDir)
+            rng.shuffle(actions)
+
+            plain = search.id_search(
+                search.MapProblem(gmap, start, goal), actions)
+            incremental = search.id_search(
+                search.MapProblem(gmap, start, goal), actions,
+                incremental=True)
+
+            assert incremental.status == plain.status
+            if plain.status == search.SolStat.SUCCESS:
+                assert path(incremental) == \
+                    first_shortest(gmap, start, goal, actions)
+                assert len(path(incremental)) <= len(path(plain))
+
+
+def test_incremental_id_search_keeps_the_status():
+    doubling = lambda d: d * 2
+
+    for seed in range(10):
+        gmap = helpers.random_map(seed, 14, 17)
+        rng = random.Random(seed)
+
+        for start, goal in zip(helpers.random_coords(rng, gmap, 10),
+                               helpers.random_coords(rng, gmap, 10)):
+            for increment in (1, doubling):
+                for enhance in (False, True):
+                    plain = search.id_search(
+                        search.MapProblem(gmap, start, goal), list(MoveDir),
+                        1, increment, enhance)
+                    incremental = search.id_search(
+                        search.MapProblem(gmap, start, goal), list(MoveDir),
+                        1, increment, enhance, incremental=True)
+
+                    assert incremental.status == plain.status
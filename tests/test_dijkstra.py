@@ -0,0 +1,38 @@
+import random
+
+from ai import search
+
+import helpers
+
+
+def test_dijkstra_search_one_goal():
+    def engine(problem):
+        nodes = search.dijkstra_search(problem, [problem.goal])
+        node = nodes[problem.goal]
+        return search.Solution(search.SolStat.SUCCESS, node) if node else \
+            search.Solution(search.SolStat.FAILURE)
+
+    assert helpers.check_engine(engine, helpers.SEEDS, helpers.SHAPES)
+
+
+def test_dijkstra_search_many_goals():
+    for seed in helpers.SEEDS:
+        rng = random.Random(seed)
+        gmap = helpers.random_map(seed, 25, 30)
+
+        for cls in helpers.SPECIES:
+            costs = helpers.species_costs(cls, gmap)
+            start, = helpers.random_coords(rng, gmap, 1)
+            goals = helpers.random_coords(rng, gmap, 6) + [start]
+            problem = search.MapProblem(gmap, start, goals[0], costs)
+            nodes = search.dijkstra_search(problem, goals)
+
+            assert set(nodes) == set(goals)
+            for goal in goals:
+                expected = helpers.dijkstra(gmap, costs, start, goal)
+                if expected is None:
+                    assert nodes[goal] is None
+                else:
+                    assert helpers.path_cost(gmap, costs, start,
+                                             nodes[goal]) == expected
+                    assert nodes[goal].coord == goal
@@ -0,0 +1,54 @@
+import random
+
+from constants import Terrain
+from ai import search
+
+import helpers
+
+
+def test_field_search():
+    cache = search.DistanceCache()
+
+    def engine(problem):
+        solution = search.field_search(problem, cache)
+        misses = cache.stats()['misses']
+
+        # The same query again is answered from the cache
+        again = search.field_search(search.MapProblem(
+            problem.gmap, problem.initial.coord, problem.goal,
+            problem.costs), cache)
+        assert cache.stats()['misses'] == misses
+        assert search.path_cost(again.node) == search.path_cost(solution.node)
+        return again
+
+    assert helpers.check_engine(engine, helpers.SEEDS, helpers.SHAPES)
+    assert cache.stats()['hits'] > 0
+
+
+
+def test_distance_cache_budget_and_edits():
+    rng = random.Random(1)
+    gmap = helpers.random_map(1, 20, 30)
+    costs = helpers.species_costs(helpers.heroes.Human, gmap)
+    table = search.cost_table(costs)
+    raster = gmap.cost_raster(table)
+    goals = [y * gmap.width + x
+             for x, y in helpers.random_coords(rng, gmap, 4)]
+
+    # Room for two fields only: the least recently used one is dropped
+    size = search.DistanceField(gmap, raster, goals[0]).nbytes
+    cache = search.DistanceCache(2 * size)
+    a = cache.field(gmap, raster, goals[0])
+    b = cache.field(gmap, raster, goals[1])
+    assert cache.field(gmap, raster, goals[0]) is a
+    cache.field(gmap, raster, goals[2])
+    assert cache.stats()['evictions'] == 1
+    assert cache.field(gmap, raster, goals[0]) is a
+    assert cache.field(gmap, raster, goals[1]) is not b
+    assert cache.stats()['bytes'] <= cache.budget
+
+    # Fields of older versions of the map are not used again
+    gmap.set_terrain((0, 0), Terrain.WALL.value)
+    raster = gmap.cost_raster(table)
+    field = cache.field(gmap, raster, goals[0])
+    assert field is not a and field.version == gmap.version
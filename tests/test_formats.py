@@ -0,0 +1,36 @@
+import pytest
+
+import helpers
+
+maps = helpers.maps
+
+
+def test_text_round_trip(tmp_path):
+    gmap = helpers.random_map(1, 17, 23)
+    fname = str(tmp_path / 'map')
+    gmap.save(fname)
+
+    loaded = maps.Map(fname)
+    assert (loaded.width, loaded.height) == (23, 17)
+    assert bytes(loaded.tiles) == bytes(gmap.tiles)
+
+
+def test_matrix_view_reads_and_writes_tiles():
+    gmap = maps.Map()
+    gmap.set_matrix([[3, 1, 2], [0, 4], [5]])
+    version = gmap.version
+
+    # Short rows are filled in with walls
+    assert (gmap.width, gmap.height) == (3, 3)
+    assert gmap.matrix == [[3, 1, 2], [0, 4, 0], [5, 0, 0]]
+    assert gmap.matrix[-1][0] == 5 and gmap.matrix[0][1:] == [1, 2]
+    assert [len(r) for r in gmap.matrix] == [3, 3, 3]
+
+    gmap.matrix[1][2] = 3
+    assert gmap.tiles[1 * 3 + 2] == 3
+    assert gmap.get_terrain((2, 1)) == 3
+    assert gmap.version == version + 1
+
+    for index in ((3, 0), (0, 3), (-4, 0)):
+        with pytest.raises(IndexError):
+            gmap.matrix[index[1]][index[0]]
@@ -0,0 +1,56 @@
+import random
+from collections import deque
+
+import generator
+import maps
+
+import helpers
+
+
+def regions(gmap):
+    """ Returns the sizes of the regions of walkable tiles, tile by tile. """
+    seen = set()
+    sizes = []
+
+    for cell in range(len(gmap.tiles)):
+        if gmap.tiles[cell] == maps.WALL or cell in seen:
+            continue
+
+        seen.add(cell)
+        queue = deque([cell])
+        size = 0
+        while queue:
+            c = queue.popleft()
+            size += 1
+            for n in gmap.adjacency().walkable(c):
+                if n not in seen:
+                    seen.add(n)
+                    queue.append(n)
+        sizes.append(size)
+
+    return sizes
+
+
+def test_random_bytes_match_randbytes():
+    for n in (0, 1, 7, 64):
+        rng = random.Random(n)
+        data = generator.random_bytes(rng, n)
+        assert len(data) == n
+
+        if hasattr(random.Random, 'randbytes'):
+            assert data == random.Random(n).randbytes(n)
+
+
+def test_connected_maps_keep_the_largest_region():
+    for seed in range(8):
+        for biomes in (False, True):
+            gmap = helpers.random_map(seed, 37, 53, biomes=biomes)
+            largest = max(regions(gmap), default=0)
+
+            connected = maps.Map()
+            connected.randomize(37, 53, seed=seed, biomes=biomes, block=4,
+                                connected=True)
+
+            assert regions(connected) == ([largest] if largest else [])
+            assert all(c == t or c == maps.WALL
+                       for c, t in zip(connected.tiles, gmap.tiles))
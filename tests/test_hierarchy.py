@@ -0,0 +1,71 @@
+import random
+
+import maps
+from ai import search
+
+import helpers
+
+# Maps narrower or shorter than a cluster, where the cluster below is also
+# the next cluster
+NARROW = ((21, 38), (38, 21), (40, 10), (10, 40), (17, 5))
+
+
+def test_paths_exist_when_reachable():
+    checked = helpers.check_engine(search.hierarchical_search, range(6),
+                                   ((40, 40),) + NARROW, optimal=False)
+    assert checked > 0
+
+
+def test_paths_on_engine_shapes():
+    # Paths cross between clusters through their transitions, so they may
+    # cost more than the cheapest ones
+    assert helpers.check_engine(search.hierarchical_search, helpers.SEEDS,
+                                helpers.SHAPES + ((50, 60),), optimal=False)
+
+
+def test_narrow_maps_have_vertical_transitions():
+    gmap = maps.Map()
+    gmap.set_matrix([[3] * 5 for y in range(40)])
+    hierarchy = maps.Hierarchy(gmap, search.cost_table(
+        helpers.species_costs(helpers.heroes.Human, gmap)))
+
+    for (low, high), transitions in hierarchy.borders.items():
+        assert high == low + 1
+        for a, b in transitions:
+            assert b - a == gmap.width
+
+
+def test_start_leaving_through_another_cluster():
+    # The start is a mountain (which can't be entered) on the border of its
+    # cluster, walled in but for the tile of the cluster on its right
+    rows = [[3] * 32 for y in range(8)]
+    rows[2][15] = rows[4][15] = rows[3][14] = 0
+    rows[3][15] = 2
+    gmap = maps.Map()
+    gmap.set_matrix(rows)
+    costs = helpers.species_costs(helpers.heroes.Human, gmap)
+
+    problem = search.MapProblem(gmap, (15, 3), (20, 6), costs)
+    assert problem.is_reachable()
+    solution = search.hierarchical_search(problem)
+
+    assert solution.status == search.SolStat.SUCCESS
+    assert helpers.path_cost(gmap, costs, (15, 3), solution.node) == \
+        helpers.dijkstra(gmap, costs, (15, 3), (20, 6))
+
+
+def test_refresh_matches_a_new_hierarchy():
+    rng = random.Random(3)
+    gmap = helpers.random_map(3, 50, 45)
+    table = search.cost_table(
+        helpers.species_costs(helpers.heroes.Human, gmap))
+
+    for i in range(30):
+        for x, y in helpers.random_coords(rng, gmap, rng.randint(1, 6)):
+            gmap.set_terrain((x, y), rng.randrange(7))
+
+        hierarchy = gmap.hierarchy(table)
+        fresh = maps.Hierarchy(gmap, table)
+        assert hierarchy.borders == fresh.borders
+        assert hierarchy.nodes == fresh.nodes
+        assert hierarchy.edges == fresh.edges
@@ -0,0 +1,60 @@
+import random
+
+import constants
+import heroes
+from ai import search
+
+import helpers
+
+GOALS = {'key': (5, 5), 'temple': (10, 3), 'stones': (3, 12),
+         'portal': (14, 7)}
+
+
+def test_missions_reuse_planners_after_edits(capsys):
+    gmap = helpers.maps.Map(helpers.MISSION)
+    team = [heroes.Human(constants.Heroes.HUMAN, gmap, [1, 1]),
+            heroes.Octopus(constants.Heroes.OCTOPUS, gmap, [2, 2]),
+            heroes.Monkey(constants.Heroes.MONKEY, gmap, [0, 5])]
+
+    heroes.assign_missions(team, GOALS, constants.Algorithm.LPASTAR)
+    planners = [dict(hero.planners) for hero in team]
+    assert all(len(p) == 6 for p in planners)
+
+    # Every leg is planned again by the same planners after an edit
+    gmap.matrix[4][7] = constants.Terrain.WALL.value
+    heroes.assign_missions(team, GOALS, constants.Algorithm.LPASTAR)
+    for hero, before in zip(team, planners):
+        assert hero.planners == before
+        assert any(p.version == gmap.version for p in before.values())
+
+        for (start, goal), planner in before.items():
+            problem = search.MapProblem(gmap, start, goal, hero.cost)
+            expected = search.cell_astar_search(problem)
+            assert search.path_cost(search.incremental_search(planner).node) \
+                == search.path_cost(expected.node)
+
+
+def test_incremental_search_after_edits():
+    terrains = [t.value for t in constants.Terrain]
+
+    for seed in helpers.SEEDS:
+        rng = random.Random(seed)
+        gmap = helpers.random_map(seed, 25, 30)
+
+        for cls in helpers.SPECIES:
+            costs = helpers.species_costs(cls, gmap)
+            start, goal = helpers.random_coords(rng, gmap, 2)
+            planner = search.IncrementalPlanner(gmap, start, goal, costs)
+
+            for i in range(6):
+                solution = search.incremental_search(planner)
+                expected = helpers.dijkstra(gmap, costs, start, goal)
+
+                if expected is None:
+                    assert solution.status == search.SolStat.FAILURE
+                else:
+                    assert helpers.path_cost(gmap, costs, start,
+                                             solution.node) == expected
+
+                for coord in helpers.random_coords(rng, gmap, 8):
+                    gmap.set_terrain(coord, rng.choice(terrains))
@@ -0,0 +1,77 @@
+import random
+
+from constants import Terrain
+from ai import search
+
+import helpers
+
+
+def uniform_map(seed, rows, columns):
+    gmap = helpers.maps.Map()
+    gmap.randomize(rows, columns, seed=seed,
+                   weights={Terrain.WALL: 1, Terrain.LAND: 3})
+    return gmap
+
+
+def test_jump_point_search_lengths():
+    for seed in range(8):
+        rng = random.Random(seed)
+        gmap = uniform_map(seed, 30, 40)
+
+        for i in range(20):
+            start, goal = helpers.random_coords(rng, gmap, 2)
+            expected = helpers.dijkstra(gmap, None, start, goal)
+            problem = search.MapProblem(gmap, start, goal)
+            solution = search.bf_search(problem, jump=True)
+
+            if expected is None:
+                assert solution.status == search.SolStat.FAILURE
+            else:
+                assert helpers.path_cost(gmap, None, start,
+                                         solution.node) == expected
+
+
+def test_uniform_costs_astar_with_jumps():
+    costs = {Terrain.LAND: 2}
+
+    for seed in range(8):
+        rng = random.Random(seed)
+        gmap = uniform_map(seed, 30, 40)
+
+        for i in range(20):
+            start, goal = helpers.random_coords(rng, gmap, 2)
+            expected = helpers.dijkstra(gmap, costs, start, goal)
+            problem = search.MapProblem(gmap, start, goal, costs)
+            solution = search.cell_astar_search(problem)
+            plain = search.MapProblem(gmap, start, goal, costs)
+            search.cell_astar_search(plain, jump=False)
+
+            if expected is None:
+                assert solution.status == search.SolStat.FAILURE
+            else:
+                assert solution.node.acc_cost == expected
+                assert helpers.path_cost(gmap, costs, start,
+                                         solution.node) == expected
+                # Only the jump points are expanded
+                assert len(problem.explored) <= len(plain.explored)
+
+
+def test_breadth_first_search_is_not_replaced():
+    gmap = uniform_map(1, 30, 40)
+    rng = random.Random(1)
+
+    for i in range(20):
+        start, goal = helpers.random_coords(rng, gmap, 2)
+        expected = helpers.dijkstra(gmap, None, start, goal)
+        if not expected:
+            continue
+
+        early = search.MapProblem(gmap, start, goal)
+        late = search.MapProblem(gmap, start, goal)
+        a = search.bf_search(early)
+        b = search.bf_search(late, early_goal=False)
+
+        assert helpers.path_cost(gmap, None, start, a.node) == expected
+        assert helpers.path_cost(gmap, None, start, b.node) == expected
+        # Testing the goal when it's taken out of the frontier explores more
+        assert late.explored >= early.explored
@@ -0,0 +1,113 @@
+import os
+import random
+import shutil
+
+from constants import Algorithm, Heroes, Terrain
+import heroes
+from ai import search
+
+import helpers
+
+
+def retile(rng, gmap, before, after, amount, tiles=None):
+    """
+    Changes AMOUNT random tiles of terrain BEFORE (also in TILES, if given)
+    into AFTER.
+    """
+    cells = [c for c in range(len(gmap.tiles)) if gmap.tiles[c] == before and
+             (tiles is None or tiles[c] == before)]
+    for cell in rng.sample(cells, min(amount, len(cells))):
+        gmap.set_terrain((cell % gmap.width, cell // gmap.width), after)
+
+
+def check_alt(rng, gmap, costs, queries=10):
+    for i in range(queries):
+        start, goal = helpers.random_coords(rng, gmap, 2)
+        expected = helpers.dijkstra(gmap, costs, start, goal)
+        problem = search.MapProblem(gmap, start, goal, costs, landmarks=True)
+        solution = search.cell_astar_search(problem)
+
+        if expected is None:
+            assert solution.status == search.SolStat.FAILURE
+        else:
+            assert helpers.path_cost(gmap, costs, start,
+                                     solution.node) == expected
+
+    return problem.raster.table
+
+
+def test_landmarks_astar():
+    assert helpers.check_engine(search.cell_astar_search, helpers.SEEDS,
+                                helpers.SHAPES, landmarks=True)
+
+
+def test_landmarks_kept_while_costs_rise():
+    land, water = Terrain.LAND.value, Terrain.WATER.value
+    mountain = Terrain.MOUNTAIN.value
+
+    for seed in range(4):
+        rng = random.Random(seed)
+        gmap = helpers.random_map(seed, 30, 40)
+        costs = helpers.species_costs(heroes.Human, gmap)
+        table = check_alt(rng, gmap, costs)
+        landmarks = gmap.landmarks(table)
+        tiles = bytes(gmap.tiles)
+
+        # Land costs 1 for humans, water 2 and mountains can't be entered
+        retile(rng, gmap, land, water, 20)
+        retile(rng, gmap, water, mountain, 5)
+        assert gmap.landmarks(table) is landmarks
+        check_alt(rng, gmap, costs)
+
+        retile(rng, gmap, water, land, 1, tiles)
+        assert gmap.landmarks(table) is not landmarks
+        check_alt(rng, gmap, costs)
+
+
+def test_landmark_files_are_opt_in(tmp_path):
+    maps_dir, cache_dir = tmp_path / 'maps', tmp_path / 'cache'
+    maps_dir.mkdir()
+    cache_dir.mkdir()
+    fname = str(maps_dir / 'mission1')
+    shutil.copy(helpers.MISSION, fname)
+
+    gmap = helpers.maps.Map(fname)
+    table = search.MapProblem(
+        gmap, (0, 0), (1, 1), helpers.species_costs(heroes.Human, gmap)
+    ).raster.table
+    gmap.landmarks(table)
+    assert os.listdir(str(maps_dir)) == ['mission1']
+
+    gmap = helpers.maps.Map(fname)
+    gmap.landmark_dir = str(cache_dir)
+    landmarks = gmap.landmarks(table)
+    assert os.listdir(str(maps_dir)) == ['mission1']
+    assert os.listdir(str(cache_dir)) == \
+        [os.path.basename(gmap.landmarks_file(table))]
+
+    loaded = helpers.maps.Landmarks.load(gmap.landmarks_file(table), gmap,
+                                         table)
+    assert loaded.cells == landmarks.cells
+    assert loaded.forward == landmarks.forward
+    assert loaded.backward == landmarks.backward
+
+
+def test_heroes_search_with_landmarks():
+    rng = random.Random(3)
+    gmap = helpers.random_map(3, 30, 40)
+
+    for cls, species in ((heroes.Human, Heroes.HUMAN),
+                         (heroes.Octopus, Heroes.OCTOPUS)):
+        hero = cls(species, gmap, [0, 0])
+        for i in range(10):
+            start, goal = helpers.random_coords(rng, gmap, 2)
+            expected = helpers.dijkstra(gmap, hero.cost, start, goal)
+            hero.set_start(start)
+            hero.set_goal(goal)
+            solution = hero.start_heuristic_search(Algorithm.ALT)
+
+            if expected is None:
+                assert solution.status == search.SolStat.FAILURE
+            else:
+                assert helpers.path_cost(gmap, hero.cost, start,
+                                         solution.node) == expected
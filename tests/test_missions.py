@@ -0,0 +1,68 @@
+import constants
+import heroes
+from ai import search
+
+import helpers
+
+GOALS = {'key': (5, 5), 'temple': (10, 3), 'stones': (3, 12),
+         'portal': (14, 7)}
+
+
+def fellowship(gmap):
+    return [heroes.Human(constants.Heroes.HUMAN, gmap, [1, 1]),
+            heroes.Octopus(constants.Heroes.OCTOPUS, gmap, [2, 2]),
+            heroes.Monkey(constants.Heroes.MONKEY, gmap, [0, 5])]
+
+
+def test_portal_legs_use_distance_fields(capsys):
+    gmap = helpers.maps.Map(helpers.MISSION)
+    search.distance_cache.clear()
+    stats = dict(search.distance_cache.stats())
+    heroes.assign_missions(fellowship(gmap), GOALS)
+
+    # One field for each species, walked down by their three missions
+    after = search.distance_cache.stats()
+    assert after['misses'] - stats['misses'] == 3
+    assert after['hits'] - stats['hits'] == 6
+
+    # Other algorithms search every leg
+    heroes.assign_missions(fellowship(gmap), GOALS,
+                           constants.Algorithm.LPASTAR)
+    assert search.distance_cache.stats() == after
+
+
+def test_genetic_cost_tables(monkeypatch, capsys):
+    gmap = helpers.maps.Map(helpers.MISSION)
+    team = fellowship(gmap)
+    starts = [(1, 1), (2, 2), (0, 5)]
+    goals = {'KEY': (5, 5), 'TEMPLE': (10, 3), 'STONES': (3, 12),
+             'FRIEND': (12, 12), 'PORTAL': (14, 7)}
+    tables = {}
+    monkeypatch.setattr(heroes.genetics, 'genetic_search',
+                        lambda costs, starts: tables.update(costs) or {})
+
+    # A single search from every start and every goal of every hero
+    searches = []
+    dijkstra_search = search.dijkstra_search
+    monkeypatch.setattr(search, 'dijkstra_search', lambda problem, goals: (
+        searches.append(problem.initial.coord) or
+        dijkstra_search(problem, goals)))
+    heroes.use_genetic_search(team, starts, goals)
+    assert len(searches) == len(team) * (len(starts) + len(goals))
+
+    sources = dict(enumerate(starts))
+    sources.update(goals)
+    for hero in team:
+        rows = tables[hero.species.name]
+        assert set(rows) == set(sources)
+
+        for row, columns in rows.items():
+            assert set(columns) == set(goals) - {row}
+            for column, node in columns.items():
+                start, goal = sources[row], goals[column]
+                expected = helpers.dijkstra(gmap, hero.cost, start, goal)
+                if expected is None:
+                    assert node is None
+                else:
+                    assert helpers.path_cost(gmap, hero.cost, start,
+                                             node) == expected
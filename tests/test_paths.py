@@ -0,0 +1,114 @@
+import random
+
+from constants import MoveDir, Terrain
+import heroes
+from ai import search
+
+import helpers
+
+LAND = Terrain.LAND.value
+WALL = Terrain.WALL.value
+
+# Depth searches with their limits high enough to reach any cell of the map.
+# Limits are doubled, so long corridors aren't walked again once per step.
+DOUBLING = lambda d: d * 2
+ENGINES = (
+    lambda p, a: search.df_search(p, a),
+    lambda p, a: search.dl_search(p, a, len(p.gmap.tiles)),
+    lambda p, a: search.id_search(p, a, 1, DOUBLING),
+    lambda p, a: search.id_search(p, a, 1, DOUBLING, incremental=True),
+)
+
+
+def grow(parent, coord):
+    node = search.Node(coord, parent.cost + 1, parent)
+    parent.children.append(node)
+    return node
+
+
+def print_tree(node, level=0):
+    """ Recursive printing that the one of heroes has to match. """
+    print('    ' * level, '|---', node.coord, sep='')
+    for child in node.children:
+        print_tree(child, level + 1)
+
+
+def test_print_tree_order(capsys):
+    root = search.Node((0, 0), 0)
+    a, b = grow(root, (1, 0)), grow(root, (0, 1))
+    grow(a, (2, 0)), grow(a, (1, 1)), grow(b, (0, 2))
+
+    print_tree(root)
+    expected = capsys.readouterr().out
+    heroes.Hero._Hero__print_tree(root)
+    assert capsys.readouterr().out == expected
+
+
+def test_deep_trees_and_paths(capsys):
+    root = node = search.Node((0, 0), 0)
+    for i in range(1, 5000):
+        node = grow(node, (i, 0))
+
+    assert node.get_path() == [(i, 0) for i in range(5000)]
+    heroes.Hero._Hero__print_tree(root)
+    assert capsys.readouterr().out.count('\n') == 5000
+
+
+def test_depth_searches_find_valid_paths():
+    for seed in range(6):
+        rng = random.Random(seed)
+        gmap = helpers.random_map(seed, 14, 17)
+
+        for i in range(10):
+            start, goal = helpers.random_coords(rng, gmap, 2)
+            expected = helpers.dijkstra(gmap, None, start, goal)
+            actions = list(MoveDir)
+            rng.shuffle(actions)
+
+            for engine in ENGINES:
+                problem = search.MapProblem(gmap, start, goal)
+                solution = engine(problem, actions)
+
+                if expected is None:
+                    assert solution.status == search.SolStat.FAILURE
+                else:
+                    assert solution.status == search.SolStat.SUCCESS
+                    assert solution.node.coord == goal
+                    assert helpers.path_cost(gmap, None, start,
+                                             solution.node) >= expected
+
+
+def test_depth_searches_fail_behind_walls():
+    gmap = helpers.maps.Map()
+    gmap.set_matrix([[LAND] * 5 + [WALL] + [LAND] * 5] * 4)
+
+    for engine in ENGINES:
+        problem = search.MapProblem(gmap, (0, 0), (10, 3))
+        assert engine(problem, list(MoveDir)).status == \
+            search.SolStat.FAILURE
+
+
+def test_depth_limited_search_cutoff():
+    gmap = helpers.maps.Map()
+    gmap.set_matrix([[LAND] * 10])
+
+    for limit in range(9):
+        problem = search.MapProblem(gmap, (0, 0), (9, 0))
+        solution = search.dl_search(problem, list(MoveDir), limit)
+        assert solution.status == search.SolStat.CUTOFF
+
+    problem = search.MapProblem(gmap, (0, 0), (9, 0))
+    solution = search.dl_search(problem, list(MoveDir), 9)
+    assert solution.node.get_path() == [(x, 0) for x in range(10)]
+
+
+def test_depth_searches_follow_long_corridors():
+    # Far longer than the recursion limit of Python
+    gmap = helpers.maps.Map()
+    gmap.set_matrix([[LAND] * 5000])
+
+    for engine in ENGINES:
+        problem = search.MapProblem(gmap, (0, 0), (4999, 0))
+        solution = engine(problem, list(MoveDir))
+        assert solution.status == search.SolStat.SUCCESS
+        assert len(solution.node.get_path()) == 5000
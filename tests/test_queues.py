@@ -0,0 +1,51 @@
+import pytest
+
+from ai import search
+
+
+@pytest.mark.parametrize('queue', [search.PriorityQueue, search.BucketQueue])
+def test_empty_queues_raise(queue):
+    q = queue()
+    for method in (q.pop, q.get_min, q.min_priority):
+        with pytest.raises(IndexError):
+            method()
+
+    q.push('a', 3)
+    assert q.pop() == 'a'
+    assert q.empty()
+    with pytest.raises(IndexError):
+        q.pop()
+
+
+def test_bucket_queue_order():
+    q = search.BucketQueue()
+    for state, priority in (('c', 7), ('a', 2), ('b', 2), ('d', 5)):
+        q.push(state, priority)
+
+    assert (q.get_min(), q.min_priority()) == ('b', 2)
+    assert q.pop() == 'b'
+
+    # Priorities below the cursor move it back
+    q.push('e', 1)
+    assert [q.pop() for i in range(len(q))] == ['e', 'a', 'd', 'c']
+    assert q.stats() == {'pushes': 5, 'pops': 5, 'peak': 4}
+
+
+def test_priority_queue_order():
+    q = search.PriorityQueue()
+    for state, priority in (('c', 7), ('a', 2.5), ('b', 2.5), ('d', 5)):
+        q.push(state, priority)
+
+    # Equal priorities are first in, first out without a tiebreak
+    assert (q.get_min(), q.min_priority()) == ('a', 2.5)
+    assert [q.pop() for i in range(len(q))] == ['a', 'b', 'd', 'c']
+    assert q.stats() == {'pushes': 4, 'pops': 4, 'peak': 4}
+
+
+def test_priority_queue_tiebreak():
+    depth = {'a': 1, 'b': 3, 'c': 2}
+    q = search.PriorityQueue(startlist='abc', tiebreak=lambda s: -depth[s])
+    assert [q.pop() for i in range(len(q))] == ['b', 'c', 'a']
+
+    q = search.PriorityQueue(startlist='abc', priority=depth.get)
+    assert [q.pop() for i in range(len(q))] == ['a', 'c', 'b']
@@ -0,0 +1,144 @@
+import random
+
+from constants import Terrain
+import heroes
+from ai import search
+
+import helpers
+
+TERRAINS = (Terrain.WALL, Terrain.LAND, Terrain.WATER, Terrain.MOUNTAIN)
+
+
+def edit(rng, gmap, amount):
+    """ Changes the terrain of AMOUNT random coordinates of a map. """
+    for i in range(amount):
+        coord = (rng.randrange(gmap.width), rng.randrange(gmap.height))
+        gmap.set_terrain(coord, rng.choice(TERRAINS).value)
+
+
+def test_changes_since_lists_the_edits():
+    gmap = helpers.random_map(1, 10, 12)
+    base = gmap.version
+    seen = []
+    gmap.subscribe(lambda m, rect: seen.append(rect))
+
+    gmap.set_terrain((3, 4), Terrain.WALL.value)
+    gmap.mark_dirty(1, 2, 3, 2)
+    assert gmap.version == base + 2
+    assert [r.version for r in gmap.changes_since(base)] == \
+        [base + 1, base + 2]
+    assert list(gmap.changes_since(base)[1].cells(gmap.width)) == \
+        [25, 26, 27, 37, 38, 39]
+    assert gmap.changes_since(gmap.version) == []
+    assert seen == gmap.changes_since(base)
+
+    # Replacing the map forgets the older changes
+    gmap.set_matrix([[Terrain.LAND.value] * 4] * 3)
+    assert gmap.changes_since(base) is None
+    assert gmap.changes_since(gmap.version) == []
+    assert (seen[-1].width, seen[-1].height) == (4, 3)
+
+
+def test_changes_since_forgets_old_edits():
+    gmap = helpers.random_map(1, 10, 12)
+    base = gmap.version
+    for i in range(helpers.maps.DIRTY_LOG_SIZE + 1):
+        gmap.mark_dirty(0, 0)
+
+    assert gmap.changes_since(base) is None
+    assert len(gmap.changes_since(base + 1)) == helpers.maps.DIRTY_LOG_SIZE
+
+
+def test_adjacency_refresh_patches_walls():
+    for seed in range(6):
+        rng = random.Random(seed)
+        gmap = helpers.random_map(seed, 30, 40)
+        adjacency = gmap.adjacency()
+
+        for i in range(10):
+            edit(rng, gmap, 5)
+            assert gmap.adjacency() is adjacency
+
+            fresh = helpers.maps.Adjacency(gmap)
+            for cell in range(len(gmap.tiles)):
+                assert list(adjacency.walkable(cell)) == \
+                    list(fresh.walkable(cell))
+                assert adjacency.degree(cell) == fresh.degree(cell)
+
+
+def test_decision_graph_refresh_walks_changed_corridors():
+    for seed in range(6):
+        rng = random.Random(seed)
+        # Plenty of walls, so most cells are in corridors
+        gmap = helpers.maps.Map()
+        gmap.randomize(30, 40, seed=seed,
+                       weights={Terrain.WALL: 1, Terrain.LAND: 2})
+        graph = gmap.decision_graph()
+
+        for i in range(20):
+            edit(rng, gmap, 3)
+            assert gmap.decision_graph() is graph
+
+            fresh = helpers.maps.DecisionGraph(gmap)
+            assert list(graph.ends) == list(fresh.ends)
+            for e in range(len(graph.ends)):
+                assert list(graph.interior(e)) == list(fresh.interior(e))
+            for cell in range(len(gmap.tiles)):
+                assert {graph.owners[0][cell], graph.owners[1][cell]} == \
+                    {fresh.owners[0][cell], fresh.owners[1][cell]}
+
+
+def test_components_refresh_joins_and_splits():
+    for seed in range(6):
+        rng = random.Random(seed)
+        gmap = helpers.random_map(seed, 30, 40)
+        passable = search.passable_terrains(
+            helpers.species_costs(heroes.Octopus, gmap))
+        components = gmap.components(passable)
+
+        for i in range(10):
+            edit(rng, gmap, 5)
+            assert gmap.components(passable) is components
+
+            # Labels may differ, but they have to split the map the same way
+            fresh = helpers.maps.Components(gmap, passable)
+            pairs = set((components.label(c), fresh.label(c))
+                        for c in range(len(gmap.tiles)))
+            assert len(pairs) == len(set(a for a, b in pairs)) == \
+                len(set(b for a, b in pairs))
+            assert all((a < 0) == (b < 0) for a, b in pairs)
+
+
+def test_cost_raster_refresh():
+    for seed in range(6):
+        rng = random.Random(seed)
+        gmap = helpers.random_map(seed, 30, 40)
+        table = search.cost_table(helpers.species_costs(heroes.Human, gmap))
+        raster = gmap.cost_raster(table)
+
+        for i in range(10):
+            edit(rng, gmap, 5)
+            assert gmap.cost_raster(table) is raster
+
+            fresh = helpers.maps.CostRaster(gmap, tuple(table))
+            assert list(raster.costs) == list(fresh.costs)
+            assert raster.uniform() == fresh.uniform()
+
+
+def test_uniform_raster_refresh():
+    gmap = helpers.maps.Map()
+    gmap.randomize(20, 20, seed=1,
+                   weights={Terrain.WALL: 1, Terrain.LAND: 3})
+    table = search.cost_table(helpers.species_costs(heroes.Human, gmap))
+    raster = gmap.cost_raster(table)
+    assert raster.uniform() == 1
+
+    gmap.set_terrain((3, 3), Terrain.WALL.value)
+    gmap.set_terrain((4, 3), Terrain.LAND.value)
+    assert gmap.cost_raster(table).uniform() == 1
+
+    gmap.set_terrain((5, 3), Terrain.WATER.value)
+    assert gmap.cost_raster(table).uniform() is None
+
+    gmap.set_terrain((5, 3), Terrain.LAND.value)
+    assert gmap.cost_raster(table).uniform() == 1